@@ -0,0 +1,199 @@
+"""Memory-aware admission of forecast hours into the worker pool.
+
+A statically sized pool has to guess how many hours fit in memory: too
+many workers and a small box OOMs mid-cycle, too few and a big one idles.
+Instead the pool is sized to the usable cores (at most the hours the
+memory fits, as idle workers keep their scratch arenas), and an hour is
+handed to it only while its expected peak fits in the memory this run
+may use: the smaller of MemAvailable in /proc/meminfo and the headroom
+under the cgroup's memory limit (v2 or v1), less RESERVE_BYTES. The
+expected peak starts at DEFAULT_HOUR_BYTES and is replaced by the
+largest peak RSS the workers actually report (measured()). One hour is
+always admitted when none is running, so a run never stalls; it just
+runs one hour at a time.
+
+Each worker renders single-threaded: BLAS/OpenMP pools sized to every
+core would oversubscribe them. cap_threads() sets the usual thread-count
+variables to cores // workers for libraries loaded after it (spawned
+workers); run.sh sets them to 1 before Python starts, so the parent and
+forked workers load numpy and scipy with them.
+"""
+
+import math
+import os
+import resource
+from collections.abc import Callable
+from concurrent.futures import FIRST_COMPLETED, wait
+
+DEFAULT_HOUR_BYTES = 1_000_000_000
+RESERVE_BYTES = 512_000_000
+THREAD_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+# Limits at or above this are "unlimited" (cgroup v1 reports ~2**63).
+_UNLIMITED = 2**60
+
+
+def _read(path: str) -> str | None:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(proc_cgroup: str, root: str, controller: str) -> list[str]:
+    """Candidate directories of this process's cgroup for controller.
+
+    controller "" is the unified (v2) hierarchy. Containers usually mount
+    their own cgroup at the root, so that is tried as well.
+    """
+    dirs = []
+    for line in (_read(proc_cgroup) or "").splitlines():
+        _, controllers, path = line.split(":", 2)
+        if controller == "" and controllers == "":
+            dirs.append(os.path.join(root, path.lstrip("/")))
+        elif controller and controller in controllers.split(","):
+            dirs.append(os.path.join(root, controller, path.lstrip("/")))
+    dirs.append(os.path.join(root, controller) if controller else root)
+    return dirs
+
+
+def _cgroup_headroom(proc_cgroup: str, root: str) -> int | None:
+    for controller, limit_name, usage_name in (
+        ("", "memory.max", "memory.current"),
+        ("memory", "memory.limit_in_bytes", "memory.usage_in_bytes"),
+    ):
+        for directory in _cgroup_dirs(proc_cgroup, root, controller):
+            limit = _read(os.path.join(directory, limit_name))
+            usage = _read(os.path.join(directory, usage_name))
+            if limit is None or usage is None:
+                continue
+            if limit == "max" or int(limit) >= _UNLIMITED:
+                return None
+            return max(0, int(limit) - int(usage))
+    return None
+
+
+def available_memory(
+    meminfo: str = "/proc/meminfo",
+    proc_cgroup: str = "/proc/self/cgroup",
+    cgroup_root: str = "/sys/fs/cgroup",
+) -> int | None:
+    """Bytes this run may still allocate, or None if nothing is known."""
+    candidates = []
+    for line in (_read(meminfo) or "").splitlines():
+        if line.startswith("MemAvailable:"):
+            candidates.append(int(line.split()[1]) * 1024)
+    headroom = _cgroup_headroom(proc_cgroup, cgroup_root)
+    if headroom is not None:
+        candidates.append(headroom)
+    return min(candidates) if candidates else None
+
+
+def usable_cpus(
+    proc_cgroup: str = "/proc/self/cgroup", cgroup_root: str = "/sys/fs/cgroup"
+) -> int:
+    """Cores this process may run on: its affinity, capped by a cgroup v2 cpu.max quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    for directory in _cgroup_dirs(proc_cgroup, cgroup_root, ""):
+        quota = (_read(os.path.join(directory, "cpu.max")) or "max").split()
+        if quota[0] != "max":
+            cpus = min(cpus, math.ceil(int(quota[0]) / int(quota[1])))
+            break
+    return max(1, cpus)
+
+
+def peak_rss() -> int:
+    """This process's peak resident set size in bytes (ru_maxrss is KB on Linux)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measured(func: Callable, *args, **kwargs) -> tuple:
+    """(func(*args, **kwargs), peak RSS of the worker after it)."""
+    return func(*args, **kwargs), peak_rss()
+
+
+def cap_threads(threads: int) -> None:
+    """Default every THREAD_VARS variable to threads (explicit settings win)."""
+    for name in THREAD_VARS:
+        os.environ.setdefault(name, str(max(1, threads)))
+
+
+class Admission:
+    """Decides whether the pool may start another hour.
+
+    available is polled on every decision, so memory taken by anything
+    else on the box since the run started counts too.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        *,
+        hour_bytes: int = DEFAULT_HOUR_BYTES,
+        reserve: int = RESERVE_BYTES,
+        available: Callable[[], int | None] | None = None,
+    ):
+        self.workers = workers
+        self.default_hour_bytes = hour_bytes
+        self.reserve = reserve
+        self.available = available or available_memory
+        self.measured_peak: int | None = None
+        budget = self.available()
+        # Memory the whole pool may use: what is free now, before any worker.
+        self.budget = None if budget is None else budget - reserve
+
+    @property
+    def hour_bytes(self) -> int:
+        """Expected peak of one worker rendering an hour."""
+        if self.measured_peak is None:
+            return self.default_hour_bytes
+        return self.measured_peak
+
+    def record(self, peak: int) -> None:
+        self.measured_peak = max(peak, self.measured_peak or 0)
+
+    def admits(self, running: int) -> bool:
+        if running == 0:
+            return True
+        if running >= self.workers:
+            return False
+        if self.budget is None:
+            return True
+        if (running + 1) * self.hour_bytes > self.budget:
+            return False
+        available = self.available()
+        return available is None or available - self.reserve >= self.hour_bytes
+
+    def capacity(self) -> int:
+        """Hours the budget fits at the current estimate (for logging)."""
+        if self.budget is None:
+            return self.workers
+        return max(1, min(self.workers, self.budget // self.hour_bytes))
+
+
+def map_admitted(pool, func: Callable, *iterables, admission: Admission) -> list:
+    """pool.map(func, *iterables), starting calls only as admission allows."""
+    calls = list(zip(*iterables))
+    results: list = [None] * len(calls)
+    running: dict = {}  # future -> position
+    next_position = 0
+    while next_position < len(calls) or running:
+        while next_position < len(calls) and admission.admits(len(running)):
+            future = pool.submit(measured, func, *calls[next_position])
+            running[future] = next_position
+            next_position += 1
+        finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in finished:
+            result, peak = future.result()
+            admission.record(peak)
+            results[running.pop(future)] = result
+    return results
@@ -13,35 +13,86 @@ single uniform 1/6 deg grid clipped to +/-85 deg: Web Mercator diverges
 at the poles, and the wave model is ice-masked there anyway. Nearest
 neighbor (rather than bilinear) keeps land masks crisp and never averages
 directional fields across the dateline of their period.
+
+Deployments that serve one region set REGION_BBOX; the lattice is then
+cropped to that box in the regrid plan, so compositing, contouring,
+rendering and every output only ever touch the region (see region_bbox()).
 """
 
+import logging
+import os
+
 import numpy as np
 
+from buffers import BufferArena, scratch
+from fieldcube import FieldCube
+from geometrycache import shared_arrays
+from grid import grid_axes, nearest_index
+
+logger = logging.getLogger("GFSWaveContours")
+
 LAT_LIMIT = 85.0
 GRID_STEP = 1.0 / 6.0
 
 
-def _target_axes() -> tuple[np.ndarray, np.ndarray]:
+def region_bbox() -> tuple[float, float, float, float] | None:
+    """REGION_BBOX ("west,south,east,north" in degrees) parsed, or None for the globe.
+
+    west > east crosses the antimeridian; either convention (-180..180 or
+    0..360) works. An east - west of 360 keeps every longitude.
+    """
+    value = os.environ.get("REGION_BBOX", "").strip()
+    if not value:
+        return None
+    try:
+        west, south, east, north = (float(part) for part in value.split(","))
+    except ValueError:
+        raise ValueError(f"REGION_BBOX must be west,south,east,north; got {value!r}") from None
+    if not -90.0 <= south < north <= 90.0:
+        raise ValueError(f"REGION_BBOX needs -90 <= south < north <= 90; got {value!r}")
+    return west, south, east, north
+
+
+def _crop_axes(
+    lat: np.ndarray, lon: np.ndarray, region: tuple[float, float, float, float]
+) -> tuple[np.ndarray, np.ndarray]:
+    """The grid lines of lat and lon (0..360 or -180..180) inside region.
+
+    Longitudes come back in increasing order from the west edge; those
+    past the 0/360 seam continue above 360, so a box across the prime
+    meridian stays one contiguous grid (and so do its outputs).
+    """
+    west, south, east, north = region
+    lat = lat[(lat >= south - 1e-6) & (lat <= north + 1e-6)]
+    width = east - west if 0 < east - west <= 360 else (east - west) % 360
+    west %= 360.0
+    lon = np.mod(lon, 360.0)
+    shifted = np.where(lon < west - 1e-6, lon + 360.0, lon)
+    shifted = np.sort(shifted[shifted <= west + width + 1e-6])
+    return lat, shifted
+
+
+def _target_axes(
+    region: tuple[float, float, float, float] | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
     n_lat = int(round(2 * LAT_LIMIT / GRID_STEP)) + 1
     lat = np.linspace(LAT_LIMIT, -LAT_LIMIT, n_lat)  # north -> south, like GFS
     n_lon = int(round(360.0 / GRID_STEP))
     lon = np.arange(n_lon) * GRID_STEP
+    if region is not None:
+        lat, lon = _crop_axes(lat, lon, region)
+        if not lat.size or not lon.size:
+            raise ValueError(f"REGION_BBOX {region} holds no grid cells")
     return lat, lon
 
 
 def _axes(data: dict) -> tuple[np.ndarray, np.ndarray]:
-    return (
-        data["lat"][:, 0].astype(np.float64),
-        data["lon"][0, :].astype(np.float64),
-    )
-
+    lon, lat = grid_axes(data)
+    return lat.astype(np.float64), lon.astype(np.float64)
 
-def _nearest(source: np.ndarray, target: np.ndarray) -> np.ndarray:
-    return np.abs(target[:, None] - source[None, :]).argmin(axis=1)
 
-
-class _Compositor:
-    """Regrids arrays from two sources onto the target lattice.
+class RegridPlan:
+    """Index arrays that regrid two sources onto the target lattice.
 
     Cells inside the high-resolution grid's latitude band come from it
     verbatim (its lattice is a subset of the target's, so nearest-neighbor
@@ -50,97 +101,227 @@ class _Compositor:
     product pads its edges with fully-masked rows (2 in the north, 15 in
     the south as of 2026) which would otherwise punch transparent seam
     lines into the composite.
+
+    A plan depends only on grid geometry and that band, so it is built
+    once (see regrid_plan()) and applied to every hour as two gathers:
+    band rows from the fine grid, the rest from the coarse. pick() takes
+    whole (field, lat, lon) stacks, so that is two gathers per FieldCube.
+
+    The plan also carries the target's float32 lon/lat axes, which the
+    composited dicts share read-only.
     """
 
-    def __init__(self, data_hi: dict, data_lo: dict, hi_mask: np.ndarray):
-        target_lat, target_lon = _target_axes()
-        hi_lat, hi_lon = _axes(data_hi)
-        lo_lat, lo_lon = _axes(data_lo)
-        self._hi_index = np.ix_(
-            _nearest(hi_lat, target_lat), _nearest(hi_lon, target_lon)
-        )
-        self._lo_index = np.ix_(
-            _nearest(lo_lat, target_lat), _nearest(lo_lon, target_lon)
-        )
-        data_rows = hi_lat[~hi_mask.all(axis=1)]
-        if data_rows.size:
-            in_band = (target_lat >= data_rows.min() - 1e-6) & (
-                target_lat <= data_rows.max() + 1e-6
-            )
+    def __init__(self, arrays: dict[str, np.ndarray]):
+        self.hi_target_rows = arrays["hi_target_rows"]
+        self.hi_rows = arrays["hi_rows"]
+        self.hi_cols = arrays["hi_cols"]
+        self.lo_target_rows = arrays["lo_target_rows"]
+        self.lo_rows = arrays["lo_rows"]
+        self.lo_cols = arrays["lo_cols"]
+        self.lon = arrays["lon"]
+        self.lat = arrays["lat"]
+        self.shape = (self.lat.size, self.lon.size)
+
+    @classmethod
+    def build(
+        cls, hi_lat, hi_lon, lo_lat, lo_lon, band, target_lat, target_lon
+    ) -> "RegridPlan":
+        """Plan onto target_lat x target_lon (band None: all from the coarse grid)."""
+        if band is not None:
+            in_band = (target_lat >= band[0] - 1e-6) & (target_lat <= band[1] + 1e-6)
         else:
             in_band = np.zeros(target_lat.shape, dtype=bool)
-        self._use_hi = in_band[:, None]
-        self.lon_grid, self.lat_grid = np.meshgrid(
-            target_lon.astype(np.float32), target_lat.astype(np.float32)
+        hi_target_rows = np.flatnonzero(in_band)
+        lo_target_rows = np.flatnonzero(~in_band)
+        return cls(
+            {
+                "hi_target_rows": hi_target_rows.astype(np.int32),
+                "hi_rows": nearest_index(hi_lat, target_lat[hi_target_rows]).astype(np.int32),
+                "hi_cols": nearest_index(hi_lon, target_lon, period=360.0).astype(np.int32),
+                "lo_target_rows": lo_target_rows.astype(np.int32),
+                "lo_rows": nearest_index(lo_lat, target_lat[lo_target_rows]).astype(np.int32),
+                "lo_cols": nearest_index(lo_lon, target_lon, period=360.0).astype(np.int32),
+                "lon": target_lon.astype(np.float32),
+                "lat": target_lat.astype(np.float32),
+            }
         )
 
-    def pick(self, hi_array: np.ndarray, lo_array: np.ndarray) -> np.ndarray:
-        return np.where(
-            self._use_hi, hi_array[self._hi_index], lo_array[self._lo_index]
+    def arrays(self) -> dict[str, np.ndarray]:
+        return {
+            name: getattr(self, name)
+            for name in (
+                "hi_target_rows", "hi_rows", "hi_cols",
+                "lo_target_rows", "lo_rows", "lo_cols", "lon", "lat",
+            )
+        }
+
+    def pick(
+        self, hi_array: np.ndarray, lo_array: np.ndarray, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Regrid (..., lat, lon) arrays; leading axes (fields) pass through.
+
+        out, if given, is filled in place (every cell is written).
+        """
+        if out is None:
+            out = np.empty(
+                (*hi_array.shape[:-2], *self.shape),
+                dtype=np.result_type(hi_array, lo_array),
+            )
+        out[..., self.hi_target_rows, :] = hi_array[..., self.hi_rows[:, None], self.hi_cols]
+        out[..., self.lo_target_rows, :] = lo_array[..., self.lo_rows[:, None], self.lo_cols]
+        return out
+
+
+_PLANS: dict[tuple, RegridPlan] = {}
+
+
+def _plan_directory() -> str:
+    return os.environ.get("REGRID_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "cache", "regrid"
+    )
+
+
+def _geometry(axis: np.ndarray) -> tuple:
+    return (axis.size, round(float(axis[0]), 6), round(float(axis[-1]), 6))
+
+
+def _plan(key: tuple, build) -> RegridPlan:
+    plan = _PLANS.get(key)
+    if plan is None:
+        plan = _PLANS[key] = RegridPlan(
+            shared_arrays(_plan_directory(), key, lambda: build().arrays())
         )
+    return plan
+
+
+def regrid_plan(data_hi: dict, data_lo: dict, hi_mask: np.ndarray) -> RegridPlan:
+    """The plan for this pair of grids, from memory, disk, or built fresh.
+
+    Keyed like gfs_to_contours._grid_cache_key() by each source's axis
+    geometry, plus the fine grid's valid-row band and the region. Plans
+    are kept in REGRID_CACHE_DIR (default cache/regrid/ in this
+    repository) as a few KB of int32 indices, mapped read-only by every
+    worker (see geometrycache.py), so later runs skip the nearest-neighbor
+    searches.
+    """
+    hi_lat, hi_lon = _axes(data_hi)
+    lo_lat, lo_lon = _axes(data_lo)
+    data_rows = hi_lat[~hi_mask.all(axis=1)]
+    band = (
+        (round(float(data_rows.min()), 6), round(float(data_rows.max()), 6))
+        if data_rows.size
+        else None
+    )
+    region = region_bbox()
+    key = (
+        _geometry(hi_lat), _geometry(hi_lon), _geometry(lo_lat), _geometry(lo_lon),
+        band, LAT_LIMIT, GRID_STEP, region,
+    )
+    return _plan(
+        key,
+        lambda: RegridPlan.build(
+            hi_lat, hi_lon, lo_lat, lo_lon, band, *_target_axes(region)
+        ),
+    )
+
+
+def crop_plan(data: dict, region: tuple[float, float, float, float]) -> RegridPlan:
+    """A plan that cuts region out of data's own grid (no regridding)."""
+    lat, lon = _axes(data)
+    target_lat, target_lon = _crop_axes(lat, lon, region)
+    if not target_lat.size or not target_lon.size:
+        raise ValueError(f"REGION_BBOX {region} holds no grid cells")
+    key = ("crop", _geometry(lat), _geometry(lon), region)
+    return _plan(
+        key, lambda: RegridPlan.build(lat, lon, lat, lon, None, target_lat, target_lon)
+    )
 
 
-def composite_swell(data_hi: dict | None, data_lo: dict | None) -> dict:
+def _composite_fields(
+    plan: RegridPlan, data_hi: dict, data_lo: dict, arena: BufferArena | None
+) -> dict:
+    """Regrid both sources' FieldCubes at once; the rest comes from data_hi.
+
+    With an arena the composite's values live in its buffer for this
+    field layout, reused (and overwritten) by the next hour.
+    """
+    hi_cube = FieldCube.of(data_hi)
+    lo_cube = FieldCube.of(data_lo)
+    if not hi_cube.same_layout(lo_cube):
+        raise ValueError("Global grids carry different fields")
+    values = scratch(
+        arena, ("composite", hi_cube.fields), (len(hi_cube.fields), *plan.shape)
+    )
+    masks = scratch(
+        arena, ("composite", hi_cube.mask_fields), (len(hi_cube.mask_fields), *plan.shape), bool
+    )
+    coded = scratch(
+        arena,
+        ("composite", hi_cube.coded_fields),
+        (len(hi_cube.coded_fields), *plan.shape),
+        np.uint16,
+    )
+    cube = FieldCube(
+        plan.pick(hi_cube.values, lo_cube.values, out=values),
+        None,
+        hi_cube.fields,
+        hi_cube.mask_fields,
+        hi_cube.aliases,
+        # Nearest-neighbor regridding copies codes as they are.
+        plan.pick(hi_cube.coded, lo_cube.coded, out=coded),
+        hi_cube.coded_fields,
+        # Gathered unpacked straight into the arena; into() uses them as is.
+        unpacked=plan.pick(hi_cube.unpacked_masks(), lo_cube.unpacked_masks(), out=masks),
+    )
+    combined = cube.into(data_hi)
+    combined["lon"] = plan.lon
+    combined["lat"] = plan.lat
+    return combined
+
+
+def _lone_source(data: dict, arena: BufferArena | None) -> dict:
+    """One grid standing in for the composite: as is, or cut to REGION_BBOX."""
+    region = region_bbox()
+    if region is None:
+        return data
+    return _composite_fields(crop_plan(data, region), data, data, arena)
+
+
+def composite_swell(
+    data_hi: dict | None, data_lo: dict | None, *, arena: BufferArena | None = None
+) -> dict:
     """Merge two extract_from_grib2_to_np() results into one global dict.
 
     Either argument may be None (a failed download); the other is then
-    returned unchanged so a run degrades to partial coverage instead of
-    losing the forecast hour.
+    returned unchanged (but cut to REGION_BBOX, if set) so a run degrades
+    to partial coverage instead of losing the forecast hour. arena: see
+    _composite_fields().
     """
     if data_lo is None:
         if data_hi is None:
             raise ValueError("Both source grids are missing")
-        return data_hi
+        return _lone_source(data_hi, arena)
     if data_hi is None:
-        return data_lo
+        return _lone_source(data_lo, arena)
     if data_hi["valid_date"] != data_lo["valid_date"]:
         raise ValueError("Mismatched valid times between global wave grids")
 
-    compositor = _Compositor(data_hi, data_lo, data_hi["height_mask"])
-    partitions = []
-    for partition_hi, partition_lo in zip(
-        data_hi["swell_partitions"], data_lo["swell_partitions"], strict=True
-    ):
-        partitions.append(
-            {
-                "sequence": partition_hi["sequence"],
-                "height": compositor.pick(partition_hi["height"], partition_lo["height"]),
-                "period": compositor.pick(partition_hi["period"], partition_lo["period"]),
-                "direction": compositor.pick(
-                    partition_hi["direction"], partition_lo["direction"]
-                ),
-                "mask": compositor.pick(partition_hi["mask"], partition_lo["mask"]),
-            }
-        )
-    return {
-        "lon": compositor.lon_grid,
-        "lat": compositor.lat_grid,
-        "height": compositor.pick(data_hi["height"], data_lo["height"]),
-        "height_mask": compositor.pick(data_hi["height_mask"], data_lo["height_mask"]),
-        "period": partitions[0]["period"],
-        "direction": partitions[0]["direction"],
-        "swell_partitions": partitions,
-        "valid_date": data_hi["valid_date"],
-    }
-
-
-def composite_wind(data_hi: dict | None, data_lo: dict | None) -> dict:
+    plan = regrid_plan(data_hi, data_lo, data_hi["height_mask"])
+    return _composite_fields(plan, data_hi, data_lo, arena)
+
+
+def composite_wind(
+    data_hi: dict | None, data_lo: dict | None, *, arena: BufferArena | None = None
+) -> dict:
     """Merge two extract_wind() results into one global dict."""
     if data_lo is None:
         if data_hi is None:
             raise ValueError("Both source grids are missing")
-        return data_hi
+        return _lone_source(data_hi, arena)
     if data_hi is None:
-        return data_lo
+        return _lone_source(data_lo, arena)
     if data_hi["valid_date"] != data_lo["valid_date"]:
         raise ValueError("Mismatched valid times between global wind grids")
 
-    compositor = _Compositor(data_hi, data_lo, data_hi["mask"])
-    combined = {
-        key: compositor.pick(data_hi[key], data_lo[key])
-        for key in ("speed", "direction", "u", "v", "mask")
-    }
-    combined["lon"] = compositor.lon_grid
-    combined["lat"] = compositor.lat_grid
-    combined["valid_date"] = data_hi["valid_date"]
-    return combined
+    plan = regrid_plan(data_hi, data_lo, data_hi["mask"])
+    return _composite_fields(plan, data_hi, data_lo, arena)
@@ -0,0 +1,346 @@
+"""Filled-contour polygons straight from contourpy.
+
+calculate_contours4 used to get its bands from matplotlib: a pyplot
+figure and axes per hour, contourf() building a ContourSet artist, then
+Path objects turned back into rings. Only the geometry was ever used, and
+matplotlib computes it with contourpy anyway. filled_bands() calls the
+same generator with the arguments contourf() passes it (the mpl2014
+algorithm, corner masking, outer boundaries with their holes), so the
+rings are exactly those contourf() drew, without pyplot state, Agg, or
+artists.
+
+The polygons are then repaired, filtered, simplified, rounded and written
+as GeoJSON a whole array at a time (band_polygons() onward) with
+Shapely 2's vectorized functions, instead of one Polygon and one
+geojson.Feature per ring set; the file written is the same.
+contour_polygons() runs all of it on row tiles in threads and stitches
+the polygons that cross tile seams.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import contourpy
+import numpy as np
+import shapely
+
+# contourf()'s defaults (rcParams contour.algorithm / contour.corner_mask).
+ALGORITHM = "mpl2014"
+CORNER_MASK = True
+# Path code starting each ring (contourpy uses matplotlib's codes).
+MOVETO = 1
+# geojson.Geometry rounds every coordinate it is given to this many decimals.
+GEOJSON_DECIMALS = 6
+# Fewest grid rows contour_polygons() gives one tile.
+MIN_TILE_ROWS = 64
+# Crossings on a seam row are interpolated by both tiles, and the two can
+# differ in the last bit: vertices within SEAM_TOLERANCE (degrees) of a
+# seam lie on it, and such twins are the same crossing.
+SEAM_TOLERANCE = 1e-9
+
+
+def filled_bands(
+    x: np.ndarray, y: np.ndarray, z: np.ndarray, levels, *, z_min: float | None = None
+) -> list[tuple[float, float, list[list[np.ndarray]]]]:
+    """(lower, upper, polygons) for each band between consecutive levels.
+
+    x and y are the 1-D axes (or 2-D coordinates) of z; NaN cells of z
+    are masked out. Each polygon is a list of closed (N, 2) float64 rings:
+    the exterior first, then its holes. When z is a tile of a larger
+    field, z_min is the minimum of the whole field.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    z = np.ma.masked_invalid(z)
+    if not z.count():
+        return [(float(lower), float(upper), []) for lower, upper in zip(levels[:-1], levels[1:])]
+    lowers = levels[:-1].copy()
+    if (z.min() if z_min is None else z_min) == lowers[0]:
+        lowers[0] -= 1  # like contourf(): minimum values belong to the lowest band
+    generator = contourpy.contour_generator(
+        x,
+        y,
+        z,
+        name=ALGORITHM,
+        corner_mask=CORNER_MASK,
+        fill_type=contourpy.FillType.OuterCode,
+    )
+    bands = []
+    for lower, upper, filled_lower in zip(levels[:-1], levels[1:], lowers):
+        points, codes = generator.filled(filled_lower, upper)
+        polygons = [
+            np.split(outer_points, np.flatnonzero(outer_codes == MOVETO)[1:])
+            for outer_points, outer_codes in zip(points, codes)
+        ]
+        bands.append((float(lower), float(upper), polygons))
+    return bands
+
+
+def band_polygons(bands) -> tuple[np.ndarray, np.ndarray]:
+    """Every polygon of filled_bands() as one Shapely geometry array.
+
+    Returns (polygons, band): band[i] is the index into bands of
+    polygons[i]. Polygons whose exterior has fewer than 3 points are
+    left out, as are such holes.
+    """
+    rings: list[np.ndarray] = []
+    ring_polygon: list[int] = []
+    polygon_band: list[int] = []
+    for band_index, (_, _, polygons) in enumerate(bands):
+        for polygon in polygons:
+            if polygon[0].shape[0] < 3:
+                continue
+            kept = [polygon[0], *(hole for hole in polygon[1:] if hole.shape[0] >= 3)]
+            rings.extend(kept)
+            ring_polygon.extend([len(polygon_band)] * len(kept))
+            polygon_band.append(band_index)
+    band = np.asarray(polygon_band, dtype=np.intp)
+    if not rings:
+        return np.empty(0, dtype=object), band
+    lengths = [ring.shape[0] for ring in rings]
+    linearrings = shapely.linearrings(
+        np.concatenate(rings), indices=np.repeat(np.arange(len(rings)), lengths)
+    )
+    return shapely.polygons(linearrings, indices=ring_polygon), band
+
+
+def repair_polygons(
+    polygons: np.ndarray, *, min_area: float | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """Valid, non-empty polygons of at least min_area, as array operations.
+
+    Returns (repaired, kept), kept being the indices into polygons of the
+    repaired ones. Invalid polygons are repaired with buffer(0) rather than
+    make_valid(): make_valid() keeps slivers and lines buffer(0) drops,
+    and the published contours have always been buffer(0)'s.
+    """
+    kept = np.arange(len(polygons))
+    invalid = ~shapely.is_valid(polygons)
+    if invalid.any():
+        polygons = polygons.copy()
+        polygons[invalid] = shapely.buffer(polygons[invalid], 0)
+    keep = ~shapely.is_empty(polygons)
+    if min_area:
+        keep &= shapely.area(polygons) >= min_area
+    return polygons[keep], kept[keep]
+
+
+def finish_polygons(
+    polygons: np.ndarray, *, simplify_tolerance: float | None = None, decimals: int = 4
+) -> tuple[np.ndarray, np.ndarray]:
+    """Simplified polygons, rounded to decimals; returns (finished, kept).
+
+    Coordinates are rounded with np.round rather than set_precision(),
+    which snaps to a grid and may merge or drop vertices the rounding
+    keeps.
+    """
+    kept = np.arange(len(polygons))
+    if simplify_tolerance:
+        polygons = shapely.simplify(polygons, simplify_tolerance, preserve_topology=True)
+        keep = ~shapely.is_empty(polygons)
+        polygons, kept = polygons[keep], kept[keep]
+    return shapely.transform(polygons, lambda coords: np.round(coords, decimals)), kept
+
+
+def clean_polygons(
+    polygons: np.ndarray,
+    *,
+    min_area: float | None = None,
+    simplify_tolerance: float | None = None,
+    decimals: int = 4,
+) -> tuple[np.ndarray, np.ndarray]:
+    """repair_polygons(), then finish_polygons(); returns (cleaned, kept)."""
+    repaired, kept = repair_polygons(polygons, min_area=min_area)
+    finished, finished_kept = finish_polygons(
+        repaired, simplify_tolerance=simplify_tolerance, decimals=decimals
+    )
+    return finished, kept[finished_kept]
+
+
+def polygon_rings(polygons: np.ndarray) -> tuple[np.ndarray, list, list, list, list]:
+    """The coordinates of a Polygon/MultiPolygon array and how they nest.
+
+    Returns (coords, ring_offsets, polygon_offsets, part_offsets, multi):
+    ring r is coords[ring_offsets[r]:ring_offsets[r + 1]] (closed), part
+    p has rings polygon_offsets[p] up to polygon_offsets[p + 1], and
+    geometry g has parts part_offsets[g] up to part_offsets[g + 1];
+    multi[g] is whether geometry g is a MultiPolygon.
+    """
+    if not len(polygons):
+        return np.empty((0, 2)), [0], [0], [0], []
+    _, coords, offsets = shapely.to_ragged_array(polygons)
+    if len(offsets) == 2:  # no MultiPolygons: every part is a whole polygon
+        ring_offsets, polygon_offsets = offsets
+        part_offsets = np.arange(len(polygons) + 1)
+    else:
+        ring_offsets, polygon_offsets, part_offsets = offsets
+    multi = shapely.get_type_id(polygons) == shapely.GeometryType.MULTIPOLYGON
+    return (
+        coords,
+        ring_offsets.tolist(),
+        polygon_offsets.tolist(),
+        part_offsets.tolist(),
+        multi.tolist(),
+    )
+
+
+def geojson_geometries(polygons: np.ndarray) -> list[dict]:
+    """GeoJSON geometry dicts of a Polygon/MultiPolygon array.
+
+    The same mappings geojson.Feature builds from __geo_interface__, so
+    json.dumps() of them matches geojson.dumps() byte for byte: that
+    includes its rounding of every coordinate to 6 decimals.
+    """
+    coords, ring_offsets, polygon_offsets, part_offsets, multi = polygon_rings(polygons)
+    coords = np.round(coords, GEOJSON_DECIMALS).tolist()
+    parts = [
+        [coords[ring_offsets[ring] : ring_offsets[ring + 1]] for ring in range(start, stop)]
+        for start, stop in zip(polygon_offsets[:-1], polygon_offsets[1:])
+    ]
+    geometries = []
+    for is_multi, start, stop in zip(multi, part_offsets[:-1], part_offsets[1:]):
+        if is_multi:
+            geometries.append({"type": "MultiPolygon", "coordinates": parts[start:stop]})
+        else:
+            geometries.append({"type": "Polygon", "coordinates": parts[start]})
+    return geometries
+
+
+def feature_collection_json(geometries: list[dict], properties: list[dict]) -> str:
+    """geojson.dumps(FeatureCollection) of the features, without geojson's objects."""
+    features = [
+        {"type": "Feature", "geometry": geometry, "properties": props}
+        for geometry, props in zip(geometries, properties)
+    ]
+    return json.dumps(
+        {"type": "FeatureCollection", "features": features}, allow_nan=False, ensure_ascii=False
+    )
+
+
+def tile_rows(rows: int, tiles: int) -> list[tuple[int, int]]:
+    """[start, stop) row ranges of tiles that share their edge rows.
+
+    Every tile gets at least MIN_TILE_ROWS rows, so a small grid gets
+    fewer tiles than asked for.
+    """
+    tiles = max(1, min(tiles, (rows - 1) // MIN_TILE_ROWS))
+    edges = np.linspace(0, rows - 1, tiles + 1).round().astype(int).tolist()
+    return [(start, stop + 1) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def _tile_polygons(x, y, z, levels, z_min, seams, clean):
+    """One tile's polygons: clean() of those clear of seams, and the rest as contoured."""
+    polygons, band = band_polygons(filled_bands(x, y, z, levels, z_min=z_min))
+    bounds = shapely.bounds(polygons)
+    on_seam = np.zeros(len(polygons), dtype=bool)
+    for seam in seams:
+        on_seam |= np.abs(bounds[:, 1] - seam) <= SEAM_TOLERANCE
+        on_seam |= np.abs(bounds[:, 3] - seam) <= SEAM_TOLERANCE
+    return clean(polygons[~on_seam], band[~on_seam]), polygons[on_seam], band[on_seam]
+
+
+def _snap_to_seams(pieces: np.ndarray, seams: list[float]) -> np.ndarray:
+    """pieces with their seam vertices exactly on the seam, twins made equal.
+
+    The two tiles meeting at a seam then share its edges exactly, and
+    union_all() dissolves them without slivers.
+    """
+    coords = shapely.get_coordinates(pieces)
+    for seam in seams:
+        on_seam = np.flatnonzero(np.abs(coords[:, 1] - seam) <= SEAM_TOLERANCE)
+        if not len(on_seam):
+            continue
+        order = on_seam[np.argsort(coords[on_seam, 0], kind="stable")]
+        x = coords[order, 0]
+        first = np.concatenate([[True], np.diff(x) > SEAM_TOLERANCE])
+        coords[order, 0] = x[first][np.cumsum(first) - 1]
+        coords[on_seam, 1] = seam
+    return shapely.set_coordinates(pieces.copy(), coords)
+
+
+def _band_order(polygons: np.ndarray, band: np.ndarray) -> np.ndarray:
+    """Indices sorting polygons by band, then by bounds and area.
+
+    Whatever order the tiles produced them in, the polygons of a band
+    come out in one order that depends only on their coordinates.
+    """
+    bounds = shapely.bounds(polygons).reshape(-1, 4)
+    return np.lexsort((shapely.area(polygons), *bounds.T[::-1], band))
+
+
+def contour_polygons(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    levels,
+    *,
+    min_area: float | None = None,
+    simplify_tolerance: float | None = None,
+    decimals: int = 4,
+    threads: int = 1,
+    unsimplified: bool = False,
+) -> tuple[np.ndarray, ...]:
+    """clean_polygons() of every band polygon, contoured in row tiles.
+
+    Returns (polygons, band), band[i] indexing the bands between levels.
+    With unsimplified=True it returns (polygons, band, outlines,
+    outline_band), outlines being the same polygons repaired and rounded
+    but not simplified (topology.py simplifies their shared arcs instead).
+
+    x and y are the 1-D axes of z. With threads > 1 the grid is split into
+    that many tiles of rows, each overlapping the next by one row, and the
+    tiles are contoured and cleaned on a thread pool. A cell's contours
+    depend only on its corners, so a tile's polygons are exactly the
+    single-pass ones cut at its edges; the pieces meeting at a seam are
+    unioned back together per band before they are cleaned. A stitched
+    polygon may start its rings at another vertex than the single-pass
+    one, and simplification depends on where a ring starts, so every
+    polygon is normalized (shapely.normalize()) before it is simplified,
+    and the result is sorted by band and then by position: any number of
+    threads gives the same polygons in the same order.
+
+    Threads suffice because Shapely releases the GIL while it repairs,
+    simplifies, rounds and unions, which is most of the time spent;
+    contourpy's mpl2014 generator holds it for the contouring itself.
+    """
+    levels = np.asarray(levels, dtype=np.float64)
+    z = np.ma.masked_invalid(z)
+    z_min = z.min() if z.count() else None
+    tiles = tile_rows(z.shape[0], threads)
+    seams = [float(y[start]) for start, _ in tiles[1:]]
+
+    def clean(polygons: np.ndarray, band: np.ndarray) -> tuple[np.ndarray, ...]:
+        repaired, kept = repair_polygons(polygons, min_area=min_area)
+        repaired = shapely.normalize(repaired)
+        band = band[kept]
+        finished, kept = finish_polygons(
+            repaired, simplify_tolerance=simplify_tolerance, decimals=decimals
+        )
+        if not unsimplified:
+            return finished, band[kept]
+        outlines, _ = finish_polygons(repaired, decimals=decimals)
+        return finished, band[kept], outlines, band
+
+    def tile(position: int):
+        start, stop = tiles[position]
+        tile_seams = seams[max(0, position - 1) : position + 1]
+        return _tile_polygons(x, y[start:stop], z[start:stop], levels, z_min, tile_seams, clean)
+
+    def stitch(pieces: np.ndarray, index: int) -> tuple[np.ndarray, ...]:
+        stitched = shapely.get_parts(shapely.union_all(_snap_to_seams(pieces, seams)))
+        return clean(stitched, np.full(len(stitched), index, dtype=np.intp))
+
+    with ThreadPoolExecutor(len(tiles)) as executor:
+        results = list(executor.map(tile, range(len(tiles))))
+        cleaned = [inner for inner, _, _ in results]
+        pieces = np.concatenate([np.empty(0, dtype=object), *(piece for _, piece, _ in results)])
+        piece_band = np.concatenate([np.empty(0, dtype=np.intp), *(b for _, _, b in results)])
+        indices = np.unique(piece_band).tolist()
+        cleaned.extend(
+            executor.map(stitch, [pieces[piece_band == index] for index in indices], indices)
+        )
+    merged = [np.concatenate(arrays) for arrays in zip(*cleaned)]
+    for position in range(0, len(merged), 2):
+        order = _band_order(*merged[position : position + 2])
+        merged[position] = merged[position][order]
+        merged[position + 1] = merged[position + 1][order]
+    return tuple(merged)
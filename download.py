@@ -0,0 +1,158 @@
+"""Streaming, resumable HTTP downloads to disk.
+
+GRIB files are written to ``<path>.part`` in fixed-size chunks rather
+than buffered whole in memory (NWPS CG1 files hold all 144 steps and run
+to hundreds of MB per pool worker). A retry after a dropped connection
+resumes with an HTTP Range request from the bytes already on disk. The
+request carries If-Range with the ETag (or Last-Modified) the transfer
+started with, so a file rewritten in between comes back whole (200) and
+replaces those bytes instead of being appended to them. The finished
+file is size-checked against what the server announced before being
+renamed into place, so a truncated transfer never masquerades as a
+complete GRIB.
+
+Given a DownloadCache (gribcache.py), the first request is conditional on
+the cached copy's validators and a 304 reuses that copy without a body.
+"""
+
+import logging
+import os
+import re
+
+import requests
+
+from gribcache import DownloadCache
+from transport import Transport
+
+logger = logging.getLogger("GFSWaveContours")
+
+# A dropped connection loses at most the chunk being read, so keep it
+# small enough that a resume re-fetches little, large enough to be cheap.
+CHUNK_SIZE = 64 * 1024
+
+# Ask for the raw bytes: requests would transparently decode a compressed
+# body, and then neither byte offsets nor Content-Length would line up.
+_IDENTITY = {"Accept-Encoding": "identity"}
+
+
+class IncompleteDownload(requests.RequestException):
+    """The body ended before the announced size; retry resumes it."""
+
+
+def _total_size(response: requests.Response) -> int | None:
+    """Full size of the resource from Content-Range, else Content-Length."""
+    match = re.match(r"bytes [\d*]+-?\d*/(\d+)", response.headers.get("Content-Range", ""))
+    if match:
+        return int(match.group(1))
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _if_range(validators) -> str | None:
+    """If-Range value for resuming a transfer that began with validators.
+
+    If-Range takes a strong ETag or a Last-Modified date; a weak ETag
+    cannot be used.
+    """
+    etag = validators.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return validators.get("Last-Modified")
+
+
+def write_chunks(response: requests.Response, file) -> int:
+    """Stream response's body into an open binary file; returns bytes written."""
+    written = 0
+    for chunk in response.iter_content(CHUNK_SIZE):
+        file.write(chunk)
+        written += len(chunk)
+    return written
+
+
+def grib_staging_dir(files_dir: str) -> str:
+    """Where raw GRIBs are downloaded: GRIB_STAGING_DIR, else files_dir.
+
+    Point GRIB_STAGING_DIR at a tmpfs to keep the download/decode churn
+    off a small disk; GRIBs are deleted once decoded either way, and only
+    rendered outputs are written to files_dir.
+    """
+    staging = os.environ.get("GRIB_STAGING_DIR") or files_dir
+    os.makedirs(staging, exist_ok=True)
+    return staging
+
+
+def download_file(
+    transport: Transport,
+    url: str,
+    file_path: str,
+    *,
+    attempts: int = 3,
+    timeout: float = 120,
+    label: str = "Download",
+    cache: DownloadCache | None = None,
+) -> bool:
+    """Stream url to file_path via a .part file; resume on retry.
+
+    Returns False after attempts failures, leaving any partial .part on
+    disk (the runner clears it before the next run). With a cache, an
+    unchanged file is placed from it and a changed one is stored in it.
+    """
+    tmp_path = file_path + ".part"
+    # A .part from an earlier, interrupted run may belong to another cycle
+    # (GFS file names carry no date); only resume bytes fetched by this call.
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+
+    cached = cache.lookup(url) if cache is not None else None
+    validators = {}
+    for attempt in range(1, attempts + 1):
+        offset = os.path.getsize(tmp_path) if os.path.exists(tmp_path) else 0
+        headers = dict(_IDENTITY)
+        if offset and _if_range(validators):
+            headers["Range"] = f"bytes={offset}-"
+            headers["If-Range"] = _if_range(validators)
+        elif offset:
+            # Nothing tells whether the file changed since; start over.
+            offset = 0
+        elif cached:
+            headers.update(DownloadCache.conditional_headers(cached))
+        try:
+            with transport.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if cached and response.status_code == 304:
+                    if cache.place(url, file_path):
+                        logger.debug("%s unchanged; reused cached copy", url)
+                        return True
+                    cached = None
+                    raise requests.RequestException("cached copy was evicted")
+                if offset and response.status_code == 416:
+                    # Everything was already on disk when the link dropped.
+                    total = _total_size(response)
+                    if total is None:
+                        raise IncompleteDownload("416 without a resource size")
+                else:
+                    response.raise_for_status()
+                    total = _total_size(response)
+                    if response.status_code != 206:
+                        # Fresh start, a server that ignored the Range, or
+                        # a file changed since the .part began (If-Range).
+                        offset = 0
+                    validators = response.headers
+                    with open(tmp_path, "ab" if offset else "wb") as file:
+                        write_chunks(response, file)
+            size = os.path.getsize(tmp_path)
+            if total is not None and size != total:
+                if size > total:
+                    # Not a tail we can extend; start over next attempt.
+                    os.remove(tmp_path)
+                raise IncompleteDownload(f"got {size} of {total} bytes")
+            os.replace(tmp_path, file_path)
+            if cache is not None:
+                cache.store(url, file_path, validators)
+            return True
+        except requests.RequestException as exc:
+            logger.warning(
+                "%s attempt %d/%d failed for %s: %s", label, attempt, attempts, url, exc
+            )
+    return False
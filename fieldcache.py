@@ -0,0 +1,278 @@
+"""On-disk cache of decoded GRIB fields for fast re-renders.
+
+pygrib decoding (14 messages per file, two files per forecast hour) is
+one of the heaviest stages of an hour, yet its output depends only on
+the GRIB bytes: contour smoothing, stride, simplification and arrow
+spacing are all applied afterwards. This cache stores the dicts returned
+by gfs_to_contours.read_wave_bytes() (swell and wind) as ``.npy`` files
+under ``<FIELD_CACHE_DIR>/<sha256 of the GRIB>.<kind>/``, so a rerun
+with other visual parameters skips decoding entirely. A dict's FieldCube
+is stored ocean-only: stacked wet-cell vectors plus the packed land mask
+(see landmask.py), expanded back to full grids on load. Any other array
+is one file, loaded memory-mapped (read-only).
+
+Workers also record which GRIB digests made up each forecast hour under
+``runs/<cycle>/<HHH>.json``; ``gfs_to_contours.py --rerender`` replays
+the newest recorded cycle from the cache without any network access.
+
+A cycle decodes to roughly 25 GB, so the cache is off unless
+FIELD_CACHE_BYTES sets a budget; least-recently-used entries are evicted
+beyond it. FIELD_CACHE_DIR defaults to cache/fields/ in this repository.
+"""
+
+import datetime as dt
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+import numpy as np
+
+from fieldcube import FieldCube
+from quantize import codec_for
+from landmask import dry_cells, static_wet_index
+
+logger = logging.getLogger("GFSWaveContours")
+
+_META = "meta.json"
+_CUBE = "_cube"
+KEEP_RUNS = 4
+# What gfs_to_contours.read_wave_file() returns per GRIB file.
+READ_KINDS = ("swell", "wind")
+
+
+def bytes_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _flatten(data: dict) -> tuple[dict[str, np.ndarray], dict]:
+    """Split an extracted-fields dict into named arrays and JSON metadata.
+
+    Lists of dicts (the swell partitions) become ``key.index.field``
+    names; an array referenced twice (``period`` is partition 1's period)
+    is stored once and recorded as an alias.
+    """
+    arrays: dict[str, np.ndarray] = {}
+    meta: dict = {"scalars": {}, "aliases": {}, "lists": {}, "dates": {}}
+    seen: dict[int, str] = {}
+
+    def put(name: str, value) -> None:
+        if isinstance(value, np.ndarray):
+            if id(value) in seen:
+                meta["aliases"][name] = seen[id(value)]
+            else:
+                seen[id(value)] = name
+                arrays[name] = value
+        elif isinstance(value, dt.datetime):
+            meta["dates"][name] = value.isoformat()
+        else:
+            meta["scalars"][name] = value
+
+    for key, value in data.items():
+        if isinstance(value, list):
+            meta["lists"][key] = len(value)
+            for index, item in enumerate(value):
+                for field, field_value in item.items():
+                    put(f"{key}.{index}.{field}", field_value)
+        else:
+            put(key, value)
+    return arrays, meta
+
+
+def _unflatten(arrays: dict[str, np.ndarray], meta: dict) -> dict:
+    flat: dict = dict(arrays)
+    flat.update(meta["scalars"])
+    for name, value in meta["dates"].items():
+        flat[name] = dt.datetime.fromisoformat(value)
+    for name, target in meta["aliases"].items():
+        flat[name] = flat[target]
+    data: dict = {key: [{} for _ in range(count)] for key, count in meta["lists"].items()}
+    for name, value in flat.items():
+        key, _, rest = name.partition(".")
+        if rest:
+            index, _, field = rest.partition(".")
+            data[key][int(index)][field] = value
+        else:
+            data[name] = value
+    return data
+
+
+def _compact_cube(cube: FieldCube, kind: str) -> dict[str, np.ndarray]:
+    """A FieldCube as stacked wet-cell vectors plus its packed dry mask.
+
+    Static land and ice cells (dry_cells()) are left out of the values
+    and masks, about 30% of a global grid; load restores them exactly.
+    Swell and wind cubes have different dry cells, so each kind keeps
+    its own WetIndex.
+    """
+    dry = dry_cells(cube)
+    wet = static_wet_index(("fieldcache", kind, cube.shape), dry)
+    return {
+        f"{_CUBE}.dry": wet.packed,
+        f"{_CUBE}.values": wet.compress(cube.values),
+        f"{_CUBE}.masks": np.packbits(wet.compress(cube.unpacked_masks()), axis=-1),
+        f"{_CUBE}.coded": wet.compress(cube.coded),
+    }
+
+
+def _load_cube(entry: str, meta: dict, kind: str) -> FieldCube:
+    def part(name: str) -> np.ndarray:
+        return np.load(os.path.join(entry, f"{_CUBE}.{name}.npy"), mmap_mode="r")
+
+    shape = tuple(meta["wet_shape"])
+    dry = np.unpackbits(part("dry"), count=shape[0] * shape[1]).view(bool).reshape(shape)
+    wet = static_wet_index(("fieldcache", kind, shape), dry)
+    masks = part("masks")
+    unpacked = np.unpackbits(masks, axis=-1, count=wet.size).view(bool)
+    coded_fields = meta["cube"].get("coded_fields", [])
+    # Dry cells of a coded field hold its NaN sentinel.
+    sentinels = np.array(
+        [codec_for(name).sentinel for name in coded_fields], dtype=np.int64
+    ).astype(np.uint16)
+    return FieldCube(
+        wet.expand(part("values"), np.nan),
+        None,
+        coded=wet.expand(part("coded"), sentinels),
+        unpacked=wet.expand(unpacked, True),
+        **meta["cube"],
+    )
+
+
+class FieldCache:
+    """Decoded fields keyed by GRIB content digest and kind ("swell", "wind")."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _entry(self, digest: str, kind: str) -> str:
+        return os.path.join(self.directory, f"{digest[:32]}.{kind}")
+
+    def load(self, digest: str, kind: str) -> dict | None:
+        entry = self._entry(digest, kind)
+        try:
+            with open(os.path.join(entry, _META)) as f:
+                meta = json.load(f)
+            arrays = {
+                name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r")
+                for name in meta["arrays"]
+            }
+            cube = _load_cube(entry, meta, kind) if "cube" in meta else None
+        except (OSError, ValueError, KeyError):
+            return None
+        meta["last_used"] = time.time()
+        try:
+            _write_json(os.path.join(entry, _META), meta)
+        except OSError:
+            pass
+        data = _unflatten(arrays, meta)
+        return cube.into(data) if cube is not None else data
+
+    def save(self, digest: str, kind: str, data: dict) -> None:
+        entry = self._entry(digest, kind)
+        if os.path.exists(os.path.join(entry, _META)):
+            return
+        cube = data.get("cube")
+        arrays, meta = _flatten(cube.strip(data) if cube is not None else data)
+        files = dict(arrays)
+        if cube is not None:
+            meta["cube"] = cube.meta()
+            meta["wet_shape"] = list(cube.shape)
+            files.update(_compact_cube(cube, kind))
+        tmp_entry = f"{entry}.{os.getpid()}.tmp"
+        try:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            os.makedirs(tmp_entry)
+            for name, array in files.items():
+                np.save(os.path.join(tmp_entry, f"{name}.npy"), array)
+            meta["arrays"] = sorted(arrays)
+            meta["size"] = sum(array.nbytes for array in files.values())
+            meta["last_used"] = time.time()
+            _write_json(os.path.join(tmp_entry, _META), meta)
+            os.rename(tmp_entry, entry)
+        except OSError as exc:
+            # Most often another worker stored the same file first.
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+            if not os.path.exists(os.path.join(entry, _META)):
+                logger.warning("Could not cache decoded fields %s: %s", entry, exc)
+            return
+        self.evict()
+
+    def extract(self, data: bytes, read) -> tuple[dict[str, dict], str]:
+        """read(data) -> {kind: fields} through the cache; returns (that, digest)."""
+        digest = bytes_digest(data)
+        fields = {kind: self.load(digest, kind) for kind in READ_KINDS}
+        if any(value is None for value in fields.values()):
+            fields = read(data)
+            for kind, data in fields.items():
+                self.save(digest, kind, data)
+        return fields, digest
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until within max_bytes."""
+        entries = []
+        total = 0
+        for meta_path in glob.glob(os.path.join(self.directory, f"*.*/{_META}")):
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            size = int(meta.get("size", 0))
+            entries.append((float(meta.get("last_used", 0)), size, os.path.dirname(meta_path)))
+            total += size
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    # -- run manifests --------------------------------------------------
+
+    def record_hour(self, cycle: str, file_index: str, digests: dict[str, str]) -> None:
+        """Note which GRIBs ({grid: digest}) made up one forecast hour."""
+        run_dir = os.path.join(self.directory, "runs", cycle)
+        if not os.path.isdir(run_dir):
+            os.makedirs(run_dir, exist_ok=True)
+            # Manifests are tiny, but one directory per cycle adds up.
+            runs = sorted(glob.glob(os.path.join(self.directory, "runs", "*")))
+            for old_run in runs[:-KEEP_RUNS]:
+                shutil.rmtree(old_run, ignore_errors=True)
+        _write_json(os.path.join(run_dir, f"{file_index}.json"), digests)
+
+    def latest_run(self) -> tuple[str, dict[str, dict[str, str]]] | None:
+        """(cycle, {file_index: {grid: digest}}) of the newest recorded cycle."""
+        runs = sorted(glob.glob(os.path.join(self.directory, "runs", "*")))
+        if not runs:
+            return None
+        hours = {}
+        for path in sorted(glob.glob(os.path.join(runs[-1], "*.json"))):
+            with open(path) as f:
+                hours[os.path.basename(path)[: -len(".json")]] = json.load(f)
+        return os.path.basename(runs[-1]), hours
+
+
+def _write_json(path: str, payload) -> None:
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+
+def get_field_cache() -> FieldCache | None:
+    """The cache configured by FIELD_CACHE_DIR / FIELD_CACHE_BYTES, or None."""
+    max_bytes = int(float(os.environ.get("FIELD_CACHE_BYTES") or 0))
+    if max_bytes <= 0:
+        return None
+    directory = os.environ.get("FIELD_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "cache", "fields"
+    )
+    try:
+        return FieldCache(directory, max_bytes)
+    except OSError as exc:
+        logger.warning("Field cache disabled (%s): %s", directory, exc)
+        return None
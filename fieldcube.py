@@ -0,0 +1,234 @@
+"""Per-hour grids stacked into one (field, lat, lon) array.
+
+A decoded GFS-Wave file is 10 float fields (combined height plus height,
+period and direction of three swell partitions) and 4 masks; wind adds 4
+more fields and a mask. As separate arrays each one costs an allocation
+and a fancy-index gather per composite. A FieldCube stores the float
+fields as one contiguous float32 (field, lat, lon) array with a name
+index, and the boolean masks as one bit-packed (mask, lat, ceil(lon/8))
+uint8 plane, so a composite is one gather per source. Masks are
+unpacked at most once per cube and kept that way, and a cube built from
+unpacked masks (a composite, a cache load) packs them only when the
+packed plane is asked for, for storage or a digest.
+
+The writers keep consuming the familiar dicts: FieldCube.into() fills one
+with views into the cube (masks unpacked to bool, quantized fields as
+decoding QuantizedField wrappers). Names are the flattened keys
+fieldcache.py also uses: ``height`` for top-level arrays,
+``swell_partitions.0.period`` for items of a list.
+"""
+
+import numpy as np
+
+from quantize import QuantizedField, codec_for
+
+# Coordinates are shared between dicts and stay outside the cube.
+GRID_KEYS = ("lon", "lat")
+
+
+def _leaves(data: dict):
+    for key, value in data.items():
+        if isinstance(value, list):
+            for index, item in enumerate(value):
+                for field, field_value in item.items():
+                    yield f"{key}.{index}.{field}", field_value
+        else:
+            yield key, value
+
+
+def _assign(data: dict, name: str, value) -> None:
+    key, _, rest = name.partition(".")
+    if rest:
+        index, _, field = rest.partition(".")
+        data[key][int(index)][field] = value
+    else:
+        data[key] = value
+
+
+def _remove(data: dict, name: str) -> None:
+    key, _, rest = name.partition(".")
+    if rest:
+        index, _, field = rest.partition(".")
+        data[key][int(index)].pop(field, None)
+    else:
+        data.pop(key, None)
+
+
+def _structure_copy(data: dict) -> dict:
+    return {
+        key: [dict(item) for item in value] if isinstance(value, list) else value
+        for key, value in data.items()
+    }
+
+
+def pack_masks(masks: np.ndarray) -> np.ndarray:
+    """Bit-pack a (mask, lat, lon) bool stack along longitude."""
+    return np.packbits(masks, axis=-1)
+
+
+class FieldCube:
+    """Float fields and boolean masks of one grid, stacked by name.
+
+    aliases maps extra names to stacked ones (the swell dict's ``period``
+    is partition 1's period) so they come back as the same view.
+
+    coded holds fields quantized to 16 bits (see quantize.py and
+    quantized()) as one uint16 (field, lat, lon) stack; signed codes are
+    stored bit-for-bit and viewed as int16 per plane.
+
+    masks may be None when unpacked, the same masks as a (mask, lat, lon)
+    bool stack, is given instead.
+    """
+
+    def __init__(
+        self,
+        values: np.ndarray,
+        masks: np.ndarray | None,
+        fields,
+        mask_fields,
+        aliases: dict[str, str] | None = None,
+        coded: np.ndarray | None = None,
+        coded_fields=(),
+        unpacked: np.ndarray | None = None,
+    ):
+        if masks is None and unpacked is None:
+            raise ValueError("FieldCube needs packed or unpacked masks")
+        self.values = values
+        self._masks = masks
+        self._unpacked = unpacked
+        self.fields = tuple(fields)
+        self.mask_fields = tuple(mask_fields)
+        self.aliases = dict(aliases or {})
+        self.coded_fields = tuple(coded_fields)
+        if coded is None:
+            coded = np.empty((0, *values.shape[1:]), dtype=np.uint16)
+        self.coded = coded
+        self.codecs = tuple(codec_for(name) for name in self.coded_fields)
+        self._index = {name: index for index, name in enumerate(self.fields)}
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.values.shape[1:]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FieldCube":
+        """Stack every 2-D array of an extracted-fields dict.
+
+        Bool arrays become masks, everything else a float32 field; an
+        array referenced under two names is stacked once.
+        """
+        fields: dict[str, np.ndarray] = {}
+        masks: dict[str, np.ndarray] = {}
+        aliases: dict[str, str] = {}
+        seen: dict[int, str] = {}
+        for name, value in _leaves(data):
+            if name in GRID_KEYS or not isinstance(value, np.ndarray) or value.ndim != 2:
+                continue
+            if id(value) in seen:
+                aliases[name] = seen[id(value)]
+                continue
+            seen[id(value)] = name
+            (masks if value.dtype == bool else fields)[name] = value
+        if not fields:
+            raise ValueError("No 2-D fields to stack")
+
+        shape = next(iter(fields.values())).shape
+        values = np.empty((len(fields), *shape), dtype=np.float32)
+        for plane, array in zip(values, fields.values()):
+            plane[...] = array
+        stacked = np.empty((len(masks), *shape), dtype=bool)
+        for plane, mask in zip(stacked, masks.values()):
+            plane[...] = mask
+        return cls(values, pack_masks(stacked), fields, masks, aliases)
+
+    @classmethod
+    def of(cls, data: dict) -> "FieldCube":
+        """data's cube, stacking one for dicts built without it."""
+        cube = data.get("cube")
+        return cube if cube is not None else cls.from_dict(data)
+
+    def field(self, name: str) -> np.ndarray:
+        return self.values[self._index[name]]
+
+    @property
+    def masks(self) -> np.ndarray:
+        """The (mask, lat, ceil(lon/8)) bit-packed mask plane."""
+        if self._masks is None:
+            self._masks = pack_masks(self._unpacked)
+        return self._masks
+
+    def unpacked_masks(self) -> np.ndarray:
+        """(mask, lat, lon) bool stack of the masks, unpacked once and kept."""
+        if self._unpacked is None:
+            self._unpacked = np.unpackbits(self._masks, axis=-1, count=self.shape[1]).view(bool)
+        return self._unpacked
+
+    def code_planes(self) -> list[np.ndarray]:
+        """Each coded field's codes in its codec's dtype (views)."""
+        return [plane.view(codec.dtype) for plane, codec in zip(self.coded, self.codecs)]
+
+    def quantized(self, names) -> "FieldCube":
+        """A cube with the named float fields moved into the coded stack."""
+        selected = set(names)
+        names = [name for name in self.fields if name in selected]
+        kept = [name for name in self.fields if name not in selected]
+        coded = np.empty((len(self.coded_fields) + len(names), *self.shape), np.uint16)
+        coded[: len(self.coded_fields)] = self.coded
+        for plane, name in zip(coded[len(self.coded_fields) :], names):
+            codec = codec_for(name)
+            plane.view(codec.dtype)[...] = codec.encode(self.field(name))
+        values = self.values[[self._index[name] for name in kept]]
+        return FieldCube(
+            values, self._masks, kept, self.mask_fields, self.aliases,
+            coded, (*self.coded_fields, *names), self._unpacked,
+        )
+
+    def same_layout(self, other: "FieldCube") -> bool:
+        return (self.fields, self.mask_fields, self.coded_fields) == (
+            other.fields, other.mask_fields, other.coded_fields
+        )
+
+    def meta(self) -> dict:
+        """JSON-serializable layout; FieldCube(values, masks, **meta) rebuilds it."""
+        return {
+            "fields": list(self.fields),
+            "mask_fields": list(self.mask_fields),
+            "aliases": self.aliases,
+            "coded_fields": list(self.coded_fields),
+        }
+
+    def into(self, data: dict) -> dict:
+        """A copy of data whose stacked entries are views into this cube.
+
+        Everything else (coordinates, valid_date, partition sequence
+        numbers) is carried over from data; ``cube`` is set to self.
+        """
+        out = _structure_copy(data)
+        named = dict(zip(self.fields, self.values))
+        named.update(zip(self.mask_fields, self.unpacked_masks()))
+        for name, codes, codec in zip(self.coded_fields, self.code_planes(), self.codecs):
+            named[name] = QuantizedField(codes, codec)
+        for name, target in self.aliases.items():
+            named[name] = named[target]
+        for name, array in named.items():
+            _assign(out, name, array)
+        out["cube"] = self
+        return out
+
+    def strip(self, data: dict) -> dict:
+        """A copy of data without the entries this cube holds (nor ``cube``)."""
+        out = _structure_copy(data)
+        for name in (*self.fields, *self.mask_fields, *self.coded_fields, *self.aliases):
+            _remove(out, name)
+        out.pop("cube", None)
+        return out
+
+
+def stacked(data: dict) -> dict:
+    """data with its arrays moved into a FieldCube (see FieldCube.into)."""
+    return FieldCube.from_dict(data).into(data)
+
+
+def quantized(data: dict, names) -> dict:
+    """A stacked dict with the named fields stored as 16-bit codes."""
+    return data["cube"].quantized(names).into(data)
@@ -0,0 +1,161 @@
+"""Read-only grid geometry shared by pool workers through mapped files.
+
+Every worker process needs the same derived geometry each hour: the
+lon/lat axes of each GRIB grid, the regrid plans (composite.py), the
+wet-cell index of the land mask and its smoothing weights (landmask.py),
+the heatmap's Mercator row map. Computed per process, each worker pays
+for them again and holds its own copy. shared_arrays() stores each entry
+once as ``.npy`` files under ``<directory>/<digest of key>/`` and every
+process maps them read-only (np.load(mmap_mode="r")), so the workers
+share one copy in the page cache and another worker adds only its
+per-hour working memory.
+
+The first process to need an entry builds it while holding a lock file;
+workers asking for it meanwhile wait and then map the result instead of
+building it too. Entries outlive the run, so the next cycle's workers
+map them straight away. Whenever a new entry is written, the others in
+its directory are pruned: one unused for PRUNE_DAYS days (the land mask
+of an old ice edge, say) is removed, then the least recently used go
+until the directory is within GEOMETRY_CACHE_BYTES (default 1 GB per
+directory; a wet-cell index is 20-45 MB, and drifting masks add one per
+cycle). Build directories left by a killed process are removed once
+they are TMP_MAX_AGE old.
+
+GEOMETRY_CACHE_DIR defaults to cache/geometry/ in this repository.
+"""
+
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from collections.abc import Callable, Hashable
+
+import numpy as np
+
+logger = logging.getLogger("GFSWaveContours")
+
+PRUNE_DAYS = 7
+DEFAULT_CACHE_BYTES = 1_000_000_000
+# A build directory this old belongs to a process that died mid-write.
+TMP_MAX_AGE = 3600
+_ENTRY = re.compile(r"[0-9a-f]{16}")
+_TMP = re.compile(r"[0-9a-f]{16}\.\d+\.tmp")
+_MAPPED: dict[tuple[str, str], dict[str, np.ndarray]] = {}
+
+
+def geometry_directory(kind: str) -> str:
+    root = os.environ.get("GEOMETRY_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "cache", "geometry"
+    )
+    return os.path.join(root, kind)
+
+
+def key_digest(key: Hashable) -> str:
+    return hashlib.sha1(repr(key).encode()).hexdigest()[:16]
+
+
+def _attach(entry: str) -> dict[str, np.ndarray]:
+    names = sorted(name[: -len(".npy")] for name in os.listdir(entry) if name.endswith(".npy"))
+    arrays = {
+        name: np.load(os.path.join(entry, f"{name}.npy"), mmap_mode="r") for name in names
+    }
+    try:
+        os.utime(entry)  # last use, for _prune()
+    except OSError:
+        pass
+    return arrays
+
+
+def _frozen(arrays: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    for array in arrays.values():
+        array.flags.writeable = False
+    return arrays
+
+
+def _max_bytes() -> int:
+    return int(float(os.environ.get("GEOMETRY_CACHE_BYTES") or DEFAULT_CACHE_BYTES))
+
+
+def _entry_size(path: str) -> int:
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _prune(directory: str, keep: str) -> None:
+    """Drop stale entries and build leftovers, then LRU entries past the size bound."""
+    now = time.time()
+    entries = []
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if _TMP.fullmatch(name):
+                if os.path.getmtime(path) < now - TMP_MAX_AGE:
+                    shutil.rmtree(path)
+            elif _ENTRY.fullmatch(name) and path != keep:
+                entries.append((os.path.getmtime(path), _entry_size(path), path))
+        except OSError:
+            pass
+    try:
+        total = _entry_size(keep)
+    except OSError:
+        total = 0
+    total += sum(size for _, size, _ in entries)
+    max_bytes = _max_bytes()
+    for last_used, size, path in sorted(entries):
+        if last_used >= now - PRUNE_DAYS * 86400 and total <= max_bytes:
+            break
+        try:
+            shutil.rmtree(path)
+            os.remove(f"{path}.lock")
+        except OSError:
+            pass
+        total -= size
+
+
+def _store(directory: str, entry: str, build) -> dict[str, np.ndarray]:
+    try:
+        os.makedirs(directory, exist_ok=True)
+        lock = open(f"{entry}.lock", "w")
+    except OSError as exc:
+        logger.debug("Could not share geometry %s: %s", entry, exc)
+        return _frozen(build())
+    with lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if os.path.isdir(entry):  # built by another process while we waited
+            return _attach(entry)
+        arrays = build()
+        tmp_path = f"{entry}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(array))
+            os.replace(tmp_path, entry)
+        except OSError as exc:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            logger.debug("Could not share geometry %s: %s", entry, exc)
+            return _frozen(arrays)
+    _prune(directory, entry)
+    return _attach(entry)
+
+
+def shared_arrays(
+    directory: str, key: Hashable, build: Callable[[], dict[str, np.ndarray]]
+) -> dict[str, np.ndarray]:
+    """build()'s arrays for key, mapped read-only from directory.
+
+    Memoized per process. build() runs only if no process has stored key
+    yet; if directory is not writable its result is used unshared.
+    """
+    digest = key_digest(key)
+    arrays = _MAPPED.get((directory, digest))
+    if arrays is not None:
+        return arrays
+    entry = os.path.join(directory, digest)
+    try:
+        arrays = _attach(entry)
+    except (OSError, ValueError):
+        arrays = _store(directory, entry, build)
+    _MAPPED[(directory, digest)] = arrays
+    return arrays
@@ -1,35 +1,48 @@
+import argparse
 import gzip
 import os
 import json
 import logging
 import logging.handlers
 import sys
-from concurrent.futures import ProcessPoolExecutor, as_completed
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import datetime, timedelta
 from functools import partial
 import datetime as dt
 
 import numpy as np
 import pygrib
-import requests
 import geojson
 
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-from matplotlib.path import Path
 
 from PIL import Image as PILImage
 
 from geojson import Feature, FeatureCollection
-from shapely.geometry import Polygon
-from shapely.ops import transform as shapely_transform
 from scipy.ndimage import gaussian_filter
 
+from admission import Admission, cap_threads, map_admitted, measured, usable_cpus
+from buffers import BufferArena, scratch, worker_arena
 from composite import composite_swell, composite_wind
+from contours import contour_polygons, feature_collection_json, geojson_geometries
+from download import download_file, grib_staging_dir
+from fieldcache import get_field_cache
+from fieldcube import FieldCube, quantized, stacked
+from geometrycache import geometry_directory, shared_arrays
+from grid import grid_axes, grid_points, latlon_axes, nearest_index
+from inventory import download_subset
+from landmask import WetIndex, cube_wet_index, sample_cells, static_wet_index
 from nwps import process_nwps_domains
+from quantize import quantize_enabled
 from tides import write_tides
-from wind import extract_wind, write_wind_arrows
+from topology import topology_json
+from transport import Transport, get_transport, newest_published, url_exists
+from wind import WIND_NAMES, check_valid_times, wind_from_messages, write_wind_arrows
 
 logger = logging.getLogger("GFSWaveContours")
 logger.setLevel(logging.INFO)
@@ -40,6 +53,24 @@ _GRID_CACHE: dict[tuple, tuple[np.ndarray, np.ndarray]] = {}
 # grid only spans 15S-52.5N, the coarse one is pole-to-pole (see
 # composite.py for why the other regional products are not used).
 GLOBAL_GRIDS = ("global.0p16", "global.0p25")
+GFS_BASE_URL = "https://nomads.ncep.noaa.gov/pub/data/nccf/com/gfs/prod"
+
+# Run discovery probes every cycle of the last DISCOVERY_DAYS days at once.
+DISCOVERY_DAYS = 3
+
+# Exit status of `gfs_to_contours.py --check` when the newest complete
+# cycle is the one already published; run.sh then stops without touching
+# FILES_DIR. (1 and 2 are failed runs, see main().)
+NOTHING_NEW_EXIT = 3
+LAST_PUBLISHED_FILE = "last_published.json"
+
+# Progressive ingestion (PROGRESSIVE=1): start on the newest cycle whose
+# f000 exists and poll for each later hour, backing off from
+# POLL_INITIAL_SECONDS to POLL_MAX_SECONDS, for at most
+# PROGRESSIVE_TIMEOUT_HOURS before rendering whatever has arrived.
+POLL_INITIAL_SECONDS = 20.0
+POLL_MAX_SECONDS = 300.0
+DEFAULT_PROGRESSIVE_TIMEOUT_HOURS = 6.0
 
 # Height bands shared with the frontend color scale and legend (meters).
 # Levels must be identical for every forecast hour: per-file derived levels
@@ -103,37 +134,80 @@ def _grid_cache_key(msg) -> tuple:
 
 
 def _get_lat_lon_grid(msg) -> tuple[np.ndarray, np.ndarray]:
+    """(lon, lat) of msg's grid: 1-D axes for regular grids (see latlon_axes).
+
+    Grids whose key is complete are shared between workers (see
+    geometrycache.py), so msg.latlons() runs once per grid, not per worker.
+    """
     key = _grid_cache_key(msg)
     cached = _GRID_CACHE.get(key)
     if cached is not None:
         return cached
-    lats, lons = msg.latlons()
-    grid = (np.array(lons, dtype=np.float32), np.array(lats, dtype=np.float32))
+    if None in key:
+        grid = latlon_axes(*msg.latlons())
+    else:
+        arrays = shared_arrays(
+            geometry_directory("grids"),
+            key,
+            lambda: dict(zip(("lon", "lat"), latlon_axes(*msg.latlons()))),
+        )
+        grid = (arrays["lon"], arrays["lat"])
     _GRID_CACHE[key] = grid
     return grid
 
 
-def _gaussian_filter_nan(array: np.ndarray, sigma: float) -> np.ndarray:
+def _gaussian_filter_nan(
+    array: np.ndarray, sigma: float, *, arena: BufferArena | None = None
+) -> np.ndarray:
+    """NaN-aware gaussian smoothing; temporaries (and the result) come from arena."""
     if not sigma or sigma <= 0:
         return array
-    if np.isnan(array).all():
+    nan_mask = np.isnan(array, out=scratch(arena, "smooth_nan", array.shape, bool))
+    if nan_mask.all():
         return array
-    nan_mask = np.isnan(array)
-    filled = np.where(nan_mask, 0.0, array)
-    filtered = gaussian_filter(filled, sigma=sigma, mode="nearest")
+    # The NaN (land and ice) mask is the same every hour, so the
+    # normalization weights are computed once per mask and sigma. They are
+    # NaN on dry cells, which one division then sets back to NaN.
+    wet = static_wet_index(("smoothing", array.shape), nan_mask)
+    weights = wet.derived(("grid weights", sigma), lambda: _smoothing_weights(nan_mask, sigma))
+    filled = scratch(arena, "smooth_filled", array.shape, array.dtype)
+    np.copyto(filled, array)
+    np.copyto(filled, 0.0, where=nan_mask)
+    filtered = gaussian_filter(
+        filled,
+        sigma=sigma,
+        mode="nearest",
+        output=scratch(arena, "smooth_filtered", array.shape, filled.dtype),
+    )
+    # Normalize wet cells only; land and ice stay NaN. (The weighted
+    # filter extrapolates values into masked cells near the coast; keeping
+    # those makes the contour polygons spill onto land in the map.)
+    return np.divide(
+        filtered,
+        weights,
+        out=scratch(arena, "smooth_result", array.shape, filtered.dtype),
+    )
+
+
+def _smoothing_weights(nan_mask: np.ndarray, sigma: float) -> np.ndarray:
+    """Gaussian-filtered wet fraction around each cell, NaN on the masked cells."""
     weights = gaussian_filter((~nan_mask).astype(np.float32), sigma=sigma, mode="nearest")
-    with np.errstate(invalid="ignore", divide="ignore"):
-        filtered = np.divide(
-            filtered,
-            weights,
-            out=np.full_like(filtered, np.nan),
-            where=weights > 0,
-        )
-    # Keep land cells NaN. The weighted filter extrapolates values into
-    # masked cells near the coast; leaving those in makes the contour
-    # polygons spill onto land in the map.
-    filtered[nan_mask] = np.nan
-    return filtered
+    weights[nan_mask] = np.nan
+    return weights
+
+
+def _masked_grid(
+    data: dict, arena: BufferArena | None, name: str
+) -> np.ndarray:
+    """data's height with masked cells NaN, in arena's buffer for name."""
+    height = data["height"].astype(np.float32, copy=False)
+    mask = data.get("height_mask")
+    if mask is None:
+        return height
+    grid = scratch(arena, name, height.shape, np.float32)
+    np.copyto(grid, height)
+    grid[mask] = np.nan
+    return grid
 
 
 _progress_tty = None
@@ -177,6 +251,7 @@ def render_heatmap_png(
     *,
     rows_scale: float = 2.0,
     alpha: np.ndarray | None = None,
+    arena: BufferArena | None = None,
 ) -> dict:
     """Render the height field as a continuous-color PNG heatmap.
 
@@ -189,13 +264,14 @@ def render_heatmap_png(
     the height grid) and switches the output from indexed-palette to RGBA —
     the nearshore mosaics use it to feather their offshore edges into the
     global layer underneath instead of cutting off in a hard line.
+
+    arena, if given, supplies the full-size temporaries (see buffers.py).
     """
-    height = data["height"].astype(np.float32, copy=False)
-    mask = data.get("height_mask")
-    grid = np.where(mask, np.nan, height) if mask is not None else height
+    grid = _masked_grid(data, arena, "heatmap_grid")
 
-    lats = data["lat"][:, 0].astype(np.float64)
-    lons = data["lon"][0, :].astype(np.float64)
+    lon_axis, lat_axis = grid_axes(data)
+    lats = lat_axis.astype(np.float64)
+    lons = lon_axis.astype(np.float64)
     if lats[0] < lats[-1]:  # rows must run north -> south for the image
         lats = lats[::-1]
         grid = grid[::-1, :]
@@ -206,19 +282,30 @@ def render_heatmap_png(
         return np.log(np.tan(np.pi / 4 + np.radians(lat_deg) / 2))
 
     n_rows = int(grid.shape[0] * rows_scale)
-    y_targets = np.linspace(merc_y(lats[0]), merc_y(lats[-1]), n_rows)
-    target_lats = np.degrees(2 * np.arctan(np.exp(y_targets)) - np.pi / 2)
-    # Nearest source row per target row keeps the land/sea edge crisp.
-    src_rows = np.abs(target_lats[:, None] - lats[None, :]).argmin(axis=1)
-    warped = grid[src_rows, :]
 
-    colors = np.array([_hex_to_rgb(c) for c in HEATMAP_COLORS], dtype=np.float64)
-    values = np.clip(
-        np.nan_to_num(warped, nan=HEATMAP_ANCHORS[0]),
-        HEATMAP_ANCHORS[0],
-        HEATMAP_ANCHORS[-1],
+    def build_row_map() -> dict[str, np.ndarray]:
+        y_targets = np.linspace(merc_y(lats[0]), merc_y(lats[-1]), n_rows)
+        target_lats = np.degrees(2 * np.arctan(np.exp(y_targets)) - np.pi / 2)
+        # Nearest source row per target row keeps the land/sea edge crisp.
+        return {"src_rows": nearest_index(lats, target_lats)}
+
+    src_rows = shared_arrays(
+        geometry_directory("heatmap"), (lats.tobytes(), n_rows), build_row_map
+    )["src_rows"]
+    warped = np.take(
+        grid,
+        src_rows,
+        axis=0,
+        out=scratch(arena, "heatmap_warped", (n_rows, grid.shape[1]), grid.dtype),
     )
 
+    colors = np.array([_hex_to_rgb(c) for c in HEATMAP_COLORS], dtype=np.float64)
+    # Ramp positions in float64, computed in place in one buffer.
+    values = scratch(arena, "heatmap_values", warped.shape, np.float64)
+    np.copyto(values, warped)
+    np.nan_to_num(values, copy=False, nan=HEATMAP_ANCHORS[0])
+    np.clip(values, HEATMAP_ANCHORS[0], HEATMAP_ANCHORS[-1], out=values)
+
     # Write an indexed-color PNG with a palette built directly from the ramp:
     # index 0 is transparent land, indices 1..255 are evenly spaced ramp
     # steps (~0.04 m apart). Letting Pillow *derive* a palette (quantize) is
@@ -233,8 +320,13 @@ def render_heatmap_png(
             ramp_values, HEATMAP_ANCHORS, colors[:, channel]
         ).astype(np.uint8)
 
-    fraction = (values - HEATMAP_ANCHORS[0]) / (HEATMAP_ANCHORS[-1] - HEATMAP_ANCHORS[0])
-    indices = (1 + np.round(fraction * (steps - 1))).astype(np.uint8)
+    values -= HEATMAP_ANCHORS[0]
+    values /= HEATMAP_ANCHORS[-1] - HEATMAP_ANCHORS[0]
+    values *= steps - 1
+    np.round(values, out=values)
+    values += 1
+    indices = scratch(arena, "heatmap_indices", values.shape, np.uint8)
+    np.copyto(indices, values, casting="unsafe")
     indices[np.isnan(warped)] = 0
 
     if alpha is not None:
@@ -259,6 +351,7 @@ def render_heatmap_png(
 
 
 def _write_geojson(payload: str, geojson_path: str) -> None:
+    """Write payload (GeoJSON or TopoJSON) and its gzip sibling."""
     with open(geojson_path, "w") as f:
         f.write(payload)
     # Precompressed sibling; the web app serves it when clients accept gzip.
@@ -266,74 +359,149 @@ def _write_geojson(payload: str, geojson_path: str) -> None:
         f.write(payload)
 
 
+SWELL_HEIGHT_NAME = "Significant height of total swell"
+SWELL_PERIOD_NAME = "Mean period of total swell"
+SWELL_DIRECTION_NAME = "Direction of swell waves"
+COMBINED_HEIGHT_NAME = "Significant height of combined wind waves and swell"
+SWELL_NAMES = (
+    SWELL_HEIGHT_NAME, SWELL_PERIOD_NAME, SWELL_DIRECTION_NAME, COMBINED_HEIGHT_NAME
+)
+
+
+def _swell_from_messages(messages: dict[str, list], filepath: str) -> dict:
+    """Build the swell dict from {pygrib name: [messages]} of one file."""
+    try:
+        height_msgs = messages[SWELL_HEIGHT_NAME]
+        period_msgs = messages[SWELL_PERIOD_NAME]
+        direction_msgs = messages[SWELL_DIRECTION_NAME]
+        combined_msg = messages[COMBINED_HEIGHT_NAME][0]
+    except (IndexError, KeyError) as exc:
+        raise RuntimeError(f"Missing required fields in {filepath}") from exc
+
+    if not (len(height_msgs) == len(period_msgs) == len(direction_msgs) == 3):
+        raise RuntimeError(f"Expected three swell partitions in {filepath}")
+
+    height_msg = height_msgs[0]
+    lon, lat = _get_lat_lon_grid(height_msg)
+    combined_values = np.ma.filled(combined_msg.values, np.nan)
+    combined_mask = np.ma.getmaskarray(combined_msg.values)
+    partitions = []
+    for sequence, (partition_height, partition_period, partition_direction) in enumerate(
+        zip(height_msgs, period_msgs, direction_msgs), start=1
+    ):
+        partitions.append(
+            {
+                "sequence": sequence,
+                "height": np.ma.filled(partition_height.values, np.nan),
+                "period": np.ma.filled(partition_period.values, np.nan),
+                "direction": np.ma.filled(partition_direction.values, np.nan),
+                "mask": np.ma.getmaskarray(partition_height.values),
+            }
+        )
+
+    # Render the complete sea state, not a mixture of swell partition 1
+    # and the combined field. Partition 1 can remain valid in a storm eye
+    # while reporting only a small background swell (for example 0.4 m
+    # beside 9 m combined seas). Using it whenever it is merely unmasked
+    # punches pale, apparently transparent holes into storm cores. The
+    # combined field is continuous across both wind sea and swell; keep
+    # the individual partitions below for the directional-arrow output.
+    mask = combined_mask | ~np.isfinite(combined_values)
+
+    # Stacked into one float32 FieldCube; the dict holds views into it.
+    return stacked({
+        "lon": lon,
+        "lat": lat,
+        "height": combined_values,
+        "height_mask": mask,
+        "period": partitions[0]["period"],
+        "direction": partitions[0]["direction"],
+        "swell_partitions": partitions,
+        "valid_date": height_msg.validDate,
+    })
+
+
 def extract_from_grib2_to_np(filepath: str) -> dict:
     grbs = pygrib.open(filepath)
     try:
-        height_param_name = "Significant height of total swell"
-        period_param_name = "Mean period of total swell"
-        direction_param_name = "Direction of swell waves"
-        combined_param_name = "Significant height of combined wind waves and swell"
-
         try:
-            height_msgs = grbs.select(name=height_param_name)
-            period_msgs = grbs.select(name=period_param_name)
-            direction_msgs = grbs.select(name=direction_param_name)
-            combined_msg = grbs.select(name=combined_param_name)[0]
-        except (IndexError, ValueError) as exc:
+            messages = {name: grbs.select(name=name) for name in SWELL_NAMES}
+        except ValueError as exc:
             raise RuntimeError(f"Missing required fields in {filepath}") from exc
+        check_valid_times(messages, "GRIB fields")
+        return _swell_from_messages(messages, filepath)
+    finally:
+        grbs.close()
+
 
-        if not (len(height_msgs) == len(period_msgs) == len(direction_msgs) == 3):
-            raise RuntimeError(f"Expected three swell partitions in {filepath}")
-        partition_messages = [
-            message
-            for group in (height_msgs, period_msgs, direction_msgs)
-            for message in group
+def _wave_fields(messages_iter, source: str) -> dict[str, dict]:
+    wanted = set(SWELL_NAMES) | set(WIND_NAMES)
+    messages: dict[str, list] = {}
+    for message in messages_iter:
+        if message.name in wanted:
+            messages.setdefault(message.name, []).append(message)
+    check_valid_times(messages, "GRIB fields")
+    swell = _swell_from_messages(messages, source)
+    # All messages in a file share one grid; reuse the swell's coordinates.
+    wind = wind_from_messages(messages, source, grid=(swell["lon"], swell["lat"]))
+    if quantize_enabled():
+        # Partitions and wind only feed the rounded arrow outputs; the
+        # combined height stays float32 for contouring and the heatmap.
+        partition_fields = [
+            name for name in swell["cube"].fields if name.startswith("swell_partitions.")
         ]
-        if any(message.validDate != combined_msg.validDate for message in partition_messages):
-            raise ValueError("Mismatched valid times between GRIB fields")
-
-        height_msg = height_msgs[0]
-        lon_grid, lat_grid = _get_lat_lon_grid(height_msg)
-        combined_values = np.ma.filled(combined_msg.values, np.nan)
-        combined_mask = np.ma.getmaskarray(combined_msg.values)
-        partitions = []
-        for sequence, (partition_height, partition_period, partition_direction) in enumerate(
-            zip(height_msgs, period_msgs, direction_msgs), start=1
-        ):
-            partitions.append(
-                {
-                    "sequence": sequence,
-                    "height": np.ma.filled(partition_height.values, np.nan).astype(np.float32),
-                    "period": np.ma.filled(partition_period.values, np.nan).astype(np.float32),
-                    "direction": np.ma.filled(partition_direction.values, np.nan).astype(np.float32),
-                    "mask": np.ma.getmaskarray(partition_height.values),
-                }
-            )
+        swell = quantized(swell, partition_fields)
+        wind = quantized(wind, wind["cube"].fields)
+    return {"swell": swell, "wind": wind}
 
-        # Render the complete sea state, not a mixture of swell partition 1
-        # and the combined field. Partition 1 can remain valid in a storm eye
-        # while reporting only a small background swell (for example 0.4 m
-        # beside 9 m combined seas). Using it whenever it is merely unmasked
-        # punches pale, apparently transparent holes into storm cores. The
-        # combined field is continuous across both wind sea and swell; keep
-        # the individual partitions below for the directional-arrow output.
-        height_values = combined_values.astype(np.float32)
-        mask = combined_mask | ~np.isfinite(combined_values)
-
-        return {
-            "lon": lon_grid,
-            "lat": lat_grid,
-            "height": height_values,
-            "height_mask": mask,
-            "period": partitions[0]["period"],
-            "direction": partitions[0]["direction"],
-            "swell_partitions": partitions,
-            "valid_date": height_msg.validDate,
-        }
+
+def read_wave_file(filepath: str) -> dict[str, dict]:
+    """Swell and wind fields of one GFS-Wave file in a single pass.
+
+    Walks the file's messages once (instead of a select() scan per field
+    in each of two opens) and checks all 14 valid times together. Returns
+    {"swell": extract_from_grib2_to_np()-style dict, "wind": extract_wind()-
+    style dict}.
+    """
+    grbs = pygrib.open(filepath)
+    try:
+        return _wave_fields(grbs, filepath)
     finally:
         grbs.close()
 
 
+def split_grib_messages(data: bytes) -> list[bytes]:
+    """Cut a GRIB2 byte stream into its messages.
+
+    Each message starts with "GRIB", carries its total length as a
+    big-endian uint64 in octets 9-16 of the indicator section, and ends
+    with "7777".
+    """
+    messages = []
+    offset = data.find(b"GRIB")
+    while offset != -1:
+        if data[offset + 7] != 2:
+            raise ValueError(f"GRIB edition {data[offset + 7]} at byte {offset} is not 2")
+        length = int.from_bytes(data[offset + 8 : offset + 16], "big")
+        end = offset + length
+        if end > len(data) or data[end - 4 : end] != b"7777":
+            raise ValueError(f"Truncated GRIB message at byte {offset}")
+        messages.append(data[offset:end])
+        offset = data.find(b"GRIB", end)
+    return messages
+
+
+def read_wave_bytes(data: bytes, source: str = "<bytes>") -> dict[str, dict]:
+    """read_wave_file() for GRIB bytes already in memory.
+
+    Each message is decoded with pygrib.fromstring, so nothing has to be
+    on disk when decoding starts.
+    """
+    return _wave_fields(
+        (pygrib.fromstring(message) for message in split_grib_messages(data)), source
+    )
+
+
 def calculate_contours4(
     data: dict,
     geojson_path: str,
@@ -344,128 +512,85 @@ def calculate_contours4(
     min_area: float | None = None,
     stride: int = 1,
     extra_properties: dict | None = None,
+    arena: BufferArena | None = None,
+    threads: int | None = None,
+    topojson_path: str | None = None,
 ) -> np.ndarray:
-    lon_grid = data["lon"]
-    lat_grid = data["lat"]
-    height_values = data["height"].astype(np.float32, copy=False)
-    mask = data.get("height_mask")
+    """Write the smoothed height field's filled bands to geojson_path.
 
-    grid = np.where(mask, np.nan, height_values) if mask is not None else height_values
-    grid = _gaussian_filter_nan(grid, smoothing_sigma)
+    With topojson_path the same bands are also written there as a
+    TopoJSON topology (topology.py).
+    """
+    # The contour generator takes the 1-D axes of a regular grid directly.
+    lon_axis, lat_axis = grid_axes(data)
+    grid = _masked_grid(data, arena, "contour_grid")
+    grid = _gaussian_filter_nan(grid, smoothing_sigma, arena=arena)
 
     if stride and stride > 1:
         grid = grid[::stride, ::stride]
-        lon_grid = lon_grid[::stride, ::stride]
-        lat_grid = lat_grid[::stride, ::stride]
+        lon_axis = lon_axis[::stride]
+        lat_axis = lat_axis[::stride]
 
     if levels is None:
         levels = FIXED_LEVELS
 
-    masked_data = np.ma.masked_invalid(grid)
-    fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
-    try:
-        contour = ax.contourf(
-            lon_grid,
-            lat_grid,
-            masked_data,
-            levels=levels,
-            antialiased=True,
-        )
-    finally:
-        plt.close(fig)
-
     if min_area is None:
-        lon_spacing = np.nanmedian(np.abs(np.diff(lon_grid, axis=1)))
-        lat_spacing = np.nanmedian(np.abs(np.diff(lat_grid, axis=0)))
+        lon_spacing = np.nanmedian(np.abs(np.diff(lon_axis)))
+        lat_spacing = np.nanmedian(np.abs(np.diff(lat_axis)))
         if np.isfinite(lon_spacing) and np.isfinite(lat_spacing):
             min_area = float((lon_spacing * lat_spacing) / 8.0)
         else:
             min_area = 0.0
 
-    features: list[Feature] = []
     extra_properties = extra_properties or {}
     valid_time = data.get("valid_date")
     base_properties = dict(extra_properties)
     if valid_time:
         base_properties.setdefault("valid_time", valid_time.isoformat())
 
-    def _iter_paths():
-        collections = getattr(contour, "collections", None)
-        if collections is not None:
-            for collection, lower, upper in zip(
-                collections, contour.levels[:-1], contour.levels[1:]
-            ):
-                for path in collection.get_paths():
-                    yield lower, upper, path.to_polygons()
-            return
-
-        allsegs = getattr(contour, "allsegs", None)
-        if allsegs is None:
-            raise RuntimeError(
-                "Matplotlib contour output does not expose polygon collections or segments."
-            )
-        allkinds = getattr(contour, "allkinds", None)
-
-        for idx, (lower, upper) in enumerate(
-            zip(contour.levels[:-1], contour.levels[1:])
-        ):
-            segs = allsegs[idx]
-            if not segs:
-                continue
-            if allkinds is not None:
-                kind_list = allkinds[idx]
-            else:
-                kind_list = [None] * len(segs)
-            for seg_coords, kind in zip(segs, kind_list):
-                if seg_coords is None or len(seg_coords) < 3:
-                    continue
-                try:
-                    path = Path(seg_coords, kind) if kind is not None else Path(seg_coords)
-                    polygons = path.to_polygons()
-                except Exception:
-                    polygons = [seg_coords]
-                if not polygons:
-                    continue
-                yield lower, upper, polygons
-
-    for lower, upper, polygon_coords in _iter_paths():
-        exterior = polygon_coords[0]
-        if exterior.shape[0] < 3:
-            continue
-        holes = [hole for hole in polygon_coords[1:] if hole.shape[0] >= 3]
-        polygon = Polygon(exterior, holes)
-        if not polygon.is_valid:
-            polygon = polygon.buffer(0)
-        if polygon.is_empty:
-            continue
-        if min_area and polygon.area < min_area:
-            continue
-        if simplify_tolerance:
-            simplified = polygon.simplify(simplify_tolerance, preserve_topology=True)
-            if simplified.is_empty:
-                continue
-            polygon = simplified
-        # ~11m precision; full float precision roughly doubles file size
-        polygon = shapely_transform(
-            lambda x, y, z=None: (np.round(x, 4), np.round(y, 4)), polygon
-        )
-        properties = {
+    threads = threads or contour_threads()
+    # ~11m precision; full float precision roughly doubles file size
+    polygons, band, *unsimplified = contour_polygons(
+        lon_axis,
+        lat_axis,
+        grid,
+        levels,
+        min_area=min_area,
+        simplify_tolerance=simplify_tolerance,
+        decimals=4,
+        threads=threads,
+        unsimplified=topojson_path is not None,
+    )
+    band_properties = [
+        {
             "contour_min": float(lower),
             "contour_max": float(upper),
             "contour_mean": float((lower + upper) / 2.0),
+            **base_properties,
         }
-        properties.update(base_properties)
-        features.append(
-            Feature(geometry=polygon.__geo_interface__, properties=properties)
-        )
+        for lower, upper in zip(levels[:-1], levels[1:])
+    ]
+    properties = [band_properties[index] for index in band.tolist()]
 
-    if not features:
+    if not properties:
         logger.warning("No contour polygons generated for %s", geojson_path)
-    feature_collection = FeatureCollection(features)
-    _write_geojson(geojson.dumps(feature_collection), geojson_path)
+    _write_geojson(
+        feature_collection_json(geojson_geometries(polygons), properties), geojson_path
+    )
     logger.info(
-        "Contours saved to %s (%d polygons)", geojson_path, len(features)
+        "Contours saved to %s (%d polygons)", geojson_path, len(properties)
     )
+    if topojson_path is not None:
+        outlines, outline_band = unsimplified
+        topology = topology_json(
+            outlines,
+            [band_properties[index] for index in outline_band.tolist()],
+            simplify_tolerance=simplify_tolerance,
+            decimals=4,
+            threads=threads,
+        )
+        _write_geojson(topology, topojson_path)
+        logger.info("Contour topology saved to %s", topojson_path)
     return levels
 
 
@@ -474,6 +599,7 @@ def extract_swell_arrows(
     geojson_path: str,
     *,
     stride: int = 10,
+    wet: WetIndex | None = None,
 ) -> int:
     """Write a coarse grid of swell direction points for the given hour.
 
@@ -481,17 +607,18 @@ def extract_swell_arrows(
     Property names are single letters to keep the payload small:
     h = significant height (m), p = mean period (s), d = direction the
     swell comes from (degrees true).
+
+    wet, the grid's static WetIndex, skips land and ice cells up front.
     """
-    lon = data["lon"][::stride, ::stride]
-    lat = data["lat"][::stride, ::stride]
     primary_partition = data["swell_partitions"][0]
-    height = primary_partition["height"][::stride, ::stride]
-    period = primary_partition["period"][::stride, ::stride]
-    direction = primary_partition["direction"][::stride, ::stride]
-    mask = primary_partition["mask"]
+    rows, cols = sample_cells(primary_partition["height"].shape, stride, wet)
+    lon, lat = grid_points(data, rows, cols)
+    height = primary_partition["height"][rows, cols]
+    period = primary_partition["period"][rows, cols]
+    direction = primary_partition["direction"][rows, cols]
 
     valid = np.isfinite(height) & np.isfinite(period) & np.isfinite(direction)
-    valid &= ~mask[::stride, ::stride]
+    valid &= ~primary_partition["mask"][rows, cols]
 
     features = []
     for lo, la, h, p, d in zip(
@@ -517,36 +644,33 @@ def extract_swell_arrows(
     return len(features)
 
 
-def extract_partition_arrows(data: dict, geojson_path: str, *, stride: int = 10) -> int:
+def extract_partition_arrows(
+    data: dict, geojson_path: str, *, stride: int = 10, wet: WetIndex | None = None
+) -> int:
     """Write all three swell partitions at each valid coarse-grid point."""
-    lon = data["lon"][::stride, ::stride]
-    lat = data["lat"][::stride, ::stride]
-    sampled_partitions = [
-        {
-            "sequence": partition["sequence"],
-            "height": partition["height"][::stride, ::stride],
-            "period": partition["period"][::stride, ::stride],
-            "direction": partition["direction"][::stride, ::stride],
-        }
-        for partition in data["swell_partitions"]
-    ]
+    rows, cols = sample_cells(data["height"].shape, stride, wet)
+    lon, lat = grid_points(data, rows, cols)
+    sampled_partitions = []
+    for partition in data["swell_partitions"]:
+        height = partition["height"][rows, cols]
+        period = partition["period"][rows, cols]
+        direction = partition["direction"][rows, cols]
+        valid = np.isfinite(height) & np.isfinite(period) & np.isfinite(direction)
+        sampled_partitions.append(
+            (partition["sequence"], height, period, direction, valid)
+        )
+    any_valid = np.logical_or.reduce([sampled[-1] for sampled in sampled_partitions])
     features = []
-    for row, column in np.ndindex(lon.shape):
+    for cell in np.flatnonzero(any_valid):
         properties = {}
-        for partition in sampled_partitions:
-            index = partition["sequence"]
-            h = partition["height"][row, column]
-            p = partition["period"][row, column]
-            d = partition["direction"][row, column]
-            if np.isfinite(h) and np.isfinite(p) and np.isfinite(d):
-                properties[f"h{index}"] = round(float(h), 2)
-                properties[f"p{index}"] = round(float(p), 1)
-                properties[f"d{index}"] = int(round(float(d))) % 360
-        if not properties:
-            continue
+        for index, height, period, direction, valid in sampled_partitions:
+            if valid[cell]:
+                properties[f"h{index}"] = round(float(height[cell]), 2)
+                properties[f"p{index}"] = round(float(period[cell]), 1)
+                properties[f"d{index}"] = int(round(float(direction[cell]))) % 360
         features.append(
             Feature(
-                geometry={"type": "Point", "coordinates": [round(float(lon[row, column]), 2), round(float(lat[row, column]), 2)]},
+                geometry={"type": "Point", "coordinates": [round(float(lon[cell]), 2), round(float(lat[cell]), 2)]},
                 properties=properties,
             )
         )
@@ -555,44 +679,67 @@ def extract_partition_arrows(data: dict, geojson_path: str, *, stride: int = 10)
     return len(features)
 
 
-def find_latest_gfs_time(session: requests.Session | None = None) -> tuple[str, str]:
-    hours = ["18", "12", "06", "00"]
-    base_url = "https://nomads.ncep.noaa.gov/pub/data/nccf/com/gfs/prod/"
+def find_latest_gfs_time(
+    transport: Transport | None = None,
+    *,
+    now: datetime | None = None,
+    forecast_hour: int = 384,
+) -> tuple[str, str]:
+    """Newest cycle whose forecast_hour file exists for both global grids.
+
+    NOAA uploads forecast hours progressively; the run directory appears
+    long before it is complete, so by default this probes the last forecast
+    hour (f384) and never returns a half-uploaded run. All HEAD probes for
+    the last few days' cycles run concurrently; the newest cycle that has
+    both files wins.
+    """
+    transport = transport or get_transport()
+    now = (now or datetime.now(dt.UTC)).astimezone(dt.UTC)
+    candidates = []
+    for days_back in range(DISCOVERY_DAYS):
+        date_str = (now - timedelta(days=days_back)).strftime("%Y%m%d")
+        for hour in ("18", "12", "06", "00"):
+            cycle_time = datetime.strptime(f"{date_str}{hour}", "%Y%m%d%H")
+            if cycle_time.replace(tzinfo=dt.UTC) <= now:
+                candidates.append((date_str, hour))
+
+    def urls(candidate: tuple[str, str]) -> list[str]:
+        date_str, hour = candidate
+        return [
+            f"{GFS_BASE_URL}/gfs.{date_str}/{hour}/wave/gridded/"
+            f"gfswave.t{hour}z.{grid}.f{forecast_hour:03}.grib2"
+            for grid in GLOBAL_GRIDS
+        ]
 
-    own_session = False
-    if session is None:
-        session = requests.Session()
-        own_session = True
+    latest = newest_published(transport, candidates, urls)
+    if latest is not None:
+        return latest
+    raise RuntimeError(
+        f"Could not find valid GFS wave data in the last {DISCOVERY_DAYS} days"
+    )
+
+
+def state_directory() -> str:
+    """STATE_DIR, else state/ next to this script (outlives FILES_DIR)."""
+    return os.environ.get("STATE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "state"
+    )
 
+
+def last_published_cycle(state_dir: str) -> str | None:
+    """forecast_start of the last run copied to the server, if recorded.
+
+    grib_copy_to_server.sh saves the metadata.json it just published as
+    LAST_PUBLISHED_FILE, so this only ever reflects a completed publish.
+    """
     try:
-        current_date = dt.datetime.now(dt.UTC) + timedelta(days=1)
-        for _ in range(3):
-            date_str = current_date.strftime("%Y%m%d")
-            for hour in hours:
-                # NOAA uploads forecast hours progressively; the run directory
-                # appears long before it is complete. Probe the last forecast
-                # hour of both global grids we consume so we never process a
-                # half-uploaded run.
-                try:
-                    if all(
-                        session.head(
-                            f"{base_url}gfs.{date_str}/{hour}/wave/gridded/"
-                            f"gfswave.t{hour}z.{grid}.f384.grib2",
-                            timeout=10,
-                        ).status_code
-                        == 200
-                        for grid in GLOBAL_GRIDS
-                    ):
-                        return date_str, hour
-                except requests.RequestException as exc:
-                    logger.debug("HEAD request failed for run %s %sZ: %s", date_str, hour, exc)
-                    continue
-            current_date -= timedelta(days=1)
-    finally:
-        if own_session:
-            session.close()
+        with open(os.path.join(state_dir, LAST_PUBLISHED_FILE)) as f:
+            return json.load(f).get("forecast_start")
+    except (OSError, ValueError, AttributeError):
+        return None
+
 
-    raise RuntimeError("Could not find valid GFS wave data in the last 2 days")
+CONTOUR_FORMATS = ("geojson", "topojson")
 
 
 def write_metadata(
@@ -610,6 +757,8 @@ def write_metadata(
         "hour": hour,
         "timestamp": datetime.now(dt.UTC).isoformat(),
         "forecast_start": f"{date_str}_{hour}Z",
+        # Each hour's contour bands are contours_<HHH>.<format> (+ .gz).
+        "contour_formats": list(CONTOUR_FORMATS),
     }
     if successes is not None:
         metadata["hours_processed"] = successes
@@ -633,45 +782,105 @@ def write_metadata(
     return metadata_path
 
 
+def _wait_for_publication(
+    transport: Transport, urls: list[str], wait_until: float
+) -> bool:
+    """Poll until every url exists, backing off between rounds.
+
+    Returns False if wait_until (epoch seconds) would pass first; the
+    caller then fetches whatever is there.
+    """
+    delay = POLL_INITIAL_SECONDS
+    while True:
+        urls = [url for url in urls if not url_exists(transport, url)]
+        if not urls:
+            return True
+        if time.time() + delay > wait_until:
+            return False
+        logger.info(
+            "Waiting %.0fs for NOAA to publish %s", delay, os.path.basename(urls[0])
+        )
+        time.sleep(delay)
+        delay = min(delay * 2, POLL_MAX_SECONDS)
+
+
+def _fetch_grid_files(
+    forecast_hour,
+    date_str: str,
+    run_hour: str,
+    files_dir: str,
+    *,
+    wait_until: float | None = None,
+) -> dict[str, str]:
+    """Download one forecast hour's GRIBs; returns {grid: path} of those on disk.
+
+    One file per global grid. A missing grid degrades the hour to partial
+    coverage rather than losing it, so this never raises: a grid that
+    cannot be fetched is simply absent from the result.
+
+    wait_until (epoch seconds) is the progressive mode: files NOAA has not
+    uploaded yet are polled for until then instead of failing at once,
+    together with their .idx inventories. A GRIB that appears before its
+    inventory would otherwise be downloaded whole.
+    """
+    base_url = f"{GFS_BASE_URL}/gfs.{date_str}/{run_hour}/wave/gridded"
+    file_index = f"{int(forecast_hour):03}"
+    staging_dir = grib_staging_dir(files_dir)
+    grid_paths: dict[str, str] = {}
+    transport = get_transport()
+    file_names = {
+        grid: f"gfswave.t{run_hour}z.{grid}.f{file_index}.grib2" for grid in GLOBAL_GRIDS
+    }
+    if wait_until is not None:
+        pending = [
+            f"{base_url}/{name}{suffix}"
+            for name in file_names.values()
+            if not os.path.exists(os.path.join(staging_dir, name))
+            for suffix in ("", ".idx")
+        ]
+        if pending and not _wait_for_publication(transport, pending, wait_until):
+            logger.warning("File %s not fully published before the deadline", file_index)
+    for grid, file_name in file_names.items():
+        file_path = os.path.join(staging_dir, file_name)
+        if not os.path.exists(file_path):
+            url = f"{base_url}/{file_name}"
+            if not _download_grib(transport, url, file_path):
+                logger.error("Giving up on %s file %s", grid, file_index)
+                continue
+            logger.info("File %s (%s) downloaded and saved", file_index, grid)
+        else:
+            logger.info("File %s (%s) exists", file_index, grid)
+        grid_paths[grid] = file_path
+    return grid_paths
+
+
 def _process_single_hour(
     forecast_hour,
     date_str: str,
     run_hour: str,
     files_dir: str,
     *,
+    grid_paths: dict[str, str] | None = None,
+    wait_until: float | None = None,
     stride: int = 1,
     smoothing_sigma: float = 1.5,
     simplify_tolerance: float | None = 0.02,
     arrow_stride: int = 10,
 ) -> tuple[str, bool, dict | None]:
-    """Download and render one forecast hour; runs in a worker process.
+    """Render one forecast hour; runs in a worker process.
 
-    Returns (file_index, succeeded, heatmap_bounds). Never raises: hours are
-    independent, so one bad hour must not take down the pool.
+    grid_paths are the hour's already-downloaded GRIBs (from the prefetch
+    stage); when None they are downloaded here first (see _fetch_grid_files
+    for wait_until). Returns (file_index,
+    succeeded, heatmap_bounds). Never raises: hours are independent, so
+    one bad hour must not take down the pool.
     """
-    base_url = (
-        "https://nomads.ncep.noaa.gov/pub/data/nccf/com/gfs/prod/"
-        f"gfs.{date_str}/{run_hour}/wave/gridded"
-    )
     file_index = f"{int(forecast_hour):03}"
-    geojson_path = os.path.join(files_dir, f"contours_{file_index}.geojson")
 
-    # One file per global grid. A missing grid degrades the hour to partial
-    # coverage rather than losing it; only both missing is a failure.
-    grid_paths: dict[str, str] = {}
-    with requests.Session() as session:
-        for grid in GLOBAL_GRIDS:
-            file_name = f"gfswave.t{run_hour}z.{grid}.f{file_index}.grib2"
-            file_path = os.path.join(files_dir, file_name)
-            if not os.path.exists(file_path):
-                url = f"{base_url}/{file_name}"
-                if not _download_file(session, url, file_path):
-                    logger.error("Giving up on %s file %s", grid, file_index)
-                    continue
-                logger.info("File %s (%s) downloaded and saved", file_index, grid)
-            else:
-                logger.info("File %s (%s) exists", file_index, grid)
-            grid_paths[grid] = file_path
+    if grid_paths is None:
+        grid_paths = _fetch_grid_files(
+            forecast_hour, date_str, run_hour, files_dir, wait_until=wait_until
+        )
     if not grid_paths:
         return file_index, False, None
     if len(grid_paths) < len(GLOBAL_GRIDS):
@@ -682,65 +891,220 @@ def _process_single_hour(
         )
 
     try:
-        extracted = {
-            grid: extract_from_grib2_to_np(path)
-            for grid, path in grid_paths.items()
-        }
-        data = composite_swell(
-            extracted.get(GLOBAL_GRIDS[0]), extracted.get(GLOBAL_GRIDS[1])
+        extracted, wind_extracted = _decode_hour(
+            grid_paths, f"{date_str}_{run_hour}Z", file_index
         )
-        calculate_contours4(
-            data,
-            geojson_path,
+        bounds = _render_hour(
+            forecast_hour,
+            extracted,
+            wind_extracted,
+            files_dir,
             stride=stride,
             smoothing_sigma=smoothing_sigma,
             simplify_tolerance=simplify_tolerance,
-            extra_properties={"forecast_hour": int(forecast_hour)},
-        )
-        arrows_path = os.path.join(files_dir, f"arrows_{file_index}.geojson")
-        extract_swell_arrows(data, arrows_path, stride=arrow_stride)
-        partition_path = os.path.join(files_dir, f"swell_partitions_{file_index}.geojson")
-        extract_partition_arrows(data, partition_path, stride=arrow_stride)
-        wind_extracted = {
-            grid: extract_wind(path) for grid, path in grid_paths.items()
-        }
-        wind_data = composite_wind(
-            wind_extracted.get(GLOBAL_GRIDS[0]),
-            wind_extracted.get(GLOBAL_GRIDS[1]),
+            arrow_stride=arrow_stride,
         )
-        wind_path = os.path.join(files_dir, f"wind_{file_index}.geojson")
-        write_wind_arrows(wind_data, wind_path, stride=arrow_stride)
-        heatmap_path = os.path.join(files_dir, f"heatmap_{file_index}.png")
-        bounds = render_heatmap_png(data, heatmap_path)
         return file_index, True, bounds
     except Exception as exc:
         logger.error("Error processing file %s: %s", file_index, exc, exc_info=True)
         return file_index, False, None
 
 
-def _worker_init() -> None:
-    """Attach log handlers in pool workers.
+def _decode_hour(
+    grid_paths: dict[str, str], cycle: str, file_index: str
+) -> tuple[dict, dict]:
+    """Swell and wind fields per grid, through the field cache if enabled.
+
+    Consumes the staged GRIBs: each file is read into memory and deleted
+    before decoding.
+    """
+    field_cache = get_field_cache()
+    extracted = {}
+    wind_extracted = {}
+    digests = {}
+    for grid, path in grid_paths.items():
+        with open(path, "rb") as f:
+            data = f.read()
+        # Decode from memory and drop the staged file straight away (the
+        # download cache keeps its own copy for revalidation).
+        os.remove(path)
+        if field_cache is None:
+            fields = read_wave_bytes(data, path)
+        else:
+            fields, digests[grid] = field_cache.extract(
+                data, partial(read_wave_bytes, source=path)
+            )
+        del data
+        extracted[grid] = fields["swell"]
+        wind_extracted[grid] = fields["wind"]
+    if field_cache is not None:
+        field_cache.record_hour(cycle, file_index, digests)
+    return extracted, wind_extracted
+
+
+def _render_hour(
+    forecast_hour,
+    extracted: dict[str, dict],
+    wind_extracted: dict[str, dict],
+    files_dir: str,
+    *,
+    stride: int,
+    smoothing_sigma: float,
+    simplify_tolerance: float | None,
+    arrow_stride: int,
+) -> dict:
+    """Write one hour's layers from decoded fields; returns heatmap bounds."""
+    file_index = f"{int(forecast_hour):03}"
+    # The hour's composites and temporaries reuse this worker's buffers.
+    arena = worker_arena()
+    data = composite_swell(
+        extracted.get(GLOBAL_GRIDS[0]), extracted.get(GLOBAL_GRIDS[1]), arena=arena
+    )
+    calculate_contours4(
+        data,
+        os.path.join(files_dir, f"contours_{file_index}.geojson"),
+        topojson_path=os.path.join(files_dir, f"contours_{file_index}.topojson"),
+        stride=stride,
+        smoothing_sigma=smoothing_sigma,
+        simplify_tolerance=simplify_tolerance,
+        extra_properties={"forecast_hour": int(forecast_hour)},
+        arena=arena,
+    )
+    # Arrows only sample cells that are not static land or ice.
+    swell_wet = cube_wet_index(("swell", data["height"].shape), FieldCube.of(data))
+    arrows_path = os.path.join(files_dir, f"arrows_{file_index}.geojson")
+    extract_swell_arrows(data, arrows_path, stride=arrow_stride, wet=swell_wet)
+    partition_path = os.path.join(files_dir, f"swell_partitions_{file_index}.geojson")
+    extract_partition_arrows(data, partition_path, stride=arrow_stride, wet=swell_wet)
+    wind_data = composite_wind(
+        wind_extracted.get(GLOBAL_GRIDS[0]),
+        wind_extracted.get(GLOBAL_GRIDS[1]),
+        arena=arena,
+    )
+    wind_wet = cube_wet_index(("wind", wind_data["speed"].shape), FieldCube.of(wind_data))
+    wind_path = os.path.join(files_dir, f"wind_{file_index}.geojson")
+    write_wind_arrows(wind_data, wind_path, stride=arrow_stride, wet=wind_wet)
+    heatmap_path = os.path.join(files_dir, f"heatmap_{file_index}.png")
+    return render_heatmap_png(data, heatmap_path, arena=arena)
+
+
+def _rerender_single_hour(
+    forecast_hour,
+    digests: dict[str, str],
+    *,
+    files_dir: str,
+    stride: int = 1,
+    smoothing_sigma: float = 1.5,
+    simplify_tolerance: float | None = 0.02,
+    arrow_stride: int = 10,
+) -> tuple[str, bool, dict | None]:
+    """_process_single_hour() from cached fields only; never touches the network."""
+    file_index = f"{int(forecast_hour):03}"
+    field_cache = get_field_cache()
+    extracted = {}
+    wind_extracted = {}
+    for grid, digest in digests.items():
+        swell = field_cache.load(digest, "swell")
+        wind = field_cache.load(digest, "wind")
+        if swell is None or wind is None:
+            logger.warning("File %s (%s): decoded fields no longer cached", file_index, grid)
+            continue
+        extracted[grid] = swell
+        wind_extracted[grid] = wind
+    if not extracted:
+        return file_index, False, None
+    try:
+        bounds = _render_hour(
+            forecast_hour,
+            extracted,
+            wind_extracted,
+            files_dir,
+            stride=stride,
+            smoothing_sigma=smoothing_sigma,
+            simplify_tolerance=simplify_tolerance,
+            arrow_stride=arrow_stride,
+        )
+        return file_index, True, bounds
+    except Exception as exc:
+        logger.error("Error re-rendering file %s: %s", file_index, exc, exc_info=True)
+        return file_index, False, None
+
+
+# Cores each pool worker may use for one hour; set by _worker_init().
+_worker_threads: int | None = None
+
+
+def _worker_init(threads: int | None = None) -> None:
+    """Attach log handlers in pool workers and cap their BLAS/OpenMP threads.
+
+    threads is also the worker's contour_threads() default.
 
     With the default fork start method the workers inherit the parent's
     handlers and this is a no-op; under spawn/forkserver it recreates them.
     Multiple processes appending to the same log file is safe enough here
     (O_APPEND, small writes); lines may interleave but are not lost.
     """
+    global _worker_threads
+    if threads:
+        cap_threads(threads)
+        _worker_threads = threads
     log_dir = os.environ.get("LOG_DIR")
     if log_dir:
         setup_logging(log_dir)
 
 
+def contour_threads() -> int:
+    """Threads contouring one hour (row tiles), from CONTOUR_THREADS.
+
+    Defaults to the worker's share of the usable cores, so a run of fewer
+    hours than cores (--limit, a progressive run's first hours) still
+    uses them; hours rendered inline get every usable core. The contours
+    written do not depend on the count (see contour_polygons()).
+    """
+    env_value = os.environ.get("CONTOUR_THREADS")
+    if env_value:
+        return max(1, int(env_value))
+    return _worker_threads or usable_cpus()
+
+
 def default_workers() -> int:
-    """Worker count from PARALLEL_HOURS, else a memory-conscious default.
+    """Worker count from PARALLEL_HOURS, else every usable core but one.
 
-    Each worker holds a few hundred MB of grids, so cap the default at 4
-    even on wide machines; set PARALLEL_HOURS explicitly to go higher.
+    The default is also capped at the hours the memory budget fits
+    (Admission.capacity()). Admission only counts running hours, but an
+    idle worker keeps its scratch arena from its last hour, so a pool
+    wider than the budget would still outgrow it on a wide, small box.
     """
     env_value = os.environ.get("PARALLEL_HOURS")
     if env_value:
         return max(1, int(env_value))
-    return max(1, min(4, (os.cpu_count() or 2) - 1))
+    return Admission(max(1, usable_cpus() - 1)).capacity()
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    threads = max(1, usable_cpus() // workers)
+    return ProcessPoolExecutor(
+        max_workers=workers, initializer=_worker_init, initargs=(threads,)
+    )
+
+
+def default_prefetch(workers: int) -> int:
+    """Hours fetched ahead of the pool, from PREFETCH_HOURS (default workers).
+
+    Each prefetched hour is two slim GRIBs in the staging directory, so
+    the window bounds disk use as well as how far downloads can run ahead.
+    """
+    env_value = os.environ.get("PREFETCH_HOURS")
+    if env_value:
+        return max(0, int(env_value))
+    return workers
+
+
+def default_download_threads() -> int:
+    env_value = os.environ.get("DOWNLOAD_THREADS")
+    if env_value:
+        return max(1, int(env_value))
+    return 2
 
 
 def process_forecast_hours(
@@ -754,6 +1118,9 @@ def process_forecast_hours(
     simplify_tolerance: float | None = 0.02,
     arrow_stride: int = 10,
     workers: int | None = None,
+    prefetch: int | None = None,
+    download_threads: int | None = None,
+    wait_until: float | None = None,
     run_info: dict | None = None,
 ) -> tuple[int, int]:
     """Process all forecast hours, fanning out over a process pool.
@@ -761,6 +1128,16 @@ def process_forecast_hours(
     Hours are fully independent (own downloads, own output files), so they
     are distributed across worker processes; workers=1 runs inline in this
     process, which keeps a simple path for debugging and tests.
+
+    With a pool, downloading and rendering are two overlapped stages: a
+    thread pool fetches hours in forecast order into files_dir, and only
+    hours whose files are already local are submitted to the process pool,
+    so a worker never idles on the network. At most workers + prefetch
+    hours are in flight (downloading, downloaded, or rendering) at once.
+
+    wait_until enables progressive ingestion: hours NOAA has not uploaded
+    yet are polled for (until that epoch deadline) and each is rendered as
+    soon as both of its files appear, in forecast order.
     """
     hours = list(hour_sequence)
     if workers is None:
@@ -777,19 +1154,24 @@ def process_forecast_hours(
         smoothing_sigma=smoothing_sigma,
         simplify_tolerance=simplify_tolerance,
         arrow_stride=arrow_stride,
+        wait_until=wait_until,
     )
+    admission = Admission(workers)
     if workers > 1:
-        logger.info("Processing %d forecast hours with %d workers", len(hours), workers)
+        logger.info(
+            "Processing %d forecast hours with up to %d workers (%d fit in memory at %.1f GB each)",
+            len(hours), workers, admission.capacity(), admission.hour_bytes / 1e9,
+        )
 
     successes = 0
     failures = 0
+    done = 0
     bounds_by_position: dict[int, dict] = {}
 
-    def tally(
-        result: tuple[str, bool, dict | None], done: int, position: int
-    ) -> None:
-        nonlocal successes, failures
+    def tally(result: tuple[str, bool, dict | None], position: int) -> None:
+        nonlocal successes, failures, done
         file_index, succeeded, bounds = result
+        done += 1
         if succeeded:
             successes += 1
             if bounds is not None:
@@ -800,17 +1182,23 @@ def process_forecast_hours(
 
     if workers == 1:
         for position, forecast_hour in enumerate(hours):
-            tally(process_hour(forecast_hour), position + 1, position)
+            tally(process_hour(forecast_hour), position)
     else:
-        with ProcessPoolExecutor(
-            max_workers=workers, initializer=_worker_init
-        ) as pool:
-            futures = {
-                pool.submit(process_hour, forecast_hour): position
-                for position, forecast_hour in enumerate(hours)
-            }
-            for done, future in enumerate(as_completed(futures), start=1):
-                tally(future.result(), done, futures[future])
+        _run_pipeline(
+            hours,
+            process_hour,
+            partial(
+                _fetch_grid_files,
+                date_str=date_str,
+                run_hour=run_hour,
+                files_dir=files_dir,
+                wait_until=wait_until,
+            ),
+            tally,
+            admission=admission,
+            window=workers + (default_prefetch(workers) if prefetch is None else prefetch),
+            download_threads=download_threads or default_download_threads(),
+        )
 
     if run_info is not None and bounds_by_position:
         first_position = min(bounds_by_position)
@@ -822,28 +1210,175 @@ def process_forecast_hours(
     return successes, failures
 
 
-def _download_file(
-    session: requests.Session, url: str, file_path: str, attempts: int = 3
-) -> bool:
-    for attempt in range(1, attempts + 1):
-        try:
-            response = session.get(url, timeout=120)
-            response.raise_for_status()
-            # Write then rename so an interrupted download never leaves a
-            # partial .grib2 that a later run would treat as complete.
-            tmp_path = file_path + ".part"
-            with open(tmp_path, "wb") as file:
-                file.write(response.content)
-            os.replace(tmp_path, file_path)
-            return True
-        except requests.RequestException as exc:
-            logger.warning(
-                "Download attempt %d/%d failed for %s: %s", attempt, attempts, url, exc
+def _run_pipeline(
+    hours: list,
+    process_hour,
+    fetch_hour,
+    tally,
+    *,
+    admission: Admission,
+    window: int,
+    download_threads: int,
+) -> None:
+    """Download stage (threads) feeding the render stage (process pool).
+
+    Fetches are started in forecast order and bounded by window; each hour
+    moves to the pool once its files are local and admission lets it in
+    (in forecast order), and its slot in the window frees when rendering
+    finishes. An hour with no files at all is tallied as failed without
+    ever occupying a worker.
+    """
+    fetching: dict = {}  # fetch future -> position
+    ready: dict[int, dict] = {}  # position -> grid paths, awaiting admission
+    rendering: dict = {}  # render future -> position
+    next_position = 0
+    with (
+        ThreadPoolExecutor(max_workers=download_threads) as downloads,
+        _pool(admission.workers) as pool,
+    ):
+        while True:
+            while (
+                next_position < len(hours)
+                and len(fetching) + len(ready) + len(rendering) < window
+            ):
+                future = downloads.submit(fetch_hour, hours[next_position])
+                fetching[future] = next_position
+                next_position += 1
+            while ready and admission.admits(len(rendering)):
+                position = min(ready)
+                future = pool.submit(
+                    measured, process_hour, hours[position], grid_paths=ready.pop(position)
+                )
+                rendering[future] = position
+            if not fetching and not rendering:
+                break
+            finished, _ = wait(
+                list(fetching) + list(rendering), return_when=FIRST_COMPLETED
+            )
+            for future in finished:
+                if future in fetching:
+                    position = fetching.pop(future)
+                    forecast_hour = hours[position]
+                    try:
+                        grid_paths = future.result()
+                    except Exception as exc:
+                        logger.error(
+                            "Download stage failed for hour %s: %s", forecast_hour, exc,
+                            exc_info=True,
+                        )
+                        grid_paths = {}
+                    if not grid_paths:
+                        tally((f"{int(forecast_hour):03}", False, None), position)
+                        continue
+                    ready[position] = grid_paths
+                else:
+                    result, peak = future.result()
+                    admission.record(peak)
+                    tally(result, rendering.pop(future))
+
+
+def rerender_cached_run(
+    files_dir: str,
+    *,
+    stride: int = 1,
+    smoothing_sigma: float = 1.5,
+    simplify_tolerance: float | None = 0.02,
+    arrow_stride: int = 10,
+    workers: int | None = None,
+) -> tuple[str, str, int, int]:
+    """Regenerate the newest cached cycle's layers from decoded fields.
+
+    Offline counterpart of process_forecast_hours() for tuning visual
+    parameters: reads the run manifest and fields written by an earlier
+    run with FIELD_CACHE_BYTES set, renders into files_dir and writes its
+    metadata (without NWPS layers). Returns (date, hour, successes, failures).
+    """
+    field_cache = get_field_cache()
+    if field_cache is None:
+        raise EnvironmentError("--rerender needs the field cache; set FIELD_CACHE_BYTES")
+    latest = field_cache.latest_run()
+    if latest is None:
+        raise RuntimeError(f"No cached run in {field_cache.directory} to re-render")
+    cycle, hours = latest
+    date_str, hour = cycle.removesuffix("Z").split("_")
+    file_indexes = sorted(hours)
+    logger.info("Re-rendering %d cached hours of cycle %s", len(file_indexes), cycle)
+
+    render = partial(
+        _rerender_single_hour,
+        files_dir=files_dir,
+        stride=stride,
+        smoothing_sigma=smoothing_sigma,
+        simplify_tolerance=simplify_tolerance,
+        arrow_stride=arrow_stride,
+    )
+    forecast_hours = [int(index) for index in file_indexes]
+    digests = [hours[index] for index in file_indexes]
+    if workers is None:
+        workers = default_workers()
+    workers = max(1, min(workers, len(forecast_hours) or 1))
+    if workers == 1:
+        results = list(map(render, forecast_hours, digests))
+    else:
+        with _pool(workers) as pool:
+            results = map_admitted(
+                pool, render, forecast_hours, digests, admission=Admission(workers)
             )
-    return False
 
+    successes = sum(1 for _, succeeded, _ in results if succeeded)
+    bounds = next((bounds for _, _, bounds in results if bounds is not None), None)
+    write_metadata(
+        files_dir,
+        date_str,
+        hour,
+        successes=successes,
+        failures=len(results) - successes,
+        heatmap_bounds=bounds,
+    )
+    return date_str, hour, successes, len(results) - successes
+
+
+def _download_grib(transport: Transport, url: str, file_path: str) -> bool:
+    """Fetch just the messages the pipeline reads, else the whole file.
+
+    GFS files bypass the download cache (gribcache.py): their URLs are
+    unique per cycle, and a published cycle is never fetched again, so a
+    cached copy would only cost a disk write per file and push the NWPS
+    entries that do get reused out of the budget.
+    """
+    if download_subset(transport, url, file_path):
+        return True
+    return download_file(transport, url, file_path)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description="Generate forecast layers from the newest GFS-Wave cycle."
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only look for a new complete GFS cycle: exit 0 if there is one, "
+        f"{NOTHING_NEW_EXIT} if the newest is already published",
+    )
+    parser.add_argument(
+        "--progressive",
+        action="store_true",
+        help="start on the newest cycle whose f000 exists and process hours "
+        "as NOAA publishes them (same as PROGRESSIVE=1)",
+    )
+    parser.add_argument(
+        "--rerender",
+        action="store_true",
+        help="regenerate the newest cached cycle's GFS layers from decoded "
+        "fields (FIELD_CACHE_BYTES) with the current visual settings; no network",
+    )
+    args = parser.parse_args(argv)
+    progressive = args.progressive or os.environ.get("PROGRESSIVE", "0") not in ("", "0")
+    # A progressive run may start before f384 exists; otherwise only a
+    # fully uploaded cycle counts (also for --check).
+    discovery_hour = 0 if progressive else 384
 
-def main() -> None:
     files_dir = os.environ.get("FILES_DIR")
     if not files_dir:
         raise EnvironmentError("FILES_DIR environment variable is not set")
@@ -853,6 +1388,17 @@ def main() -> None:
 
     setup_logging(log_dir)
 
+    if args.check:
+        with get_transport() as transport:
+            date_str, hour = find_latest_gfs_time(transport, forecast_hour=discovery_hour)
+        cycle = f"{date_str}_{hour}Z"
+        published = last_published_cycle(state_directory())
+        if cycle == published:
+            logger.info("Newest complete cycle %s is already published; nothing to do", cycle)
+            sys.exit(NOTHING_NEW_EXIT)
+        logger.info("New complete cycle %s (last published: %s)", cycle, published or "none")
+        return
+
     # Full grid resolution (0.16 deg) with a touch more smoothing and light
     # simplification: smooth coastline-accurate polygons at a manageable size.
     stride = max(int(os.environ.get("CONTOUR_STRIDE", "1") or 1), 1)
@@ -861,11 +1407,38 @@ def main() -> None:
     simplify_tolerance = float(simplify_env) if simplify_env else 0.02
     arrow_stride = max(int(os.environ.get("ARROW_STRIDE", "10") or 10), 1)
 
-    with requests.Session() as session:
-        date_str, hour = find_latest_gfs_time(session=session)
+    if args.rerender:
+        date_str, hour, successes, failures = rerender_cached_run(
+            files_dir,
+            stride=stride,
+            smoothing_sigma=smoothing_sigma,
+            simplify_tolerance=simplify_tolerance,
+            arrow_stride=arrow_stride,
+        )
+        logger.info(
+            "Re-render of %s_%sZ complete: %d/%d forecast hours",
+            date_str, hour, successes, successes + failures,
+        )
+        if successes == 0:
+            sys.exit(2)
+        return
+
+    with get_transport() as transport:
+        date_str, hour = find_latest_gfs_time(transport, forecast_hour=discovery_hour)
         logger.info(
             "Found latest GFS wave data for date %s hour %sZ", date_str, hour
         )
+        wait_until = None
+        if progressive:
+            timeout_hours = float(
+                os.environ.get("PROGRESSIVE_TIMEOUT_HOURS")
+                or DEFAULT_PROGRESSIVE_TIMEOUT_HOURS
+            )
+            wait_until = time.time() + timeout_hours * 3600
+            logger.info(
+                "Progressive mode: waiting up to %.1f h for hours not yet published",
+                timeout_hours,
+            )
         run_info: dict = {}
         # NOAA publishes the wave grids hourly out to f120 (5 days), then
         # 3-hourly to f384. One combined sequence so the --verbose progress
@@ -888,6 +1461,7 @@ def main() -> None:
             smoothing_sigma=smoothing_sigma,
             simplify_tolerance=simplify_tolerance,
             arrow_stride=arrow_stride,
+            wait_until=wait_until,
             run_info=run_info,
         )
 
@@ -895,7 +1469,7 @@ def main() -> None:
         # time to the GFS run.
         forecast_start = datetime.strptime(f"{date_str}{hour}", "%Y%m%d%H")
         nwps = process_nwps_domains(
-            session, files_dir, forecast_start, hour_sequence, render_heatmap_png
+            transport, files_dir, forecast_start, hour_sequence, render_heatmap_png
         )
 
         tide_stations = [
@@ -905,7 +1479,7 @@ def main() -> None:
         ]
         tide_path = os.path.join(files_dir, "tides.json")
         if tide_stations:
-            write_tides(session, tide_stations, tide_path)
+            write_tides(transport, tide_stations, tide_path)
         else:
             logger.info("TIDE_STATIONS is empty; skipping NOAA CO-OPS tide data")
             # Do not republish a file from an older configuration/run.
@@ -926,6 +1500,7 @@ def main() -> None:
             nwps=nwps,
         )
 
+        transport.log_stats()
         total = successes + failures
         logger.info("Run complete: %d/%d forecast hours processed", successes, total)
         if successes == 0:
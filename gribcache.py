@@ -0,0 +1,177 @@
+"""Persistent, size-bounded cache of raw GRIB downloads.
+
+FILES_DIR is emptied before every run, so without this every run
+re-downloads everything — including NWPS files whose office cycle has
+not changed since the previous timer fire. The cache lives outside
+FILES_DIR (GRIB_CACHE_DIR, default cache/grib/ in this repository) and
+maps a key (the URL, or URL plus message subset) to a body file and a
+small JSON record of the server's ETag/Last-Modified validators.
+
+Only NWPS downloads go through it. GFS file URLs are unique per cycle
+and a published cycle is not fetched again, so caching them would copy
+every GFS download to disk (even from a tmpfs GRIB_STAGING_DIR) only to
+evict NWPS entries that are reused.
+
+A repeat request sends If-None-Match / If-Modified-Since; on 304 the
+cached body is hard-linked (or copied across filesystems) into place, so
+an unchanged file costs one conditional request instead of a download.
+Entries are evicted least-recently-used first whenever the cache grows
+past GRIB_CACHE_BYTES (default 2 GB; 0 disables the cache).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+
+logger = logging.getLogger("GFSWaveContours")
+
+DEFAULT_CACHE_BYTES = 2_000_000_000
+
+
+class DownloadCache:
+    """Body files and validator records under one directory."""
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, key: str) -> tuple[str, str]:
+        digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+        base = os.path.join(self.directory, digest)
+        return base + ".body", base + ".json"
+
+    def lookup(self, key: str) -> dict | None:
+        """The entry's record ({"key", "etag", "last_modified", "size", ...})."""
+        body_path, meta_path = self._paths(key)
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("key") != key or not os.path.exists(body_path):
+            return None
+        return meta
+
+    @staticmethod
+    def conditional_headers(meta: dict | None) -> dict:
+        """If-None-Match / If-Modified-Since for a cached entry, if any."""
+        headers = {}
+        if meta:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def _write_meta(self, meta_path: str, meta: dict) -> None:
+        tmp_path = f"{meta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def store(self, key: str, file_path: str, headers) -> None:
+        """Record the freshly downloaded file_path under key.
+
+        Responses without an ETag or Last-Modified can never be
+        revalidated, so they are not cached.
+        """
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        body_path, meta_path = self._paths(key)
+        tmp_path = f"{body_path}.{os.getpid()}.tmp"
+        try:
+            _link_or_copy(file_path, tmp_path)
+            os.replace(tmp_path, body_path)
+            self._write_meta(
+                meta_path,
+                {
+                    "key": key,
+                    "etag": etag,
+                    "last_modified": last_modified,
+                    "size": os.path.getsize(body_path),
+                    "last_used": time.time(),
+                },
+            )
+        except OSError as exc:
+            logger.warning("Could not cache %s: %s", key, exc)
+            return
+        self.evict()
+
+    def place(self, key: str, file_path: str) -> bool:
+        """Put the cached body for key at file_path; False if it is gone."""
+        body_path, meta_path = self._paths(key)
+        meta = self.lookup(key)
+        if meta is None:
+            return False
+        tmp_path = file_path + ".part"
+        try:
+            _link_or_copy(body_path, tmp_path)
+            os.replace(tmp_path, file_path)
+        except OSError as exc:
+            # Evicted by another worker between lookup and link.
+            logger.debug("Cache entry for %s vanished: %s", key, exc)
+            return False
+        meta["last_used"] = time.time()
+        try:
+            self._write_meta(meta_path, meta)
+        except OSError:
+            pass
+        return True
+
+    def evict(self) -> None:
+        """Drop least-recently-used entries until within max_bytes."""
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            meta_path = os.path.join(self.directory, name)
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                continue
+            size = int(meta.get("size", 0))
+            entries.append((float(meta.get("last_used", 0)), size, meta_path))
+            total += size
+        for _, size, meta_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, meta_path[: -len(".json")] + ".body"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+
+
+def _link_or_copy(source: str, destination: str) -> None:
+    try:
+        os.remove(destination)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(source, destination)
+    except OSError:
+        shutil.copyfile(source, destination)
+
+
+def get_cache() -> DownloadCache | None:
+    """The cache configured by GRIB_CACHE_DIR / GRIB_CACHE_BYTES, or None."""
+    max_bytes = int(float(os.environ.get("GRIB_CACHE_BYTES") or DEFAULT_CACHE_BYTES))
+    if max_bytes <= 0:
+        return None
+    directory = os.environ.get("GRIB_CACHE_DIR") or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "cache", "grib"
+    )
+    try:
+        return DownloadCache(directory, max_bytes)
+    except OSError as exc:
+        logger.warning("GRIB cache disabled (%s): %s", directory, exc)
+        return None
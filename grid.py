@@ -0,0 +1,104 @@
+"""Nearest-neighbor lookups on monotonic grid axes.
+
+Every regridding step in the pipeline (the global composite, the
+heatmap's Mercator row warp, the NWPS mosaic) maps target coordinates to
+the nearest source grid line. Broadcasting ``target[:, None] -
+source[None, :]`` does that with an N x M temporary — 2160 x 1440 doubles
+for one longitude axis — while the axes are sorted, so a binary search
+finds the two neighbours of each target in O(N log M) time and O(N)
+memory.
+
+Data dicts describe regular lat/lon grids by 1-D ``lon``/``lat`` axes;
+grid_axes() and grid_points() serve consumers that need the axes or the
+coordinates of individual cells (and still accept dicts carrying full
+2-D meshes), so no full-size mesh is ever built.
+"""
+
+import numpy as np
+
+
+def nearest_index(
+    source: np.ndarray, target: np.ndarray, *, period: float | None = None
+) -> np.ndarray:
+    """Index into source of the value nearest to each target value.
+
+    source must be strictly monotonic, ascending or descending. Returns
+    exactly what ``np.abs(target[:, None] - source[None, :]).argmin(axis=1)``
+    returns, including its tie-break (the lower source index wins).
+
+    With period (360 for longitude) distances wrap around, so a target
+    just below source[0] + period can map to index 0.
+    """
+    source = np.asarray(source)
+    target = np.asarray(target)
+    n = source.size
+    if n == 1:
+        return np.zeros(target.shape, dtype=np.intp)
+
+    descending = source[0] > source[-1]
+    ascending_source = source[::-1] if descending else source
+    if period is not None:
+        start = ascending_source[0]
+        target = start + np.mod(target - start, period)
+    position = np.searchsorted(ascending_source, target)
+    if period is None:
+        below = np.clip(position - 1, 0, n - 1)
+        above = np.clip(position, 0, n - 1)
+    else:
+        below = np.where(position == 0, n - 1, position - 1)
+        above = np.where(position == n, 0, position)
+    if descending:
+        below = n - 1 - below
+        above = n - 1 - above
+
+    distance_below = np.abs(target - source[below])
+    distance_above = np.abs(target - source[above])
+    if period is not None:
+        distance_below = np.minimum(distance_below, period - distance_below)
+        distance_above = np.minimum(distance_above, period - distance_above)
+    take_above = (distance_above < distance_below) | (
+        (distance_above == distance_below) & (above < below)
+    )
+    return np.where(take_above, above, below)
+
+
+def latlon_axes(lats: np.ndarray, lons: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(lon, lat) of a pygrib latlons() pair, as 1-D float32 axes if regular.
+
+    A regular lat/lon grid's 2-D coordinates are just its two axes
+    repeated; keeping only the axes saves two full-grid arrays per field
+    set. Curvilinear grids keep their 2-D coordinates.
+    """
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    lat_axis = lats[:, 0]
+    lon_axis = lons[0, :]
+    if np.array_equal(lats, np.broadcast_to(lat_axis[:, None], lats.shape)) and (
+        np.array_equal(lons, np.broadcast_to(lon_axis[None, :], lons.shape))
+    ):
+        return lon_axis.astype(np.float32), lat_axis.astype(np.float32)
+    return lons.astype(np.float32), lats.astype(np.float32)
+
+
+def grid_axes(data: dict) -> tuple[np.ndarray, np.ndarray]:
+    """(lon, lat) 1-D axes of a regular grid dict carrying axes or meshes."""
+    lon, lat = data["lon"], data["lat"]
+    if lat.ndim == 2:
+        return lon[0, :], lat[:, 0]
+    return lon, lat
+
+
+def strided_cells(shape: tuple[int, int], stride: int = 1) -> tuple[np.ndarray, np.ndarray]:
+    """(rows, cols) of every cell of the [::stride, ::stride] lattice, row-major."""
+    rows, cols = np.meshgrid(
+        np.arange(0, shape[0], stride), np.arange(0, shape[1], stride), indexing="ij"
+    )
+    return rows.ravel(), cols.ravel()
+
+
+def grid_points(data: dict, rows: np.ndarray, cols: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(lon, lat) of the given cells, without building a mesh."""
+    lon, lat = data["lon"], data["lat"]
+    if lat.ndim == 2:
+        return lon[rows, cols], lat[rows, cols]
+    return lon[cols], lat[rows]
@@ -0,0 +1,314 @@
+"""Byte-range GRIB downloads driven by NOMADS ``.idx`` inventories.
+
+Every GRIB2 file on NOMADS has a sibling ``<file>.idx`` with one line per
+message: ``number:byte_offset:d=YYYYMMDDHH:VARIABLE:level:forecast:``. A
+message runs from its offset to the next message's offset (the last one
+to end of file), and GRIB2 messages are self-contained, so concatenating
+a subset of them yields a smaller but perfectly valid GRIB2 file.
+
+The pipeline only reads the combined height, the three swell partitions
+(height/period/direction) and the four wind fields — 14 messages of the
+~20 in a GFS-Wave file. Fetching just those skips the rest of every
+file. Neighbouring messages merge into one byte range, and all of a
+file's ranges (four for GFS-Wave) go into a single multi-range request
+answered as multipart/byteranges. A file then costs two requests, the
+inventory and its messages, which matters under HTTP_RATE_LIMIT (2 per
+second per host by default): one GET per range would make it five. A
+server that will not serve several ranges at once gets one request per
+range. Anything unexpected (no inventory, a variable missing from it, a
+server ignoring Range) returns False so the caller can fall back to the
+full file.
+
+With a DownloadCache the subset is cached under the URL plus variable
+list and revalidated through the inventory: NOMADS rewrites a file and
+its ``.idx`` together, so a 304 on the inventory means the cached subset
+still matches and no byte ranges need fetching.
+"""
+
+import logging
+import os
+import re
+
+import requests
+
+from download import CHUNK_SIZE, IncompleteDownload
+from gribcache import DownloadCache
+from transport import Transport
+
+logger = logging.getLogger("GFSWaveContours")
+
+# Inventory short names of the messages read_wave_file() reads (swell and
+# wind), in pygrib naming:
+#   HTSGW  Significant height of combined wind waves and swell
+#   SWELL  Significant height of total swell (x3 partitions)
+#   SWPER  Mean period of total swell (x3)
+#   SWDIR  Direction of swell waves (x3)
+#   WIND / WDIR / UGRD / VGRD  surface wind speed, direction, components
+GFS_WAVE_VARIABLES = frozenset(
+    {"HTSGW", "SWELL", "SWPER", "SWDIR", "WIND", "WDIR", "UGRD", "VGRD"}
+)
+
+
+def parse_idx(text: str) -> list[dict]:
+    """Parse a wgrib2-style inventory into [{"offset", "variable", "level"}].
+
+    Entries come back sorted by offset. Sub-messages sharing an offset
+    (``3.1:``, ``3.2:``) collapse to one entry; malformed lines are skipped.
+    """
+    entries: dict[int, dict] = {}
+    for line in text.splitlines():
+        fields = line.strip().split(":")
+        if len(fields) < 5:
+            continue
+        try:
+            offset = int(fields[1])
+        except ValueError:
+            continue
+        entries.setdefault(
+            offset, {"offset": offset, "variable": fields[3], "level": fields[4]}
+        )
+    return [entries[offset] for offset in sorted(entries)]
+
+
+def select_ranges(
+    entries: list[dict], variables
+) -> list[tuple[int, int | None]]:
+    """Byte ranges covering the wanted messages, adjacent ones merged.
+
+    Ranges are (first_byte, last_byte) inclusive, as in an HTTP Range
+    header; last_byte is None for the final message (to end of file).
+    """
+    ranges: list[tuple[int, int | None]] = []
+    for index, entry in enumerate(entries):
+        if entry["variable"] not in variables:
+            continue
+        start = entry["offset"]
+        end = entries[index + 1]["offset"] - 1 if index + 1 < len(entries) else None
+        if ranges and ranges[-1][1] is not None and ranges[-1][1] + 1 == start:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((start, end))
+    return ranges
+
+
+def _range_header(ranges: list[tuple[int, int | None]]) -> str:
+    return "bytes=" + ",".join(
+        f"{start}-" if end is None else f"{start}-{end}" for start, end in ranges
+    )
+
+
+class _RangesNotServed(Exception):
+    """The 206 response does not hold the requested ranges as asked."""
+
+
+class _Body:
+    """Line and sized reads over a streamed response body."""
+
+    def __init__(self, response: requests.Response):
+        self._chunks = response.iter_content(CHUNK_SIZE)
+        self._buffer = b""
+
+    def _fill(self) -> None:
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            raise IncompleteDownload("multipart body ended early")
+        self._buffer += chunk
+
+    def line(self) -> bytes:
+        while b"\n" not in self._buffer:
+            if len(self._buffer) > CHUNK_SIZE:
+                raise _RangesNotServed("multipart line too long")
+            self._fill()
+        line, _, self._buffer = self._buffer.partition(b"\n")
+        return line.rstrip(b"\r")
+
+    def blocks(self, size: int):
+        while size:
+            if not self._buffer:
+                self._fill()
+            block, self._buffer = self._buffer[:size], self._buffer[size:]
+            size -= len(block)
+            yield block
+
+
+def _content_range(value: str) -> tuple[int, int, int | None]:
+    match = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+|\*)", value.strip())
+    if not match:
+        raise _RangesNotServed(f"unexpected Content-Range {value!r}")
+    first, last, total = match.groups()
+    return int(first), int(last), int(total) if total.isdigit() else None
+
+
+def _multipart_parts(response: requests.Response, boundary: bytes):
+    """(first, last, total, blocks) of each part of a multipart/byteranges body.
+
+    Each part's blocks must be consumed before the next part is read.
+    """
+    body = _Body(response)
+    delimiter = b"--" + boundary
+    line = body.line()
+    while line.rstrip() != delimiter:  # preamble
+        line = body.line()
+    while True:
+        headers = {}
+        while line := body.line():
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value
+        first, last, total = _content_range(headers.get("content-range", ""))
+        yield first, last, total, body.blocks(last - first + 1)
+        if body.line():
+            raise _RangesNotServed("multipart part longer than its Content-Range")
+        line = body.line().rstrip()
+        if line == delimiter + b"--":
+            return
+        if line != delimiter:
+            raise _RangesNotServed("malformed multipart body")
+
+
+def _write_ranges(parts, ranges: list[tuple[int, int | None]], file) -> None:
+    """Write the bytes of ranges, in order, out of the (first, last, total, blocks) parts.
+
+    A server may merge ranges into one part; the bytes between them are
+    skipped.
+    """
+    pending = list(ranges)
+    for first, last, total, blocks in parts:
+        position = first
+        for block in blocks:
+            while block and pending:
+                start, end = pending[0]
+                if end is None:
+                    end = total - 1 if total is not None else last
+                if position < start:
+                    skip = min(len(block), start - position)
+                    block = block[skip:]
+                    position += skip
+                    continue
+                if position > start:
+                    raise _RangesNotServed(f"bytes {start}-{position - 1} were not served")
+                taken = block[: end - start + 1]
+                file.write(taken)
+                position += len(taken)
+                block = block[len(taken) :]
+                pending[0] = (position, end)
+                if position > end:
+                    pending.pop(0)
+            position += len(block)
+    if pending:
+        raise IncompleteDownload(f"bytes from {pending[0][0]} were not received")
+
+
+def _fetch_ranges(
+    transport: Transport, url: str, ranges: list[tuple[int, int | None]], file
+) -> bool:
+    """Append ranges of url to file with one GET; False if they were not served.
+
+    Several ranges go into one Range header, answered as a
+    multipart/byteranges body (or as one merged part). False means the
+    server ignored Range (a 200 with the whole file) or, for several
+    ranges, answered with other ranges than asked; for a single range
+    such an answer raises requests.RequestException, as a failed attempt.
+    """
+    headers = {"Range": _range_header(ranges), "Accept-Encoding": "identity"}
+    with transport.get(url, headers=headers, stream=True, timeout=120) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            # 200 means the Range header was ignored and the body is the
+            # whole file; don't splice that in.
+            return False
+        match = re.match(
+            r'multipart/byteranges;\s*boundary="?([^";]+)"?',
+            response.headers.get("Content-Type", ""),
+            re.IGNORECASE,
+        )
+        try:
+            if match:
+                parts = _multipart_parts(response, match.group(1).encode("latin-1"))
+            else:
+                first, last, total = _content_range(response.headers.get("Content-Range", ""))
+                parts = [(first, last, total, response.iter_content(CHUNK_SIZE))]
+            _write_ranges(parts, ranges, file)
+        except _RangesNotServed as exc:
+            if len(ranges) > 1:
+                logger.debug("Multi-range answer from %s unusable: %s", url, exc)
+                return False
+            raise requests.RequestException(str(exc)) from exc
+    return True
+
+
+def download_subset(
+    transport: Transport,
+    url: str,
+    file_path: str,
+    *,
+    variables=GFS_WAVE_VARIABLES,
+    attempts: int = 3,
+    cache: DownloadCache | None = None,
+) -> bool:
+    """Fetch only the messages named in variables from url into file_path.
+
+    Returns False (leaving nothing at file_path) when the inventory is
+    unavailable or incomplete or the server does not honor Range; the
+    caller then downloads the whole file instead.
+    """
+    key = f"{url}#{','.join(sorted(variables))}"
+    cached = cache.lookup(key) if cache is not None else None
+    try:
+        response = transport.get(
+            url + ".idx",
+            headers=DownloadCache.conditional_headers(cached),
+            timeout=30,
+        )
+        if cached and response.status_code == 304:
+            if cache.place(key, file_path):
+                logger.debug("%s unchanged; reused cached subset", url)
+                return True
+            response = transport.get(url + ".idx", timeout=30)
+        response.raise_for_status()
+    except requests.RequestException as exc:
+        logger.info("No inventory for %s (%s); fetching the full file", url, exc)
+        return False
+
+    response_headers = response.headers
+    entries = parse_idx(response.text)
+    missing = set(variables) - {entry["variable"] for entry in entries}
+    if missing:
+        logger.warning(
+            "Inventory for %s lacks %s; fetching the full file",
+            url, ", ".join(sorted(missing)),
+        )
+        return False
+    ranges = select_ranges(entries, variables)
+
+    tmp_path = file_path + ".part"
+    # All ranges in one request; a server that will not answer several
+    # ranges at once gets one request per range instead.
+    batches = [ranges]
+    for attempt in range(1, attempts + 1):
+        try:
+            with open(tmp_path, "wb") as file:
+                served = all(_fetch_ranges(transport, url, batch, file) for batch in batches)
+                if not served and len(batches) < len(ranges):
+                    logger.info("%s did not serve a multi-range request; one per range", url)
+                    batches = [[byte_range] for byte_range in ranges]
+                    file.seek(0)
+                    file.truncate()
+                    served = all(_fetch_ranges(transport, url, batch, file) for batch in batches)
+                if not served:
+                    logger.warning("%s ignored the Range request; fetching the full file", url)
+                    os.remove(tmp_path)
+                    return False
+            os.replace(tmp_path, file_path)
+            if cache is not None:
+                cache.store(key, file_path, response_headers)
+            return True
+        except requests.RequestException as exc:
+            logger.warning(
+                "Range download attempt %d/%d failed for %s: %s",
+                attempt, attempts, url, exc,
+            )
+    try:
+        os.remove(tmp_path)
+    except FileNotFoundError:
+        pass
+    return False
@@ -0,0 +1,163 @@
+"""Static land/ice mask of a grid and ocean-only (wet-cell) vectors.
+
+Roughly 30% of every wave grid is land or ice: masked in every field of
+every hour. A WetIndex lists the other cells as sorted flat indices, so
+per-cell work (smoothing's normalization, arrow sampling, stored fields)
+can run on packed 1-D vectors of wet cells instead of the full lattice.
+
+The mask is detected from the data itself — a cell is dry when every
+mask is set and every field is NaN there (dry_cells()) — so no external
+land/sea dataset is needed. static_wet_index() caches one WetIndex per
+grid and hands the same object back, together with anything derived
+from it, for as long as the detected mask stays bit-identical. Within a
+run it does: the ice edge is fixed per cycle. cube_wet_index() skips
+the detection itself for as long as a cube's packed masks repeat. The
+index's cell list and derived
+arrays are shared read-only between workers (geometrycache.py), keyed by
+the mask's bits.
+"""
+
+import hashlib
+from collections.abc import Callable, Hashable
+
+import numpy as np
+
+from fieldcube import FieldCube
+from geometrycache import geometry_directory, key_digest, shared_arrays
+from grid import strided_cells
+
+
+class WetIndex:
+    """Flat indices of a grid's wet cells, with derived data memoized.
+
+    With shared=True the cells and derived arrays live in the shared
+    geometry cache instead of this process.
+    """
+
+    def __init__(self, dry: np.ndarray, *, shared: bool = False):
+        dry = np.asarray(dry, dtype=bool)
+        self.shape = dry.shape
+        self.packed = np.packbits(dry, axis=None)
+        self.digest = key_digest((self.shape, self.packed.tobytes())) if shared else None
+        self._derived: dict[Hashable, object] = {}
+        self.cells = self.derived("cells", lambda: np.flatnonzero(~dry))
+
+    @property
+    def size(self) -> int:
+        return self.cells.size
+
+    def matches(self, dry: np.ndarray) -> bool:
+        return dry.shape == self.shape and np.array_equal(
+            np.packbits(dry, axis=None), self.packed
+        )
+
+    def compress(self, array: np.ndarray) -> np.ndarray:
+        """(..., lat, lon) -> (..., wet cell) copy."""
+        return array.reshape(*array.shape[:-2], self.shape[0] * self.shape[1])[..., self.cells]
+
+    def expand(self, vectors: np.ndarray, fill, out: np.ndarray | None = None) -> np.ndarray:
+        """(..., wet cell) -> (..., lat, lon), dry cells set to fill.
+
+        fill is a scalar or one value per leading index (per field).
+        """
+        shape = (*vectors.shape[:-1], *self.shape)
+        if out is None:
+            out = np.empty(shape, dtype=vectors.dtype)
+        out[...] = np.reshape(fill, (*np.shape(fill), 1, 1))
+        out.reshape(*shape[:-2], self.shape[0] * self.shape[1])[..., self.cells] = vectors
+        return out
+
+    def derived(self, key: Hashable, build: Callable[[], np.ndarray | tuple]):
+        """build()'s array (or tuple of arrays), computed once per key for this mask."""
+        if key not in self._derived:
+            if self.digest is None:
+                self._derived[key] = build()
+            else:
+                self._derived[key] = _unpacked(
+                    shared_arrays(
+                        geometry_directory("wet"),
+                        (self.digest, key),
+                        lambda: _packed(build()),
+                    )
+                )
+        return self._derived[key]
+
+    def strided_cells(self, stride: int) -> tuple[np.ndarray, np.ndarray]:
+        """(rows, cols) of wet cells on the [::stride, ::stride] lattice.
+
+        Row-major, i.e. the order boolean indexing of the strided grid
+        visits them in.
+        """
+
+        def build():
+            rows, cols = np.divmod(self.cells, self.shape[1])
+            keep = (rows % stride == 0) & (cols % stride == 0)
+            return rows[keep], cols[keep]
+
+        return self.derived(("strided", stride), build)
+
+
+def _packed(built: np.ndarray | tuple) -> dict[str, np.ndarray]:
+    if isinstance(built, tuple):
+        return {f"item{index}": array for index, array in enumerate(built)}
+    return {"array": built}
+
+
+def _unpacked(arrays: dict[str, np.ndarray]) -> np.ndarray | tuple:
+    if "array" in arrays:
+        return arrays["array"]
+    return tuple(arrays[f"item{index}"] for index in range(len(arrays)))
+
+
+def dry_cells(cube: FieldCube) -> np.ndarray:
+    """Cells where every mask of cube is set and every field is NaN."""
+    dry = np.isnan(cube.values).all(axis=0)
+    if cube.mask_fields:
+        dry &= cube.unpacked_masks().all(axis=0)
+    for codes, codec in zip(cube.code_planes(), cube.codecs):
+        dry &= codes == codec.sentinel
+    return dry
+
+
+_STATIC: dict[Hashable, WetIndex] = {}
+
+
+def static_wet_index(key: Hashable, dry: np.ndarray) -> WetIndex:
+    """The cached WetIndex for key while dry is unchanged, else a new one."""
+    wet = _STATIC.get(key)
+    if wet is None or not wet.matches(dry):
+        wet = _STATIC[key] = WetIndex(dry, shared=True)
+    return wet
+
+
+_SCANNED: dict[Hashable, tuple[bytes, WetIndex]] = {}
+
+
+def cube_wet_index(key: Hashable, cube: FieldCube) -> WetIndex:
+    """static_wet_index() of cube's dry cells, its fields scanned only when its masks change.
+
+    dry_cells() reads every field of the cube. Its packed mask plane holds
+    the GRIB bitmaps the fields were filled with NaN from, at one bit per
+    cell and mask, so an hour whose masks are bit-identical to the last
+    scanned hour's reuses that hour's WetIndex after hashing them alone.
+    """
+    if not cube.mask_fields:
+        return static_wet_index(key, dry_cells(cube))
+    masks = hashlib.blake2b(repr((cube.masks.shape, cube.mask_fields)).encode())
+    masks.update(np.ascontiguousarray(cube.masks))
+    digest = masks.digest()
+    scanned = _SCANNED.get(key)
+    if scanned is not None and scanned[0] == digest:
+        return scanned[1]
+    wet = static_wet_index(key, dry_cells(cube))
+    _SCANNED[key] = (digest, wet)
+    return wet
+
+
+def sample_cells(
+    shape: tuple[int, int], stride: int, wet: WetIndex | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """(rows, cols) of the [::stride, ::stride] lattice, wet cells only if known."""
+    if wet is not None:
+        return wet.strided_cells(stride)
+    return strided_cells(shape, stride)
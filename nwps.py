@@ -36,9 +36,13 @@ import os
 
 import numpy as np
 import pygrib
-import requests
 from scipy.ndimage import distance_transform_edt
 
+from download import download_file, grib_staging_dir
+from gribcache import get_cache
+from grid import nearest_index
+from transport import Transport, newest_published
+
 logger = logging.getLogger("GFSWaveContours")
 
 BASE_URL = "https://nomads.ncep.noaa.gov/pub/data/nccf/com/nwps/prod"
@@ -92,43 +96,40 @@ def _grib_url(region: str, wfo: str, grid: str, date_str: str, cycle_hour: str)
 
 
 def find_latest_cycle(
-    session: requests.Session,
+    transport: Transport,
     region: str,
     wfo: str,
     grid: str,
     around: dt.datetime,
 ) -> tuple[str, str] | None:
-    """Newest published cycle for a domain, searching around the GFS run day."""
-    for day_offset in (1, 0, -1):
-        date_str = (around + dt.timedelta(days=day_offset)).strftime("%Y%m%d")
-        for cycle_hour in CYCLE_HOURS:
-            url = _grib_url(region, wfo, grid, date_str, cycle_hour)
-            try:
-                if session.head(url, timeout=10).status_code == 200:
-                    return date_str, cycle_hour
-            except requests.RequestException as exc:
-                logger.debug("NWPS HEAD failed for %s: %s", url, exc)
-    return None
+    """Newest published cycle for a domain, searching around the GFS run day.
+
+    Every candidate cycle is probed at once, as for the GFS run itself.
+    """
+    candidates = [
+        ((around + dt.timedelta(days=day_offset)).strftime("%Y%m%d"), cycle_hour)
+        for day_offset in (1, 0, -1)
+        for cycle_hour in CYCLE_HOURS
+    ]
+    return newest_published(
+        transport,
+        candidates,
+        lambda candidate: [_grib_url(region, wfo, grid, *candidate)],
+    )
 
 
-def _download(session: requests.Session, url: str, file_path: str, attempts: int = 3) -> bool:
+def _download(transport: Transport, url: str, file_path: str, attempts: int = 3) -> bool:
     if os.path.exists(file_path):
         return True
-    for attempt in range(1, attempts + 1):
-        try:
-            response = session.get(url, timeout=180)
-            response.raise_for_status()
-            tmp_path = file_path + ".part"
-            with open(tmp_path, "wb") as f:
-                f.write(response.content)
-            os.replace(tmp_path, file_path)
-            return True
-        except requests.RequestException as exc:
-            logger.warning(
-                "NWPS download attempt %d/%d failed for %s: %s",
-                attempt, attempts, url, exc,
-            )
-    return False
+    return download_file(
+        transport,
+        url,
+        file_path,
+        attempts=attempts,
+        timeout=180,
+        label="NWPS download",
+        cache=get_cache(),
+    )
 
 
 def extract_nwps_fields(filepath: str) -> dict:
@@ -224,7 +225,6 @@ class _Mosaic:
         n_lon = max(2, int(round((east - west) / lon_step)) + 1)
         self.lat = np.linspace(north, south, n_lat)
         self.lon = np.linspace(west, east, n_lon)
-        self.lat2d, self.lon2d = np.meshgrid(self.lat, self.lon, indexing="ij")
         self.shape = (n_lat, n_lon)
 
         # Per-domain nearest-neighbor index maps, restricted to the lattice
@@ -237,8 +237,8 @@ class _Mosaic:
             cols = np.nonzero(
                 (self.lon >= d["lon"].min() - 1e-9) & (self.lon <= d["lon"].max() + 1e-9)
             )[0]
-            src_rows = np.abs(self.lat[rows][:, None] - d["lat"][None, :]).argmin(axis=1)
-            src_cols = np.abs(self.lon[cols][:, None] - d["lon"][None, :]).argmin(axis=1)
+            src_rows = nearest_index(d["lat"], self.lat[rows])
+            src_cols = nearest_index(d["lon"], self.lon[cols])
             # Blend weight: 0 at the domain's own bounding-box edge ramping
             # to 1 over FEATHER_CELLS, so where domains overlap the one
             # painted later fades in over the earlier one instead of
@@ -344,7 +344,7 @@ def write_nwps_points(domain: dict, step_fields: dict, geojson_path: str) -> int
 
 
 def process_nwps_domains(
-    session: requests.Session,
+    transport: Transport,
     files_dir: str,
     forecast_start: dt.datetime,
     hour_sequence,
@@ -372,19 +372,23 @@ def process_nwps_domains(
         loaded: list[dict] = []
         for region, wfo in domains:
             try:
-                cycle = find_latest_cycle(session, region, wfo, grid, forecast_start)
+                cycle = find_latest_cycle(transport, region, wfo, grid, forecast_start)
                 if cycle is None:
                     logger.warning("No NWPS cycle found for %s/%s %s", region, wfo, grid)
                     continue
                 date_str, cycle_hour = cycle
                 file_name = f"{wfo}_nwps_{grid}_{date_str}_{cycle_hour}00.grib2"
-                file_path = os.path.join(files_dir, file_name)
+                file_path = os.path.join(grib_staging_dir(files_dir), file_name)
                 url = _grib_url(region, wfo, grid, date_str, cycle_hour)
-                if not _download(session, url, file_path):
+                if not _download(transport, url, file_path):
                     logger.error("Giving up on NWPS %s/%s %s", region, wfo, grid)
                     continue
 
-                data = extract_nwps_fields(file_path)
+                try:
+                    data = extract_nwps_fields(file_path)
+                finally:
+                    # Decoded steps are all that is used from here on.
+                    os.remove(file_path)
                 frames = select_frames(
                     hour_sequence, forecast_start, data["cycle_time"], data["steps"]
                 )
@@ -436,8 +440,8 @@ def process_nwps_domains(
                 height_grid, alpha = mosaic.compose(painted)
                 frame_bounds = render_heatmap(
                     {
-                        "lon": mosaic.lon2d,
-                        "lat": mosaic.lat2d,
+                        "lon": mosaic.lon,
+                        "lat": mosaic.lat,
                         "height": height_grid,
                     },
                     os.path.join(files_dir, f"nwps_{grid_slug}_{hour:03}.png"),
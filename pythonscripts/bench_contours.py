@@ -0,0 +1,134 @@
+"""Time contours.filled_bands against contourf and contourpy's default on a global hour.
+
+Run from the repository root: ``python pythonscripts/bench_contours.py``.
+Builds a smooth synthetic height field on the composite lattice, then
+prints, per contour stride, the best-of-N time of filled_bands() (the
+mpl2014 algorithm with corner masking, as matplotlib's contourf() used)
+and of contourpy's default serial algorithm on the same bands, and each
+one's ring count and covered area. The two algorithms trace the same
+bands with other vertices, so the areas should agree closely.
+
+The pipeline no longer depends on matplotlib. When it is importable
+anyway (``pip install matplotlib``), the old path is timed as the
+baseline too: contourf plus the allsegs/Path.to_polygons conversion
+calculate_contours4 used, with whether its rings equal filled_bands()'s
+and the speedup over it.
+"""
+
+import importlib.util
+import os
+import sys
+import timeit
+
+import contourpy
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from contours import MOVETO, filled_bands  # noqa: E402
+
+REPEATS = 3
+LEVELS = np.array([0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 4.0, 5.0, 6.0, 8.0, 20.0])
+
+
+def height_field() -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    lat = np.linspace(85.0, -85.0, 1021)
+    lon = np.arange(2160) / 6.0
+    height = gaussian_filter(rng.random((lat.size, lon.size)), 6) * 40 - 17
+    height = np.clip(height, 0, None).astype(np.float32)
+    land = gaussian_filter(rng.random(height.shape), 12) > 0.503
+    height[land] = np.nan
+    return lon, lat, height
+
+
+def serial_rings(lon, lat, grid) -> list[list[np.ndarray]]:
+    generator = contourpy.contour_generator(
+        lon, lat, np.ma.masked_invalid(grid), fill_type=contourpy.FillType.OuterCode
+    )
+    lowers = LEVELS[:-1].copy()
+    if np.nanmin(grid) == lowers[0]:
+        lowers[0] -= 1
+    return [
+        [
+            ring
+            for points, codes in zip(*generator.filled(lower, upper))
+            for ring in np.split(points, np.flatnonzero(codes == MOVETO)[1:])
+        ]
+        for lower, upper in zip(lowers, LEVELS[1:])
+    ]
+
+
+def matplotlib_rings(lon, lat, grid) -> list[list[np.ndarray]]:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.path import Path
+
+    fig, ax = plt.subplots(figsize=(4, 2.5), dpi=100)
+    try:
+        contour = ax.contourf(lon, lat, np.ma.masked_invalid(grid), levels=LEVELS, antialiased=True)
+    finally:
+        plt.close(fig)
+    return [
+        [ring for seg, kind in zip(segs, kinds) for ring in Path(seg, kind).to_polygons()]
+        for segs, kinds in zip(contour.allsegs, contour.allkinds)
+    ]
+
+
+def contourpy_rings(lon, lat, grid) -> list[list[np.ndarray]]:
+    return [
+        [ring for rings in polygons for ring in rings]
+        for _, _, polygons in filled_bands(lon, lat, grid, LEVELS)
+    ]
+
+
+def area(bands: list[list[np.ndarray]]) -> float:
+    """Net area of the rings (holes wind the other way and subtract)."""
+    return abs(
+        sum(
+            np.dot(ring[:-1, 0], ring[1:, 1]) - np.dot(ring[1:, 0], ring[:-1, 1])
+            for band in bands
+            for ring in band
+        )
+        / 2
+    )
+
+
+def main() -> None:
+    lon, lat, height = height_field()
+    baseline = importlib.util.find_spec("matplotlib") is not None
+    if not baseline:
+        print("matplotlib not installed: no contourf baseline")
+    print(
+        f"{'stride':>6} {'grid':>11} {'rings':>7} {'serial rings':>12} {'area':>10} "
+        f"{'serial area':>12} {'mpl2014 ms':>11} {'serial ms':>10}"
+        + (f" {'equal':>6} {'contourf ms':>12} {'speedup':>8}" if baseline else "")
+    )
+    for stride in (1, 2, 4):
+        args = (lon[::stride], lat[::stride], height[::stride, ::stride])
+        ours, serial = contourpy_rings(*args), serial_rings(*args)
+        ours_time = min(timeit.repeat(lambda: contourpy_rings(*args), number=1, repeat=REPEATS))
+        serial_time = min(timeit.repeat(lambda: serial_rings(*args), number=1, repeat=REPEATS))
+        shape = args[2].shape
+        row = (
+            f"{stride:>6} {f'{shape[0]}x{shape[1]}':>11} {sum(map(len, ours)):>7} "
+            f"{sum(map(len, serial)):>12} {area(ours):10.1f} {area(serial):12.1f} "
+            f"{ours_time * 1e3:11.1f} {serial_time * 1e3:10.1f}"
+        )
+        if baseline:
+            old = matplotlib_rings(*args)
+            equal = [len(band) for band in old] == [len(band) for band in ours] and all(
+                np.array_equal(a, b)
+                for band_old, band_ours in zip(old, ours)
+                for a, b in zip(band_old, band_ours)
+            )
+            old_time = min(timeit.repeat(lambda: matplotlib_rings(*args), number=1, repeat=REPEATS))
+            row += f" {str(equal):>6} {old_time * 1e3:12.1f} {old_time / ours_time:7.2f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Compare dense broadcast argmin with grid.nearest_index on pipeline axes.
+
+Run from the repository root: ``python pythonscripts/bench_nearest.py``.
+Prints, per call site, whether both methods pick identical indices and
+the best-of-N time of each.
+"""
+
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grid import nearest_index  # noqa: E402
+
+REPEATS = 5
+
+
+def dense_argmin(source: np.ndarray, target: np.ndarray) -> np.ndarray:
+    return np.abs(target[:, None] - source[None, :]).argmin(axis=1)
+
+
+def _merc_rows(lats: np.ndarray, rows_scale: float = 2.0) -> np.ndarray:
+    def merc_y(lat_deg):
+        return np.log(np.tan(np.pi / 4 + np.radians(lat_deg) / 2))
+
+    y = np.linspace(merc_y(lats[0]), merc_y(lats[-1]), int(lats.size * rows_scale))
+    return np.degrees(2 * np.arctan(np.exp(y)) - np.pi / 2)
+
+
+def cases() -> list[tuple[str, np.ndarray, np.ndarray]]:
+    target_lat = np.linspace(85.0, -85.0, 1021)
+    target_lon = np.arange(2160) / 6.0
+    # A CG2-like NWPS nest (~500 m) inside a finer mosaic lattice.
+    nwps_lon = np.linspace(-119.5, -117.0, 550)
+    mosaic_lon = np.linspace(-121.0, -116.5, 4000)
+    return [
+        ("composite 0p25 lat", np.linspace(90.0, -90.0, 721), target_lat),
+        ("composite 0p25 lon", np.arange(1440) * 0.25, target_lon),
+        ("composite 0p16 lon", np.arange(2160) / 6.0, target_lon),
+        ("heatmap mercator rows", target_lat, _merc_rows(target_lat)),
+        ("nwps mosaic cols", nwps_lon, mosaic_lon[(mosaic_lon >= -119.5) & (mosaic_lon <= -117.0)]),
+    ]
+
+
+def main() -> None:
+    print(f"{'call site':<24} {'N x M':>13} {'equal':>6} {'dense ms':>9} {'sorted ms':>10} {'speedup':>8}")
+    for name, source, target in cases():
+        equal = np.array_equal(dense_argmin(source, target), nearest_index(source, target))
+        dense = min(timeit.repeat(lambda: dense_argmin(source, target), number=1, repeat=REPEATS))
+        fast = min(timeit.repeat(lambda: nearest_index(source, target), number=1, repeat=REPEATS))
+        print(
+            f"{name:<24} {f'{target.size}x{source.size}':>13} {str(equal):>6} "
+            f"{dense * 1e3:9.2f} {fast * 1e3:10.3f} {dense / fast:7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
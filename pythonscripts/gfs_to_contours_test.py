@@ -1,7 +1,5 @@
 import os
 
-import requests
-
 from gfs_to_contours import (
     logger,
     setup_logging,
@@ -9,6 +7,7 @@ from gfs_to_contours import (
     write_metadata,
     process_forecast_hours,
 )
+from transport import get_transport
 
 
 def main() -> None:
@@ -26,8 +25,8 @@ def main() -> None:
     simplify_env = os.environ.get("CONTOUR_SIMPLIFY_TOLERANCE")
     simplify_tolerance = float(simplify_env) if simplify_env else None
 
-    with requests.Session() as session:
-        date_str, hour = find_latest_gfs_time(session=session)
+    with get_transport() as transport:
+        date_str, hour = find_latest_gfs_time(transport)
         logger.info(
             "[test] Found latest GFS wave data for date %s hour %sZ", date_str, hour
         )
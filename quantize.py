@@ -0,0 +1,110 @@
+"""16-bit fixed-point storage for fields that are only published rounded.
+
+The arrow writers publish swell partition heights to 2 decimals, periods
+and wind speeds/components to 1 decimal, and directions in whole
+degrees; nothing else reads those fields. Keeping them as float32
+between decode and output is twice the memory they need. A Codec stores
+a field as round(value * 10**decimals) in int16 (uint16 for directions),
+with the type's extreme as the NaN sentinel. Signed codecs reserve the
+next code for negative values that round to zero, which Python's round()
+keeps (and JSON publishes) as -0.0.
+
+Nothing published changes: float32 * 10**decimals is exact in float64,
+so the stored integer is exactly the one Python's round() picks (both
+round half to even), and codes / 10**decimals decodes to the same double
+round(value, decimals) returns.
+
+Opt in with QUANTIZE_FIELDS=1.
+"""
+
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class Codec:
+    decimals: int
+    signed: bool = True
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(np.int16 if self.signed else np.uint16)
+
+    @property
+    def sentinel(self) -> int:
+        info = np.iinfo(self.dtype)
+        return info.min if self.signed else info.max
+
+    @property
+    def negative_zero(self) -> int | None:
+        return np.iinfo(self.dtype).min + 1 if self.signed else None
+
+    def encode(self, values: np.ndarray) -> np.ndarray:
+        """Codes of values (any float array), NaN -> sentinel; out-of-range values clip."""
+        info = np.iinfo(self.dtype)
+        scaled = np.rint(np.asarray(values, dtype=np.float64) * 10**self.decimals)
+        nan = np.isnan(scaled)
+        low = info.min + 2 if self.signed else info.min
+        high = info.max if self.signed else info.max - 1
+        np.clip(scaled, low, high, out=scaled)
+        if self.signed:
+            scaled[(scaled == 0) & np.signbit(scaled)] = self.negative_zero
+        scaled[nan] = self.sentinel
+        return scaled.astype(self.dtype)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """float64 values of codes, NaN where the sentinel is."""
+        values = codes.astype(np.float64)
+        values /= 10**self.decimals
+        if self.signed:
+            values[codes == self.negative_zero] = -0.0
+        values[codes == self.sentinel] = np.nan
+        return values
+
+
+# By the last component of a field's flattened name (see fieldcube.py).
+CODECS = {
+    "height": Codec(2),
+    "period": Codec(1),
+    "speed": Codec(1),
+    "u": Codec(1),
+    "v": Codec(1),
+    "direction": Codec(0, signed=False),
+}
+
+
+def codec_for(name: str) -> Codec:
+    return CODECS[name.rpartition(".")[2]]
+
+
+def quantize_enabled() -> bool:
+    return os.environ.get("QUANTIZE_FIELDS", "").lower() in ("1", "true", "yes")
+
+
+class QuantizedField:
+    """A coded 2-D field; indexing it yields decoded float64 values.
+
+    Writers sample it like an array (``field[rows, cols]``); only the
+    sample is ever decoded.
+    """
+
+    def __init__(self, codes: np.ndarray, codec: Codec):
+        self.codes = codes
+        self.codec = codec
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.codes.shape
+
+    @property
+    def ndim(self) -> int:
+        return self.codes.ndim
+
+    def __getitem__(self, index) -> np.ndarray:
+        return self.codec.decode(np.asarray(self.codes[index]))
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        values = self.codec.decode(self.codes)
+        return values if dtype is None else values.astype(dtype)
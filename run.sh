@@ -3,11 +3,13 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 LOCAL=false
 VERBOSE=false
 LIMIT=0
+FORCE=false
 LOCAL_DEST_PATH="${LOCAL_DEST_PATH:-"$SCRIPT_DIR/../open-swells-app/data/forecast"}"
 
 usage() {
-    echo "Usage: $0 [--local] [--verbose] [--limit <n>]"
+    echo "Usage: $0 [--local] [--verbose] [--limit <n>] [--force]"
     echo "  --limit <n>  only process the first n forecast hours (quick checks)"
+    echo "  --force      run even if the newest GFS cycle is already published"
 }
 
 while [ "$#" -gt 0 ]; do
@@ -18,6 +20,9 @@ while [ "$#" -gt 0 ]; do
         --verbose)
             VERBOSE=true
             ;;
+        --force)
+            FORCE=true
+            ;;
         --limit)
             shift
             if [ "$#" -eq 0 ] || ! [[ "$1" =~ ^[0-9]+$ ]] || [ "$1" -lt 1 ]; then
@@ -60,7 +65,11 @@ copy_files_locally() {
     fi
 
     shopt -s nullglob
-    local contour_files=("$source_path"/*.geojson "$source_path"/*.geojson.gz "$source_path"/*.png)
+    local contour_files=(
+        "$source_path"/*.geojson "$source_path"/*.geojson.gz
+        "$source_path"/*.topojson "$source_path"/*.topojson.gz
+        "$source_path"/*.png
+    )
     shopt -u nullglob
     if [ -f "$source_path/tides.json" ]; then
         contour_files+=("$source_path/tides.json")
@@ -92,6 +101,11 @@ if [ "$VERBOSE" = true ]; then
     export GRIB_PROGRESS=1
     echo "Progress will display here; full log: $SCRIPT_DIR/logs/grib-run.log"
 fi
+# Each pool worker renders one hour single-threaded; BLAS/OpenMP pools
+# sized to every core would oversubscribe them. Read when numpy loads.
+export OMP_NUM_THREADS="${OMP_NUM_THREADS:-1}"
+export OPENBLAS_NUM_THREADS="${OPENBLAS_NUM_THREADS:-1}"
+export MKL_NUM_THREADS="${MKL_NUM_THREADS:-1}"
 exec >>"$SCRIPT_DIR/logs/grib-run.log" 2>&1
 echo "==== $(date -Is) START $$ ===="
 
@@ -99,6 +113,22 @@ echo "==== $(date -Is) START $$ ===="
 # runs, so the server keeps serving the previous complete run.
 set -euo pipefail
 
+# The timer fires four times a day whether or not NOAA has a new cycle.
+# Publishing runs first ask the parser (a few concurrent HEAD requests) and
+# stop here, before anything is deleted or downloaded, when the newest
+# complete cycle is the one already on the server. Local and --limit runs
+# are checks by a person and always run.
+if [ "$FORCE" = false ] && [ "$LOCAL" = false ] && [ "$LIMIT" -eq 0 ]; then
+    check_status=0
+    "$SCRIPT_DIR/scripts/grib_parse_runner.sh" --check || check_status=$?
+    if [ "$check_status" -eq 3 ]; then
+        echo "Newest GFS cycle is already published; nothing to do"
+        exit 0
+    elif [ "$check_status" -ne 0 ]; then
+        echo "Cycle check failed (status $check_status); running anyway"
+    fi
+fi
+
 echo "Deleting local grib files"
 "$SCRIPT_DIR/scripts/delete_gribs.sh"
 
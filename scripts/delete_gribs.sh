@@ -16,7 +16,9 @@ echo "All .grib2 files have been deleted."
 find "$FILES_DIR" -type f -name '*.grib2.part' -delete
 find "$FILES_DIR" -type f -name '*.geojson' -delete
 find "$FILES_DIR" -type f -name '*.geojson.gz' -delete
-echo "All .geojson files have been deleted."
+find "$FILES_DIR" -type f -name '*.topojson' -delete
+find "$FILES_DIR" -type f -name '*.topojson.gz' -delete
+echo "All .geojson and .topojson files have been deleted."
 find "$FILES_DIR" -type f -name 'heatmap_*.png' -delete
 find "$FILES_DIR" -type f -name 'nwps_*.png' -delete
 echo "All heatmap .png files have been deleted."
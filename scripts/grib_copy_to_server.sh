@@ -42,7 +42,11 @@ if ! command -v rsync >/dev/null; then
 fi
 
 shopt -s nullglob
-contour_files=("$SOURCE_PATH"/*.geojson "$SOURCE_PATH"/*.geojson.gz "$SOURCE_PATH"/*.png)
+contour_files=(
+    "$SOURCE_PATH"/*.geojson "$SOURCE_PATH"/*.geojson.gz
+    "$SOURCE_PATH"/*.topojson "$SOURCE_PATH"/*.topojson.gz
+    "$SOURCE_PATH"/*.png
+)
 shopt -u nullglob
 if [ -f "$SOURCE_PATH/tides.json" ]; then
     contour_files+=("$SOURCE_PATH/tides.json")
@@ -62,6 +66,12 @@ fi
 if [ -f "$SOURCE_PATH/metadata.json" ]; then
     echo "Copying metadata.json"
     rsync -t -e "ssh -i $SSH_KEY_PATH" "$SOURCE_PATH/metadata.json" "$DEST_PATH"
+    # The run is now live; remember its cycle so the next timer fire can
+    # exit early when NOAA has published nothing newer (run.sh --check).
+    STATE_DIR="${STATE_DIR:-"$PROJECT_ROOT/state"}"
+    mkdir -p "$STATE_DIR"
+    cp "$SOURCE_PATH/metadata.json" "$STATE_DIR/last_published.json.tmp"
+    mv "$STATE_DIR/last_published.json.tmp" "$STATE_DIR/last_published.json"
 elif [ ${#contour_files[@]} -eq 0 ]; then
     echo "No metadata.json to copy from $SOURCE_PATH"
 fi
@@ -4,6 +4,13 @@ set -euo pipefail
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PROJECT_ROOT="$(cd "$SCRIPT_DIR/.." && pwd)"
 
+# --check: only ask the parser whether a new GFS cycle is out (exit 0) or
+# the newest one is already published (exit 3). Nothing is cleaned up.
+CHECK_ONLY=false
+if [ "${1:-}" = "--check" ]; then
+    CHECK_ONLY=true
+fi
+
 ENV_FILE="${ENV_FILE:-"$PROJECT_ROOT/.env"}"
 if [ ! -f "$ENV_FILE" ]; then
     echo "Error: env file not found at $ENV_FILE" >&2
@@ -54,9 +61,6 @@ fi
 
 mkdir -p "$FILES_DIR" "$LOG_DIR"
 
-echo "Cleaning files directory: $FILES_DIR"
-rm -f "$FILES_DIR"/*
-
 PYTHON_BIN="${PYTHON_BIN:-$PROJECT_ROOT/.venv/bin/python}"
 
 if [ ! -x "$PYTHON_BIN" ]; then
@@ -64,7 +68,23 @@ if [ ! -x "$PYTHON_BIN" ]; then
     exit 1
 fi
 
-export FILES_DIR LOG_DIR
+STATE_DIR="${STATE_DIR:-"$PROJECT_ROOT/state"}"
+export FILES_DIR LOG_DIR STATE_DIR
+
+if [ "$CHECK_ONLY" = true ]; then
+    exec "$PYTHON_BIN" "$PYTHON_SCRIPT" --check
+fi
+
+echo "Cleaning files directory: $FILES_DIR"
+rm -f "$FILES_DIR"/*
+
+# GRIB_STAGING_DIR (e.g. a tmpfs) only ever holds downloaded GRIBs, so only
+# those are removed from it; it may live outside the repository.
+if [ -n "${GRIB_STAGING_DIR:-}" ]; then
+    echo "Cleaning GRIB staging directory: $GRIB_STAGING_DIR"
+    mkdir -p "$GRIB_STAGING_DIR"
+    rm -f "$GRIB_STAGING_DIR"/*.grib2 "$GRIB_STAGING_DIR"/*.grib2.part
+fi
 
 echo "Running Python script with interpreter: $PYTHON_BIN"
 "$PYTHON_BIN" "$PYTHON_SCRIPT"
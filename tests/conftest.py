@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Keep the shared geometry written by the code under test (grid axes,
+# land-mask indices, heatmap row maps) out of the repository's cache/.
+_geometry = tempfile.TemporaryDirectory()
+os.environ.setdefault("GEOMETRY_CACHE_DIR", _geometry.name)
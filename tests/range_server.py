@@ -0,0 +1,162 @@
+"""Local HTTP stand-in for NOMADS used by the download tests.
+
+Serves in-memory files with HEAD, single-range GET (206 + Content-Range),
+multi-range GET (206 multipart/byteranges), ETag revalidation
+(If-None-Match -> 304, If-Range) and per-request logging, so tests can
+assert which bytes were fetched.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class RangeServer:
+    """Threaded HTTP server over a {path: bytes} mapping.
+
+    Use as a context manager; ``url(path)`` builds request URLs. Every
+    request is appended to ``requests`` as (method, path, range_header)
+    and answered with an ETag derived from the file's current content.
+    ``honor_range=False`` makes it behave like a server that ignores Range,
+    ``multirange=False`` like one that ignores it only when it lists
+    several ranges, ``content_range=False`` leaves Content-Range off
+    single-range answers (a broken proxy), ``delay`` sleeps before each
+    response (a throttled link), each entry of ``cut_after`` drops one
+    GET's connection after that many body bytes (a mid-transfer reset),
+    and each entry of ``errors`` answers one request with that status and
+    ``Retry-After: 0`` (an overloaded server).
+    """
+
+    def __init__(
+        self,
+        files: dict[str, bytes],
+        *,
+        honor_range: bool = True,
+        multirange: bool = True,
+        content_range: bool = True,
+        delay: float = 0.0,
+        cut_after: list[int] | None = None,
+        errors: list[int] | None = None,
+    ):
+        self.files = dict(files)
+        self.honor_range = honor_range
+        self.multirange = multirange
+        self.content_range = content_range
+        self.delay = delay
+        self.cut_after = list(cut_after or [])
+        self.errors = list(errors or [])
+        self.requests: list[tuple[str, str, str | None]] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, include_body: bool):
+                range_header = self.headers.get("Range")
+                with server._lock:
+                    server.requests.append((self.command, self.path, range_header))
+                    error = server.errors.pop(0) if server.errors else None
+                if server.delay:
+                    time.sleep(server.delay)
+                if error is not None:
+                    self.send_response(error)
+                    self.send_header("Retry-After", "0")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+                status = 200
+                headers = {}
+                specs = re.findall(r"(\d+)-(\d*)", range_header or "")
+                if not re.fullmatch(r"bytes=\d+-\d*(,\d+-\d*)*", range_header or ""):
+                    specs = []
+                if len(specs) > 1 and not server.multirange:
+                    specs = []
+                if self.headers.get("If-Range", etag) != etag:
+                    specs = []  # changed since: the whole file
+                if server.honor_range and specs:
+                    total = len(body)
+                    spans = [
+                        (int(start), min(int(end) if end else total - 1, total - 1))
+                        for start, end in specs
+                        if int(start) < total
+                    ]
+                    if not spans:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{total}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+                    if len(specs) == 1:
+                        start, end = spans[0]
+                        if server.content_range:
+                            headers["Content-Range"] = f"bytes {start}-{end}/{total}"
+                        body = body[start : end + 1]
+                    else:
+                        boundary = "RANGESERVERBOUNDARY"
+                        headers["Content-Type"] = f"multipart/byteranges; boundary={boundary}"
+                        body = b"".join(
+                            f"--{boundary}\r\n"
+                            "Content-Type: application/octet-stream\r\n"
+                            f"Content-Range: bytes {start}-{end}/{total}\r\n\r\n".encode()
+                            + body[start : end + 1]
+                            + b"\r\n"
+                            for start, end in spans
+                        ) + f"--{boundary}--\r\n".encode()
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if not include_body:
+                    return
+                with server._lock:
+                    cut = server.cut_after.pop(0) if server.cut_after else None
+                if cut is not None and cut < len(body):
+                    self.wfile.write(body[:cut])
+                    self.wfile.flush()
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._serve(include_body=True)
+
+            def do_HEAD(self):
+                self._serve(include_body=False)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}{path}"
+
+    def __enter__(self) -> "RangeServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
@@ -0,0 +1,117 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import admission
+from admission import Admission, available_memory, map_admitted, usable_cpus
+
+GB = 1_000_000_000
+
+
+def write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+class AvailableMemoryTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.meminfo = os.path.join(self.root, "meminfo")
+        self.proc_cgroup = os.path.join(self.root, "cgroup")
+        self.cgroups = os.path.join(self.root, "sys")
+        write(self.meminfo, "MemTotal:  16000000 kB\nMemAvailable:  8000000 kB\n")
+
+    def available(self):
+        return available_memory(self.meminfo, self.proc_cgroup, self.cgroups)
+
+    def test_meminfo_without_cgroup_limit(self):
+        write(self.proc_cgroup, "0::/\n")
+        write(os.path.join(self.cgroups, "memory.max"), "max\n")
+        write(os.path.join(self.cgroups, "memory.current"), "1000\n")
+        self.assertEqual(self.available(), 8_192_000_000)
+
+    def test_cgroup_v2_headroom_is_the_tighter_bound(self):
+        write(self.proc_cgroup, "0::/grib.service\n")
+        service = os.path.join(self.cgroups, "grib.service")
+        write(os.path.join(service, "memory.max"), str(3 * GB))
+        write(os.path.join(service, "memory.current"), str(1 * GB))
+        self.assertEqual(self.available(), 2 * GB)
+
+    def test_cgroup_v1_limit(self):
+        write(self.proc_cgroup, "4:memory:/job\n0::/\n")
+        job = os.path.join(self.cgroups, "memory", "job")
+        write(os.path.join(job, "memory.limit_in_bytes"), str(4 * GB))
+        write(os.path.join(job, "memory.usage_in_bytes"), str(3 * GB))
+        self.assertEqual(self.available(), 1 * GB)
+
+    def test_cpu_quota_caps_usable_cores(self):
+        write(self.proc_cgroup, "0::/\n")
+        write(os.path.join(self.cgroups, "cpu.max"), "150000 100000\n")
+        self.assertEqual(usable_cpus(self.proc_cgroup, self.cgroups), min(2, os.cpu_count()))
+
+
+class AdmissionTests(unittest.TestCase):
+    def test_hours_are_admitted_while_they_fit(self):
+        gate = Admission(8, hour_bytes=1 * GB, reserve=0, available=lambda: 3 * GB)
+        self.assertEqual([gate.admits(n) for n in range(4)], [True, True, True, False])
+
+        # Measured peaks replace the default estimate.
+        gate.record(GB // 2)
+        self.assertTrue(gate.admits(5))
+        self.assertFalse(gate.admits(6))
+        self.assertFalse(Admission(2, available=lambda: 100 * GB).admits(2))
+
+    def test_one_hour_runs_even_without_room(self):
+        gate = Admission(4, hour_bytes=2 * GB, reserve=0, available=lambda: GB)
+        self.assertTrue(gate.admits(0))
+        self.assertFalse(gate.admits(1))
+
+    def test_memory_taken_since_the_start_counts(self):
+        free = [4 * GB]
+        gate = Admission(8, hour_bytes=1 * GB, reserve=0, available=lambda: free[0])
+        self.assertTrue(gate.admits(1))
+        free[0] = GB // 2
+        self.assertFalse(gate.admits(1))
+
+    def test_unknown_memory_falls_back_to_the_worker_count(self):
+        gate = Admission(3, available=lambda: None)
+        self.assertTrue(gate.admits(2))
+        self.assertFalse(gate.admits(3))
+
+
+class MapAdmittedTests(unittest.TestCase):
+    def test_results_in_order_with_bounded_concurrency(self):
+        running = 0
+        most_running = 0
+        lock = threading.Lock()
+
+        def square(value):
+            nonlocal running, most_running
+            with lock:
+                running += 1
+                most_running = max(most_running, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return value * value
+
+        gate = Admission(4, hour_bytes=GB, reserve=0, available=lambda: 2 * GB)
+        with (
+            patch.object(admission, "peak_rss", lambda: GB),
+            ThreadPoolExecutor(max_workers=4) as pool,
+        ):
+            results = map_admitted(pool, square, range(6), admission=gate)
+        self.assertEqual(results, [0, 1, 4, 9, 16, 25])
+        self.assertEqual(most_running, 2)
+        self.assertEqual(gate.measured_peak, GB)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import gfs_to_contours
+from buffers import BufferArena, scratch
+
+
+def make_height_data(seed):
+    rng = np.random.default_rng(seed)
+    lat = np.linspace(30.0, -30.0, 121).astype(np.float32)
+    lon = (np.arange(240) * 0.5).astype(np.float32)
+    lon_grid, lat_grid = np.meshgrid(lon, lat)
+    height = 3 + 2 * np.sin(lon_grid / 9) * np.cos(lat_grid / 7) + rng.random(lon_grid.shape)
+    mask = rng.random(height.shape) < 0.05
+    height[rng.random(height.shape) < 0.01] = np.nan
+    return {"lon": lon, "lat": lat, "height": height.astype(np.float32), "height_mask": mask}
+
+
+class BufferArenaTests(unittest.TestCase):
+    def test_buffers_are_reused_until_shape_or_dtype_changes(self):
+        arena = BufferArena()
+        first = arena.take("grid", (4, 5))
+        self.assertIs(arena.take("grid", (4, 5)), first)
+        self.assertIsNot(arena.take("grid", (4, 5), np.float64), first)
+        self.assertEqual(arena.nbytes, 4 * 5 * 8)
+        self.assertIsNot(scratch(None, "grid", (4, 5)), scratch(None, "grid", (4, 5)))
+
+    def test_outputs_match_without_arena_across_reuse(self):
+        arena = BufferArena()
+        with tempfile.TemporaryDirectory() as directory:
+
+            def render(data, tag, **kwargs):
+                png = os.path.join(directory, f"{tag}.png")
+                contours = os.path.join(directory, f"{tag}.geojson")
+                bounds = gfs_to_contours.render_heatmap_png(data, png, **kwargs)
+                gfs_to_contours.calculate_contours4(data, contours, stride=2, **kwargs)
+                outputs = [bounds]
+                for path in (png, contours):
+                    with open(path, "rb") as f:
+                        outputs.append(f.read())
+                return outputs
+
+            # The second hour runs on buffers dirtied by the first.
+            for seed in (1, 2):
+                data = make_height_data(seed)
+                self.assertEqual(render(data, "arena", arena=arena), render(data, "fresh"))
+        self.assertGreater(arena.nbytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,17 @@
 import datetime as dt
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 
 import numpy as np
 
+import composite
+import fieldcube
+import geometrycache
+from buffers import BufferArena
 from composite import composite_swell, composite_wind
+from fieldcube import pack_masks, stacked
 
 VALID_DATE = dt.datetime(2026, 7, 13, tzinfo=dt.UTC)
 
@@ -57,6 +65,15 @@ def make_wind_data(lat_axis, lon_axis, value):
     }
 
 
+def setUpModule():
+    # Keep persisted regrid plans out of the repository's cache/.
+    tmp = tempfile.TemporaryDirectory()
+    patcher = patch.dict(os.environ, {"REGRID_CACHE_DIR": tmp.name})
+    patcher.start()
+    unittest.addModuleCleanup(tmp.cleanup)
+    unittest.addModuleCleanup(patcher.stop)
+
+
 class CompositeSwellTests(unittest.TestCase):
     def test_band_from_fine_grid_and_poles_from_coarse_grid(self):
         hi = make_swell_data(HI_LAT, HI_LON, 2.0)
@@ -64,11 +81,13 @@ class CompositeSwellTests(unittest.TestCase):
 
         combined = composite_swell(hi, lo)
 
-        lat_axis = combined["lat"][:, 0]
+        # The composite carries 1-D axes, not full lon/lat meshes.
+        lat_axis = combined["lat"]
         self.assertEqual(combined["height"].shape, (1021, 2160))
+        self.assertEqual((lat_axis.shape, combined["lon"].shape), ((1021,), (2160,)))
         self.assertAlmostEqual(float(lat_axis[0]), 85.0, places=4)
         self.assertAlmostEqual(float(lat_axis[-1]), -85.0, places=4)
-        self.assertAlmostEqual(float(combined["lon"][0, -1]), 359.8333, places=3)
+        self.assertAlmostEqual(float(combined["lon"][-1]), 359.8333, places=3)
 
         in_band = (lat_axis >= -15.0) & (lat_axis <= 52.5)
         np.testing.assert_array_equal(combined["height"][in_band], 2.0)
@@ -83,6 +102,21 @@ class CompositeSwellTests(unittest.TestCase):
         self.assertEqual(combined["height_mask"].dtype, np.bool_)
         self.assertEqual(combined["height"].dtype, np.float32)
 
+    def test_masks_are_gathered_unpacked_into_the_arena(self):
+        hi = stacked(make_swell_data(HI_LAT, HI_LON, 2.0))
+        lo = stacked(make_swell_data(LO_LAT, LO_LON, 5.0))
+        arena = BufferArena()
+        with (
+            patch.object(fieldcube, "pack_masks", wraps=pack_masks) as pack,
+            patch.object(np, "unpackbits", wraps=np.unpackbits) as unpack,
+        ):
+            combined = composite_swell(hi, lo, arena=arena)
+        self.assertEqual((pack.call_count, unpack.call_count), (0, 0))
+        cube = combined["cube"]
+        self.assertTrue(np.shares_memory(combined["height_mask"], cube.unpacked_masks()))
+        # The packed plane is still there for the field cache and digests.
+        np.testing.assert_array_equal(cube.masks, pack_masks(cube.unpacked_masks()))
+
     def test_fully_masked_edge_rows_fall_back_to_coarse_grid(self):
         # The real 0p16 product pads its band edges with all-masked rows;
         # those must come from the coarse grid, not punch transparent seams.
@@ -93,7 +127,7 @@ class CompositeSwellTests(unittest.TestCase):
 
         combined = composite_swell(hi, lo)
 
-        lat_axis = combined["lat"][:, 0]
+        lat_axis = combined["lat"]
         self.assertFalse(combined["height_mask"].any())
         # lat_axis is float32; use a tolerance well below the 1/6 deg step.
         data_band = (lat_axis >= HI_LAT[-16] - 1e-3) & (lat_axis <= HI_LAT[2] + 1e-3)
@@ -132,7 +166,7 @@ class CompositeWindTests(unittest.TestCase):
 
         combined = composite_wind(hi, lo)
 
-        lat_axis = combined["lat"][:, 0]
+        lat_axis = combined["lat"]
         in_band = (lat_axis >= -15.0) & (lat_axis <= 52.5)
         np.testing.assert_array_equal(combined["speed"][in_band], 7.0)
         np.testing.assert_array_equal(combined["speed"][~in_band], 12.0)
@@ -140,5 +174,116 @@ class CompositeWindTests(unittest.TestCase):
         self.assertEqual(combined["mask"].dtype, np.bool_)
 
 
+class RegridPlanTests(unittest.TestCase):
+    def test_plan_is_shared_and_persisted(self):
+        hi = make_swell_data(HI_LAT, HI_LON, 2.0)
+        lo = make_swell_data(LO_LAT, LO_LON, 5.0)
+        composite._PLANS.clear()
+        first = composite.regrid_plan(hi, lo, hi["height_mask"])
+        wind_hi = make_wind_data(HI_LAT, HI_LON, 7.0)
+        wind_lo = make_wind_data(LO_LAT, LO_LON, 12.0)
+        self.assertIs(composite.regrid_plan(wind_hi, wind_lo, wind_hi["mask"]), first)
+
+        # A new process (empty memo) maps the indices from disk instead.
+        composite._PLANS.clear()
+        geometrycache._MAPPED.clear()
+        with patch.object(composite.RegridPlan, "build", side_effect=AssertionError):
+            loaded = composite.regrid_plan(hi, lo, hi["height_mask"])
+        for name, array in first.arrays().items():
+            self.assertIsInstance(loaded.arrays()[name], np.memmap)
+            np.testing.assert_array_equal(loaded.arrays()[name], array)
+
+        # A different valid band is a different plan.
+        hi["height_mask"][:2] = True
+        self.assertIsNot(composite.regrid_plan(hi, lo, hi["height_mask"]), loaded)
+
+    def test_pick_matches_per_cell_nearest_lookup(self):
+        rng = np.random.default_rng(0)
+        hi = make_swell_data(HI_LAT, HI_LON, 0.0)
+        lo = make_swell_data(LO_LAT, LO_LON, 0.0)
+        hi_values = rng.random(hi["height"].shape, dtype=np.float32)
+        lo_values = rng.random(lo["height"].shape, dtype=np.float32)
+        plan = composite.regrid_plan(hi, lo, hi["height_mask"])
+
+        picked = plan.pick(hi_values, lo_values)
+
+        target_lat, target_lon = composite._target_axes()
+        for row in (0, 200, 400, 700, 1020):
+            for col in (0, 1000, 2159):
+                lat, lon = target_lat[row], target_lon[col]
+                if -15.0 - 1e-6 <= lat <= 52.5 + 1e-6:
+                    source = hi_values[np.abs(HI_LAT - lat).argmin(), np.abs(HI_LON - lon).argmin()]
+                else:
+                    source = lo_values[np.abs(LO_LAT - lat).argmin(), np.abs(LO_LON - lon).argmin()]
+                self.assertEqual(picked[row, col], source)
+
+
+class RegionTests(unittest.TestCase):
+    def varied(self, lat, lon, seed):
+        rng = np.random.default_rng(seed)
+        data = make_swell_data(lat, lon, 0.0)
+        data["height"] = rng.random(data["height"].shape, dtype=np.float32)
+        return data
+
+    def composite_in(self, region, hi, lo):
+        with patch.dict(os.environ, {"REGION_BBOX": region}):
+            return composite_swell(hi, lo)
+
+    def test_box_across_the_antimeridian_is_cut_from_the_global_composite(self):
+        hi = self.varied(HI_LAT, HI_LON, 1)
+        lo = self.varied(LO_LAT, LO_LON, 2)
+        full = composite_swell(hi, lo)
+        regional = self.composite_in("150,-20,-120,60", hi, lo)
+
+        lon = regional["lon"]
+        self.assertAlmostEqual(float(lon[0]), 150.0, places=4)
+        self.assertAlmostEqual(float(lon[-1]), 240.0, places=4)
+        self.assertTrue((np.diff(lon) > 0).all())
+        self.assertAlmostEqual(float(regional["lat"][0]), 60.0, places=4)
+        self.assertAlmostEqual(float(regional["lat"][-1]), -20.0, places=4)
+
+        rows = np.flatnonzero(np.isin(full["lat"], regional["lat"]))
+        cols = np.flatnonzero(np.isin(full["lon"], lon))
+        np.testing.assert_array_equal(regional["height"], full["height"][rows[:, None], cols])
+        np.testing.assert_array_equal(
+            regional["height_mask"], full["height_mask"][rows[:, None], cols]
+        )
+
+    def test_box_across_the_prime_meridian_continues_past_360(self):
+        hi = self.varied(HI_LAT, HI_LON, 3)
+        lo = self.varied(LO_LAT, LO_LON, 4)
+        full = composite_swell(hi, lo)
+        regional = self.composite_in("-10,-5,10,5", hi, lo)
+        lon = regional["lon"].astype(np.float64)
+        np.testing.assert_allclose([lon[0], lon[-1]], [350.0, 370.0], atol=1e-4)
+        self.assertTrue((np.diff(lon) > 0).all())
+
+        east = int(np.argmin(np.abs(lon - 361.0)))
+        col = int(np.argmin(np.abs(full["lon"] - 1.0)))
+        row = int(np.argmin(np.abs(full["lat"] - regional["lat"][3])))
+        self.assertEqual(regional["height"][3, east], full["height"][row, col])
+
+    def test_lone_grid_is_cut_natively(self):
+        lo = self.varied(LO_LAT, LO_LON, 5)
+        regional = self.composite_in("170,-10,-170,10", None, lo)
+        np.testing.assert_allclose(regional["lon"][[0, -1]], [170.0, 190.0])
+        np.testing.assert_allclose(regional["lat"][[0, -1]], [10.0, -10.0])
+        rows = np.flatnonzero((LO_LAT >= -10) & (LO_LAT <= 10))
+        cols = np.flatnonzero((LO_LON >= 170) & (LO_LON <= 190))
+        np.testing.assert_array_equal(regional["height"], lo["height"][rows[:, None], cols])
+
+    def test_box_outside_a_lone_grid_is_rejected(self):
+        hi = make_swell_data(HI_LAT, HI_LON, 2.0)
+        with self.assertRaisesRegex(ValueError, "holds no grid cells"):
+            self.composite_in("10,60,20,70", hi, None)
+
+    def test_malformed_box_is_rejected(self):
+        hi = make_swell_data(HI_LAT, HI_LON, 2.0)
+        lo = make_swell_data(LO_LAT, LO_LON, 5.0)
+        for value in ("1,2,3", "10,40,20,30", "east,1,2,3"):
+            with self.assertRaises(ValueError):
+                self.composite_in(value, hi, lo)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,251 @@
+import importlib.util
+import unittest
+import warnings
+
+import geojson
+import numpy as np
+import shapely
+from shapely.geometry import Polygon
+from shapely.ops import transform as shapely_transform
+
+import contours
+from contours import (
+    band_polygons,
+    clean_polygons,
+    contour_polygons,
+    feature_collection_json,
+    filled_bands,
+    finish_polygons,
+    geojson_geometries,
+    repair_polygons,
+    tile_rows,
+)
+
+LEVELS = np.array([0.0, 1.0, 2.0, 3.0])
+
+
+def bump(lon, lat):
+    lon_grid, lat_grid = np.meshgrid(lon, lat)
+    return (3.0 * np.exp(-((lon_grid - 5) ** 2 + (lat_grid - 5) ** 2) / 8)).astype(np.float32)
+
+
+class FilledBandsTests(unittest.TestCase):
+    def test_band_around_a_peak_has_a_hole(self):
+        lon = np.linspace(0, 10, 41)
+        lat = np.linspace(10, 0, 41)
+        bands = filled_bands(lon, lat, bump(lon, lat), LEVELS)
+
+        self.assertEqual([(lower, upper) for lower, upper, _ in bands], [(0, 1), (1, 2), (2, 3)])
+        lower, upper, polygons = bands[1]
+        self.assertEqual(len(polygons), 1)
+        self.assertEqual(len(polygons[0]), 2)  # exterior and the hole the top band fills
+        for ring in polygons[0]:
+            np.testing.assert_array_equal(ring[0], ring[-1])
+        self.assertEqual(len(bands[2][2][0]), 1)
+
+    def test_masked_cells_and_empty_grids(self):
+        lon = np.linspace(0, 10, 41)
+        lat = np.linspace(10, 0, 41)
+        z = bump(lon, lat)
+        z[:, :20] = np.nan
+        for _, _, polygons in filled_bands(lon, lat, z, LEVELS):
+            for rings in polygons:
+                for ring in rings:
+                    self.assertGreaterEqual(ring[:, 0].min(), lon[19])
+        empty = filled_bands(lon, lat, np.full_like(z, np.nan), LEVELS)
+        self.assertEqual([polygons for _, _, polygons in empty], [[], [], []])
+
+    @unittest.skipUnless(importlib.util.find_spec("matplotlib"), "matplotlib not installed")
+    def test_rings_match_matplotlib_contourf(self):
+        import matplotlib
+
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        rng = np.random.default_rng(0)
+        lon = np.arange(120) / 3
+        lat = np.linspace(20, -20, 90)
+        z = (bump(lon / 4, lat / 4 + 5) + rng.random((90, 120)) * 0.5).astype(np.float32)
+        z[30:40, 50:70] = np.nan
+        z[0, 0] = 0.0  # exercises contourf's lowest-band adjustment
+        fig, ax = plt.subplots()
+        try:
+            contour = ax.contourf(lon, lat, np.ma.masked_invalid(z), levels=LEVELS)
+        finally:
+            plt.close(fig)
+
+        expected = [[seg for seg in segs] for segs in contour.allsegs]
+        actual = [
+            [ring for rings in polygons for ring in rings]
+            for _, _, polygons in filled_bands(lon, lat, z, LEVELS)
+        ]
+        self.assertEqual([len(rings) for rings in actual], [len(rings) for rings in expected])
+        for band_actual, band_expected in zip(actual, expected):
+            for ring, seg in zip(band_actual, band_expected):
+                np.testing.assert_array_equal(ring, seg)
+
+
+def per_polygon_geojson(bands, min_area, simplify_tolerance, properties):
+    """The one-Polygon-at-a-time loop calculate_contours4 used to run."""
+    features = []
+    for band_index, (_, _, polygons) in enumerate(bands):
+        for rings in polygons:
+            if rings[0].shape[0] < 3:
+                continue
+            polygon = Polygon(rings[0], [hole for hole in rings[1:] if hole.shape[0] >= 3])
+            if not polygon.is_valid:
+                polygon = polygon.buffer(0)
+            if polygon.is_empty:
+                continue
+            if min_area and polygon.area < min_area:
+                continue
+            if simplify_tolerance:
+                simplified = polygon.simplify(simplify_tolerance, preserve_topology=True)
+                if simplified.is_empty:
+                    continue
+                polygon = simplified
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", DeprecationWarning)
+                polygon = shapely_transform(
+                    lambda x, y, z=None: (np.round(x, 4), np.round(y, 4)), polygon
+                )
+            features.append(
+                geojson.Feature(
+                    geometry=polygon.__geo_interface__, properties=properties[band_index]
+                )
+            )
+    return geojson.dumps(geojson.FeatureCollection(features))
+
+
+def vectorized_geojson(bands, min_area, simplify_tolerance, properties):
+    polygons, band = band_polygons(bands)
+    polygons, kept = clean_polygons(
+        polygons, min_area=min_area, simplify_tolerance=simplify_tolerance
+    )
+    return feature_collection_json(
+        geojson_geometries(polygons), [properties[index] for index in band[kept]]
+    )
+
+
+class PolygonBatchTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.lon = np.linspace(100.0, 140.0, 160)
+        self.lat = np.linspace(30.0, -30.0, 240)
+        z = bump(self.lon / 4 - 20, self.lat / 6 + 5) + rng.random((240, 160)).astype(np.float32)
+        z[60:90, 40:70] = np.nan
+        self.bands = filled_bands(self.lon, self.lat, z, LEVELS)
+        # Two squares in one ring touching at a corner, which buffer(0)
+        # splits into a MultiPolygon, and a ring too short to be a polygon.
+        squares = np.array([[0, 0], [1, 0], [1, 1], [2, 1], [2, 2], [1, 2], [1, 1], [0, 1], [0, 0]], float)
+        self.bands.append((3.0, 4.0, [[squares], [squares[:2]]]))
+        self.properties = [
+            {"contour_min": lower, "contour_max": upper, "valid_time": "2026-01-01T00:00:00"}
+            for lower, upper, _ in self.bands
+        ]
+
+    def test_output_matches_per_polygon_loop(self):
+        for min_area, tolerance in ((0.0, None), (0.01, 0.02), (0.05, 0.3)):
+            with self.subTest(min_area=min_area, tolerance=tolerance):
+                self.assertEqual(
+                    vectorized_geojson(self.bands, min_area, tolerance, self.properties),
+                    per_polygon_geojson(self.bands, min_area, tolerance, self.properties),
+                )
+
+    def test_invalid_polygons_are_repaired(self):
+        polygons, band = band_polygons(self.bands)
+        self.assertEqual(band[-1], len(self.bands) - 1)  # the short ring was dropped
+        cleaned, kept = clean_polygons(polygons, decimals=4)
+        self.assertEqual(cleaned[-1].geom_type, "MultiPolygon")
+        self.assertTrue(cleaned[-1].is_valid)
+        self.assertEqual(kept[-1], len(polygons) - 1)
+        self.assertEqual(geojson_geometries(cleaned[-1:])[0]["type"], "MultiPolygon")
+
+    def test_empty_batch(self):
+        polygons, band = band_polygons([(0.0, 1.0, [])])
+        cleaned, kept = clean_polygons(polygons, min_area=1.0, simplify_tolerance=0.1)
+        self.assertEqual((len(cleaned), len(kept), len(band)), (0, 0, 0))
+        self.assertEqual(
+            feature_collection_json(geojson_geometries(cleaned), []),
+            geojson.dumps(geojson.FeatureCollection([])),
+        )
+
+
+class TiledContourTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(2)
+        self.lon = np.linspace(0.0, 60.0, 240)
+        self.lat = np.linspace(40.0, -40.0, 320)
+        self.z = bump(self.lon / 6, self.lat / 8 + 5) + rng.random((320, 240)).astype(np.float32)
+        self.z[100:140, 60:120] = np.nan
+        self.z[0, 0] = 0.0  # the lowest-band adjustment is decided on the whole grid
+
+    def test_tiles_share_edge_rows(self):
+        self.assertEqual(tile_rows(320, 4), [(0, 81), (80, 161), (160, 240), (239, 320)])
+        self.assertEqual(tile_rows(100, 4), [(0, 100)])
+
+    def test_one_tile_is_the_single_pass(self):
+        single, band = band_polygons(filled_bands(self.lon, self.lat, self.z, LEVELS))
+        repaired, kept = repair_polygons(single, min_area=0.01)
+        expected, finished = finish_polygons(shapely.normalize(repaired), simplify_tolerance=0.05)
+        band = band[kept][finished]
+        polygons, polygon_band = contour_polygons(
+            self.lon, self.lat, self.z, LEVELS, min_area=0.01, simplify_tolerance=0.05
+        )
+        # The same polygons, sorted within their band.
+        order = contours._band_order(expected, band)
+        np.testing.assert_array_equal(polygon_band, band[order])
+        self.assertTrue(shapely.equals_exact(polygons, expected[order], tolerance=0).all())
+
+    def test_output_does_not_depend_on_threads(self):
+        for unsimplified in (False, True):
+            results = [
+                contour_polygons(
+                    self.lon,
+                    self.lat,
+                    self.z,
+                    LEVELS,
+                    min_area=0.01,
+                    simplify_tolerance=0.05,
+                    threads=threads,
+                    unsimplified=unsimplified,
+                )
+                for threads in (1, 4)
+            ]
+            single, tiled = (
+                [
+                    feature_collection_json(
+                        geojson_geometries(polygons), [{"band": index} for index in band.tolist()]
+                    )
+                    for polygons, band in zip(result[::2], result[1::2])
+                ]
+                for result in results
+            )
+            with self.subTest(unsimplified=unsimplified):
+                self.assertEqual(tiled, single)
+
+    def test_stitched_tiles_match_the_single_pass(self):
+        single, single_band = contour_polygons(self.lon, self.lat, self.z, LEVELS, decimals=12)
+        tiled, tiled_band = contour_polygons(
+            self.lon, self.lat, self.z, LEVELS, decimals=12, threads=4
+        )
+        for index in range(len(LEVELS) - 1):
+            expected = single[single_band == index]
+            actual = tiled[tiled_band == index]
+            self.assertEqual(len(actual), len(expected))
+            self.assertEqual(
+                shapely.get_num_interior_rings(actual).sum(),
+                shapely.get_num_interior_rings(expected).sum(),
+            )
+            self.assertEqual(
+                shapely.get_num_coordinates(actual).sum(),
+                shapely.get_num_coordinates(expected).sum(),
+            )
+            difference = shapely.symmetric_difference(
+                shapely.union_all(actual), shapely.union_all(expected)
+            )
+            self.assertLess(difference.area, 1e-9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import datetime as dt
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import gfs_to_contours
+import transport
+from range_server import RangeServer
+from test_inventory import make_grib_and_idx
+from transport import Transport
+
+NOW = dt.datetime(2026, 7, 13, 14, 30, tzinfo=dt.UTC)
+
+
+def f384_path(date_str: str, hour: str, grid: str) -> str:
+    return (
+        f"/gfs.{date_str}/{hour}/wave/gridded/"
+        f"gfswave.t{hour}z.{grid}.f384.grib2"
+    )
+
+
+class FindLatestGfsTimeTests(unittest.TestCase):
+    def find(self, files):
+        with (
+            RangeServer(files) as server,
+            Transport(rate_limit=0) as client,
+            patch.object(gfs_to_contours, "GFS_BASE_URL", server.url("")),
+        ):
+            result = gfs_to_contours.find_latest_gfs_time(client, now=NOW)
+        return result, server.requests
+
+    def test_newest_cycle_with_both_grids_wins(self):
+        files = {
+            # 12Z today only has the fine grid so far.
+            f384_path("20260713", "12", "global.0p16"): b"",
+            f384_path("20260713", "06", "global.0p16"): b"",
+            f384_path("20260713", "06", "global.0p25"): b"",
+            f384_path("20260712", "18", "global.0p16"): b"",
+            f384_path("20260712", "18", "global.0p25"): b"",
+        }
+        (date_str, hour), requests = self.find(files)
+        self.assertEqual((date_str, hour), ("20260713", "06"))
+        # Cycles after NOW (18Z today) are never probed.
+        self.assertFalse(any("/gfs.20260713/18/" in path for _, path, _ in requests))
+        self.assertTrue(all(method == "HEAD" for method, _, _ in requests))
+
+    def test_nothing_complete_raises(self):
+        with self.assertRaises(RuntimeError):
+            self.find({})
+
+
+class ProgressiveFetchTests(unittest.TestCase):
+    """Hours NOAA has not uploaded yet are polled for, then fetched."""
+
+    def fetch(
+        self, files, *, publish_after: float | None, wait: float, index_after: float = 0.0
+    ):
+        names = [
+            f"/gfs.20260713/06/wave/gridded/gfswave.t06z.{grid}.f007.grib2"
+            for grid in gfs_to_contours.GLOBAL_GRIDS
+        ]
+        body, idx, _ = make_grib_and_idx()
+        with (
+            tempfile.TemporaryDirectory() as files_dir,
+            RangeServer(files) as server,
+            patch.object(gfs_to_contours, "GFS_BASE_URL", server.url("")),
+            patch.dict(os.environ, {"GRIB_CACHE_BYTES": "0"}),
+            patch.object(transport, "_TRANSPORT", Transport(rate_limit=0)),
+            patch.object(gfs_to_contours, "POLL_INITIAL_SECONDS", 0.05),
+            patch.object(gfs_to_contours, "POLL_MAX_SECONDS", 0.1),
+        ):
+            if publish_after is not None:
+                def publish():
+                    for name in names:
+                        server.files[name] = body
+
+                def publish_inventories():
+                    for name in names:
+                        server.files[name + ".idx"] = idx.encode()
+
+                threading.Timer(publish_after, publish).start()
+                threading.Timer(publish_after + index_after, publish_inventories).start()
+            paths = gfs_to_contours._fetch_grid_files(
+                7, "20260713", "06", files_dir, wait_until=time.time() + wait
+            )
+            return paths, server.requests
+
+    def test_waits_for_both_grids_to_appear(self):
+        paths, requests = self.fetch({}, publish_after=0.3, wait=5.0)
+        self.assertEqual(set(paths), set(gfs_to_contours.GLOBAL_GRIDS))
+        self.assertGreater(sum(1 for r in requests if r[0] == "HEAD"), 2)
+
+    def test_waits_for_the_inventory_too(self):
+        paths, requests = self.fetch({}, publish_after=0.1, index_after=0.4, wait=5.0)
+        self.assertEqual(set(paths), set(gfs_to_contours.GLOBAL_GRIDS))
+        grib_gets = [r for r in requests if r[0] == "GET" and r[1].endswith(".grib2")]
+        # Only the wanted messages, never the whole file.
+        self.assertEqual(len(grib_gets), 2)
+        self.assertTrue(all(r[2] and r[2].startswith("bytes=") for r in grib_gets))
+
+    def test_gives_up_at_the_deadline(self):
+        paths, _ = self.fetch({}, publish_after=None, wait=0.3)
+        self.assertEqual(paths, {})
+
+
+class CheckModeTests(unittest.TestCase):
+    def run_check(self, published: str | None) -> int:
+        with tempfile.TemporaryDirectory() as directory:
+            if published:
+                with open(os.path.join(directory, "last_published.json"), "w") as f:
+                    json.dump({"forecast_start": published}, f)
+            env = {"FILES_DIR": directory, "LOG_DIR": directory, "STATE_DIR": directory}
+            with (
+                patch.dict("os.environ", env),
+                patch.object(gfs_to_contours, "setup_logging"),
+                patch.object(
+                    gfs_to_contours, "find_latest_gfs_time",
+                    lambda transport, **kwargs: ("20260713", "06"),
+                ),
+                patch.object(gfs_to_contours, "process_forecast_hours") as process,
+            ):
+                try:
+                    gfs_to_contours.main(["--check"])
+                except SystemExit as exit_:
+                    status = exit_.code
+                else:
+                    status = 0
+                process.assert_not_called()
+        return status
+
+    def test_already_published_cycle_exits_early(self):
+        self.assertEqual(
+            self.run_check("20260713_06Z"), gfs_to_contours.NOTHING_NEW_EXIT
+        )
+
+    def test_new_or_unknown_cycle_reports_work_to_do(self):
+        self.assertEqual(self.run_check("20260713_00Z"), 0)
+        self.assertEqual(self.run_check(None), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
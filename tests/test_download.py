@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from download import download_file
+from range_server import RangeServer
+from transport import Transport
+
+BODY = bytes(range(256)) * 4096  # 1 MiB
+
+
+class DownloadFileTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "file.grib2")
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_streams_whole_file(self):
+        with RangeServer({"/f": BODY}) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(download_file(transport, server.url("/f"), self.path))
+        self.assertEqual(self.read(), BODY)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+
+    def test_retry_resumes_from_bytes_on_disk(self):
+        with RangeServer({"/f": BODY}, cut_after=[300_000]) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(download_file(transport, server.url("/f"), self.path))
+        self.assertEqual(self.read(), BODY)
+        first, retry = [r[2] for r in server.requests]
+        self.assertIsNone(first)
+        # Only the chunk in flight when the link dropped is fetched again.
+        resumed_from = int(retry.removeprefix("bytes=").rstrip("-"))
+        self.assertGreater(resumed_from, 0)
+        self.assertLessEqual(resumed_from, 300_000)
+
+    def test_file_rewritten_between_attempts_is_fetched_whole(self):
+        rewritten = bytes(reversed(BODY))[:900_000]
+        with RangeServer({"/f": BODY}, cut_after=[300_000]) as server, Transport(rate_limit=0) as transport:
+            sent = []
+            get = transport.get
+
+            def get_then_rewrite(url, **kwargs):
+                sent.append(kwargs["headers"])
+                if len(sent) == 2:
+                    server.files["/f"] = rewritten  # NOMADS replaced the file
+                return get(url, **kwargs)
+
+            with mock.patch.object(transport, "get", get_then_rewrite):
+                self.assertTrue(download_file(transport, server.url("/f"), self.path))
+        self.assertEqual(self.read(), rewritten)
+        self.assertEqual(len(sent), 2)
+        self.assertIn("Range", sent[1])
+        self.assertTrue(sent[1]["If-Range"].startswith('"'))
+
+    def test_server_ignoring_range_restarts_cleanly(self):
+        with RangeServer(
+            {"/f": BODY}, honor_range=False, cut_after=[300_000]
+        ) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(download_file(transport, server.url("/f"), self.path))
+        self.assertEqual(self.read(), BODY)
+
+    def test_gives_up_without_publishing_partial_file(self):
+        with RangeServer(
+            {"/f": BODY}, honor_range=False, cut_after=[1000, 1000]
+        ) as server, Transport(rate_limit=0) as transport:
+            self.assertFalse(
+                download_file(transport, server.url("/f"), self.path, attempts=2)
+            )
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_stale_part_from_earlier_run_is_not_resumed(self):
+        with open(self.path + ".part", "wb") as f:
+            f.write(b"x" * 5000)
+        with RangeServer({"/f": BODY}) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(download_file(transport, server.url("/f"), self.path))
+        self.assertEqual(self.read(), BODY)
+        self.assertEqual(server.requests[0][2], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import gfs_to_contours
+import landmask
+from fieldcache import FieldCache
+from fieldcube import stacked
+from test_composite import VALID_DATE, make_swell_data, make_wind_data
+from test_landmask import swell_with_land
+
+LAT = np.linspace(10.0, -10.0, 41)
+LON = np.arange(60) * 0.5
+
+
+class FieldCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, "fields")
+        self.cache = FieldCache(self.cache_dir, max_bytes=10**9)
+
+    def test_round_trip_is_memory_mapped_and_keeps_aliases(self):
+        data = make_swell_data(LAT, LON, 2.0)
+        data["period"] = data["swell_partitions"][0]["period"]
+        self.cache.save("ab" * 32, "swell", data)
+        loaded = self.cache.load("ab" * 32, "swell")
+
+        self.assertIsInstance(loaded["height"], np.memmap)
+        self.assertFalse(loaded["height"].flags.writeable)
+        np.testing.assert_array_equal(loaded["height"], data["height"])
+        self.assertEqual(loaded["valid_date"], VALID_DATE)
+        self.assertEqual([p["sequence"] for p in loaded["swell_partitions"]], [1, 2, 3])
+        np.testing.assert_array_equal(
+            loaded["swell_partitions"][2]["height"], data["swell_partitions"][2]["height"]
+        )
+        self.assertIs(loaded["period"], loaded["swell_partitions"][0]["period"])
+        self.assertIsNone(self.cache.load("cd" * 32, "swell"))
+
+    def test_swell_and_wind_keep_their_own_wet_index(self):
+        swell, _ = swell_with_land(3)
+        wind = stacked(make_wind_data(LAT, LON, 5.0))  # no dry cells
+        with (
+            patch.dict(landmask._STATIC, clear=True),
+            patch.object(landmask, "WetIndex", wraps=landmask.WetIndex) as build,
+        ):
+            for digest in ("ab" * 32, "cd" * 32):
+                self.cache.save(digest, "swell", swell)
+                self.cache.save(digest, "wind", wind)
+                self.assertIsNotNone(self.cache.load(digest, "swell"))
+                self.assertIsNotNone(self.cache.load(digest, "wind"))
+        # One index per kind, not one per swell/wind alternation.
+        self.assertEqual(build.call_count, 2)
+
+    def test_decode_hour_decodes_each_grib_content_once(self):
+        grib_path = os.path.join(self.tmp.name, "f000.grib2")
+        calls = []
+
+        def fake_read(data, source=None):
+            calls.append(data)
+            return {
+                "swell": make_swell_data(LAT, LON, 1.0),
+                "wind": make_wind_data(LAT, LON, 5.0),
+            }
+
+        env = {"FIELD_CACHE_BYTES": "1e9", "FIELD_CACHE_DIR": self.cache_dir}
+        with (
+            patch.dict(os.environ, env),
+            patch.object(gfs_to_contours, "read_wave_bytes", fake_read),
+        ):
+            for _ in range(2):
+                with open(grib_path, "wb") as f:
+                    f.write(b"GRIB" * 100)
+                extracted, wind = gfs_to_contours._decode_hour(
+                    {"global.0p25": grib_path}, "20260713_12Z", "000"
+                )
+                self.assertFalse(os.path.exists(grib_path))
+
+        self.assertEqual(calls, [b"GRIB" * 100])
+        self.assertEqual(extracted["global.0p25"]["height"][0, 0], 1.0)
+        self.assertEqual(wind["global.0p25"]["speed"][0, 0], 5.0)
+        cycle, hours = self.cache.latest_run()
+        self.assertEqual(cycle, "20260713_12Z")
+        self.assertEqual(list(hours), ["000"])
+        self.assertEqual(list(hours["000"]), ["global.0p25"])
+
+    def test_rerender_regenerates_layers_without_network(self):
+        for hour, value in ((0, 1.0), (3, 3.0)):
+            digest = f"{hour:064x}"
+            self.cache.save(digest, "swell", make_swell_data(LAT, LON, value))
+            self.cache.save(digest, "wind", make_wind_data(LAT, LON, value))
+            self.cache.record_hour("20260713_12Z", f"{hour:03}", {"global.0p25": digest})
+
+        files_dir = os.path.join(self.tmp.name, "files")
+        os.makedirs(files_dir)
+        env = {
+            "FILES_DIR": files_dir,
+            "LOG_DIR": self.tmp.name,
+            "FIELD_CACHE_BYTES": "1e9",
+            "FIELD_CACHE_DIR": self.cache_dir,
+            "PARALLEL_HOURS": "1",
+        }
+        with (
+            patch.dict(os.environ, env),
+            patch.object(gfs_to_contours, "setup_logging"),
+            patch.object(gfs_to_contours, "get_transport", side_effect=AssertionError),
+        ):
+            gfs_to_contours.main(["--rerender"])
+
+        for name in (
+            "contours_000.geojson",
+            "contours_000.topojson.gz",
+            "heatmap_003.png",
+            "wind_003.geojson",
+        ):
+            self.assertTrue(os.path.exists(os.path.join(files_dir, name)), name)
+        with open(os.path.join(files_dir, "metadata.json")) as f:
+            metadata = json.load(f)
+        self.assertEqual(metadata["forecast_start"], "20260713_12Z")
+        self.assertEqual(metadata["hours_processed"], 2)
+        self.assertEqual(metadata["contour_formats"], ["geojson", "topojson"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+import composite
+from composite import composite_swell
+from fieldcache import FieldCache
+from fieldcube import FieldCube, stacked
+from test_composite import HI_LAT, HI_LON, LO_LAT, LO_LON, make_swell_data
+
+LAT = np.linspace(10.0, -10.0, 41)
+LON = np.arange(60) * 0.5
+
+
+def varied_swell_data(lat, lon, seed):
+    """make_swell_data() with distinct random values and masks per array."""
+    rng = np.random.default_rng(seed)
+    data = make_swell_data(lat, lon, 0.0)
+    for item in (data, *data["swell_partitions"]):
+        for key, value in item.items():
+            if isinstance(value, np.ndarray) and key not in ("lon", "lat"):
+                if value.dtype == bool:
+                    item[key] = rng.random(value.shape) < 0.3
+                else:
+                    item[key] = rng.random(value.shape, dtype=np.float32)
+    # Like extraction: the top-level period/direction are partition 1's.
+    data["period"] = data["swell_partitions"][0]["period"]
+    data["direction"] = data["swell_partitions"][0]["direction"]
+    return data
+
+
+class FieldCubeTests(unittest.TestCase):
+    def test_dict_round_trip_through_views(self):
+        data = varied_swell_data(LAT, LON, 1)
+        cube_data = stacked(data)
+        cube = cube_data["cube"]
+
+        self.assertEqual(cube.values.shape, (10, 41, 60))
+        self.assertEqual(cube.values.dtype, np.float32)
+        self.assertEqual(cube.masks.shape, (4, 41, 8))  # 60 columns -> 8 bytes
+        self.assertTrue(np.shares_memory(cube_data["height"], cube.values))
+        partition = cube_data["swell_partitions"][1]
+        self.assertEqual(partition["sequence"], 2)
+        np.testing.assert_array_equal(partition["period"], data["swell_partitions"][1]["period"])
+        np.testing.assert_array_equal(partition["mask"], data["swell_partitions"][1]["mask"])
+        self.assertIs(cube_data["period"], cube_data["swell_partitions"][0]["period"])
+        self.assertIs(cube_data["lon"], data["lon"])
+
+        stripped = cube.strip(cube_data)
+        self.assertEqual(set(stripped), {"lon", "lat", "swell_partitions", "valid_date"})
+        self.assertEqual(stripped["swell_partitions"][2], {"sequence": 3})
+
+    def test_composite_of_cubes_matches_per_field_picks(self):
+        hi = varied_swell_data(HI_LAT, HI_LON, 2)
+        lo = varied_swell_data(LO_LAT, LO_LON, 3)
+        hi["height_mask"][:] = False
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.dict(os.environ, {"REGRID_CACHE_DIR": tmp}):
+                combined = composite_swell(stacked(hi), stacked(lo))
+                plan = composite.regrid_plan(hi, lo, hi["height_mask"])
+
+        self.assertIsInstance(combined["cube"], FieldCube)
+        for key in ("height", "height_mask"):
+            np.testing.assert_array_equal(combined[key], plan.pick(hi[key], lo[key]))
+        for combined_partition, hi_partition, lo_partition in zip(
+            combined["swell_partitions"], hi["swell_partitions"], lo["swell_partitions"]
+        ):
+            for key in ("height", "period", "direction", "mask"):
+                np.testing.assert_array_equal(
+                    combined_partition[key], plan.pick(hi_partition[key], lo_partition[key])
+                )
+        self.assertIs(combined["period"], combined["swell_partitions"][0]["period"])
+
+    def test_field_cache_stores_ocean_cells_only(self):
+        data = varied_swell_data(LAT, LON, 4)
+        # A land block: every mask set and every field NaN.
+        for item in (data, *data["swell_partitions"]):
+            for key, value in item.items():
+                if isinstance(value, np.ndarray) and key not in ("lon", "lat"):
+                    value[:10, :30] = True if value.dtype == bool else np.nan
+        data = stacked(data)
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = FieldCache(tmp, max_bytes=10**9)
+            cache.save("ab" * 32, "swell", data)
+            entry = cache._entry("ab" * 32, "swell")
+            self.assertEqual(
+                sorted(os.listdir(entry)),
+                ["_cube.coded.npy", "_cube.dry.npy", "_cube.masks.npy", "_cube.values.npy",
+                 "lat.npy", "lon.npy", "meta.json"],
+            )
+            stored = np.load(os.path.join(entry, "_cube.values.npy"))
+            self.assertEqual(stored.shape, (10, 41 * 60 - 10 * 30))
+            loaded = cache.load("ab" * 32, "swell")
+
+            np.testing.assert_array_equal(loaded["cube"].values, data["cube"].values)
+            np.testing.assert_array_equal(loaded["cube"].masks, data["cube"].masks)
+            np.testing.assert_array_equal(
+                loaded["swell_partitions"][2]["mask"], data["swell_partitions"][2]["mask"]
+            )
+            self.assertEqual(loaded["swell_partitions"][2]["sequence"], 3)
+            self.assertEqual(loaded["valid_date"], data["valid_date"])
+            np.testing.assert_array_equal(loaded["lat"], data["lat"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+import numpy as np
+
+import geometrycache
+from geometrycache import shared_arrays
+
+
+def build_counted(directory):
+    # One marker file per build, so the test can count them across processes.
+    open(os.path.join(directory, f"built.{os.getpid()}"), "w").close()
+    time.sleep(0.2)
+    return {"cells": np.arange(1000, dtype=np.int64)}
+
+
+def attach_in_worker(directory):
+    arrays = shared_arrays(os.path.join(directory, "store"), "key", lambda: build_counted(directory))
+    return isinstance(arrays["cells"], np.memmap), int(arrays["cells"].sum())
+
+
+class SharedArraysTests(unittest.TestCase):
+    def setUp(self):
+        geometrycache._MAPPED.clear()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+
+    def test_entries_are_mapped_read_only_and_reused(self):
+        store = os.path.join(self.directory, "store")
+        arrays = shared_arrays(store, ("grid", 1), lambda: {"rows": np.arange(5)})
+        self.assertIsInstance(arrays["rows"], np.memmap)
+        self.assertFalse(arrays["rows"].flags.writeable)
+        self.assertIs(shared_arrays(store, ("grid", 1), None), arrays)
+
+        geometrycache._MAPPED.clear()  # as in a fresh worker
+        again = shared_arrays(store, ("grid", 1), None)
+        np.testing.assert_array_equal(again["rows"], np.arange(5))
+
+    def test_concurrent_workers_build_once(self):
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers=3, mp_context=context) as pool:
+            results = list(pool.map(attach_in_worker, [self.directory] * 3))
+        self.assertEqual(results, [(True, 499500)] * 3)
+        built = [name for name in os.listdir(self.directory) if name.startswith("built.")]
+        self.assertEqual(len(built), 1)
+
+    def test_unwritable_directory_falls_back_to_built_arrays(self):
+        blocker = os.path.join(self.directory, "file")
+        open(blocker, "w").close()
+        arrays = shared_arrays(os.path.join(blocker, "store"), "key", lambda: {"a": np.ones(3)})
+        self.assertNotIsInstance(arrays["a"], np.memmap)
+        self.assertFalse(arrays["a"].flags.writeable)
+
+    def test_unused_entries_are_pruned_when_a_new_one_is_stored(self):
+        store = os.path.join(self.directory, "store")
+        shared_arrays(store, "old", lambda: {"a": np.ones(3)})
+        old_entry = os.path.join(store, geometrycache.key_digest("old"))
+        stale = time.time() - (geometrycache.PRUNE_DAYS + 1) * 86400
+        os.utime(old_entry, (stale, stale))
+
+        shared_arrays(store, "new", lambda: {"a": np.zeros(3)})
+        self.assertFalse(os.path.exists(old_entry))
+        self.assertTrue(os.path.isdir(os.path.join(store, geometrycache.key_digest("new"))))
+
+    def test_least_recently_used_entries_go_past_the_size_bound(self):
+        store = os.path.join(self.directory, "store")
+        entries = {}
+        for age, key in enumerate(("newer", "older")):
+            shared_arrays(store, key, lambda: {"a": np.ones(1000)})  # 8 KB each
+            entries[key] = os.path.join(store, geometrycache.key_digest(key))
+            used = time.time() - 60 * (age + 1)
+            os.utime(entries[key], (used, used))
+
+        with patch.dict(os.environ, {"GEOMETRY_CACHE_BYTES": "20000"}):
+            shared_arrays(store, "new", lambda: {"a": np.zeros(1000)})
+        self.assertTrue(os.path.isdir(entries["newer"]))
+        self.assertFalse(os.path.exists(entries["older"]))
+        self.assertTrue(os.path.isdir(os.path.join(store, geometrycache.key_digest("new"))))
+
+    def test_builds_left_by_a_killed_process_are_removed(self):
+        store = os.path.join(self.directory, "store")
+        shared_arrays(store, "first", lambda: {"a": np.ones(3)})
+        orphan = os.path.join(store, f"{geometrycache.key_digest('lost')}.4242.tmp")
+        building = os.path.join(store, f"{geometrycache.key_digest('busy')}.4343.tmp")
+        os.makedirs(orphan)
+        os.makedirs(building)
+        stale = time.time() - geometrycache.TMP_MAX_AGE - 60
+        os.utime(orphan, (stale, stale))
+
+        shared_arrays(store, "second", lambda: {"a": np.zeros(3)})
+        self.assertFalse(os.path.exists(orphan))
+        self.assertTrue(os.path.isdir(building))
+
+
+if __name__ == "__main__":
+    unittest.main()
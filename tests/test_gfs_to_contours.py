@@ -10,9 +10,10 @@ import gfs_to_contours
 
 
 class FakeMessage:
-    def __init__(self, values, valid_date):
+    def __init__(self, values, valid_date, name=None):
         self.values = values
         self.validDate = valid_date
+        self.name = name
 
     def __getitem__(self, key):
         return None
@@ -27,10 +28,20 @@ class FakeGribFile:
     def __init__(self, messages):
         self.messages = messages
         self.closed = False
+        self.selects = 0
+        self.passes = 0
 
     def select(self, *, name):
+        self.selects += 1
         return self.messages[name]
 
+    def __iter__(self):
+        self.passes += 1
+        for name, group in self.messages.items():
+            for message in group:
+                message.name = name
+                yield message
+
     def close(self):
         self.closed = True
 
@@ -79,5 +90,75 @@ class ExtractHeightTests(unittest.TestCase):
         self.assertGreater(pixels[0, 0], 200)
 
 
+class ReadWaveFileTests(unittest.TestCase):
+    def make_file(self, wind_valid_date=None):
+        valid_date = dt.datetime(2026, 7, 13, tzinfo=dt.UTC)
+        field = np.ma.array([[1.0, 2.0], [3.0, 4.0]], mask=[[False, True], [False, False]])
+        names = [
+            "Significant height of total swell",
+            "Mean period of total swell",
+            "Direction of swell waves",
+        ]
+        messages = {name: [FakeMessage(field, valid_date) for _ in range(3)] for name in names}
+        messages["Significant height of combined wind waves and swell"] = [
+            FakeMessage(field * 2, valid_date)
+        ]
+        for name in ("Wind speed", "Wind direction", "U component of wind", "V component of wind"):
+            messages[name] = [FakeMessage(field + 10, wind_valid_date or valid_date)]
+        messages["Primary wave mean period"] = [FakeMessage(field, valid_date)]
+        return FakeGribFile(messages)
+
+    def test_one_pass_yields_swell_and_wind(self):
+        grib_file = self.make_file()
+        gfs_to_contours._GRID_CACHE.clear()
+        with patch.object(gfs_to_contours.pygrib, "open", return_value=grib_file):
+            fields = gfs_to_contours.read_wave_file("forecast.grib2")
+        self.assertEqual((grib_file.passes, grib_file.selects), (1, 0))
+        self.assertTrue(grib_file.closed)
+
+        self.assertEqual(len(fields["swell"]["swell_partitions"]), 3)
+        # Regular grids carry 1-D axes, shared by the swell and wind dicts.
+        np.testing.assert_array_equal(fields["swell"]["lat"], [1.0, 0.0])
+        self.assertIs(fields["wind"]["lon"], fields["swell"]["lon"])
+        np.testing.assert_array_equal(fields["swell"]["height"][1], [6.0, 8.0])
+        self.assertTrue(fields["swell"]["height_mask"][0, 1])
+        self.assertEqual(fields["wind"]["speed"][0, 0], 11.0)
+        self.assertTrue(fields["wind"]["mask"][0, 1])
+
+        # Same result as the separate select()-based extractors.
+        with patch.object(gfs_to_contours.pygrib, "open", return_value=self.make_file()):
+            swell = gfs_to_contours.extract_from_grib2_to_np("forecast.grib2")
+        np.testing.assert_array_equal(swell["height"], fields["swell"]["height"])
+
+    def test_mismatched_wind_time_is_rejected(self):
+        grib_file = self.make_file(wind_valid_date=dt.datetime(2026, 7, 14, tzinfo=dt.UTC))
+        with patch.object(gfs_to_contours.pygrib, "open", return_value=grib_file):
+            with self.assertRaises(ValueError):
+                gfs_to_contours.read_wave_file("forecast.grib2")
+
+    def test_bytes_are_split_per_message_and_decoded_from_memory(self):
+        def grib2(payload: bytes) -> bytes:
+            length = 16 + len(payload) + 4
+            return b"GRIB\0\0\0\x02" + length.to_bytes(8, "big") + payload + b"7777"
+
+        source = self.make_file()
+        messages = [message for group in source.messages.values() for message in group]
+        for message in source:  # assigns each message its pygrib name
+            pass
+        encoded = [grib2(f"msg{index}".encode() * 3) for index in range(len(messages))]
+        by_bytes = dict(zip(encoded, messages))
+        data = b"".join(encoded)
+
+        self.assertEqual(gfs_to_contours.split_grib_messages(data), encoded)
+        with self.assertRaises(ValueError):
+            gfs_to_contours.split_grib_messages(data[:-1])
+
+        gfs_to_contours._GRID_CACHE.clear()
+        with patch.object(gfs_to_contours.pygrib, "fromstring", by_bytes.__getitem__):
+            fields = gfs_to_contours.read_wave_bytes(data)
+        np.testing.assert_array_equal(fields["swell"]["height"][1], [6.0, 8.0])
+        self.assertEqual(fields["wind"]["speed"][0, 0], 11.0)
+
+
 if __name__ == "__main__":
     unittest.main()
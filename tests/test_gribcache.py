@@ -0,0 +1,88 @@
+import os
+import tempfile
+import time
+import unittest
+
+import inventory
+from download import download_file
+from gribcache import DownloadCache
+from range_server import RangeServer
+from test_inventory import make_grib_and_idx
+from transport import Transport
+
+BODY = bytes(range(256)) * 1024
+
+
+class DownloadCacheTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = DownloadCache(os.path.join(self.tmp.name, "cache"))
+        self.path = os.path.join(self.tmp.name, "file.grib2")
+
+    def read(self) -> bytes:
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def fetch(self, server) -> int:
+        """Download /f through the cache; returns body bytes transferred."""
+        with Transport(rate_limit=0) as transport:
+            self.assertTrue(
+                download_file(transport, server.url("/f"), self.path, cache=self.cache)
+            )
+            return sum(counters["bytes"] for counters in transport.stats.values())
+
+    def test_unchanged_file_is_revalidated_not_refetched(self):
+        with RangeServer({"/f": BODY}) as server:
+            self.assertEqual(self.fetch(server), len(BODY))
+            os.remove(self.path)
+            self.assertEqual(self.fetch(server), 0)
+        self.assertEqual(self.read(), BODY)
+        self.assertEqual(len(server.requests), 2)
+
+    def test_changed_file_replaces_cached_copy(self):
+        with RangeServer({"/f": BODY}) as server:
+            self.fetch(server)
+            server.files["/f"] = BODY[::-1]
+            self.assertEqual(self.fetch(server), len(BODY))
+            self.assertEqual(self.read(), BODY[::-1])
+            os.remove(self.path)
+            self.assertEqual(self.fetch(server), 0)
+        self.assertEqual(self.read(), BODY[::-1])
+
+    def test_least_recently_used_entries_are_evicted(self):
+        self.cache.max_bytes = 2 * len(BODY)
+        headers = {"ETag": '"x"'}
+        with open(self.path, "wb") as f:
+            f.write(BODY)
+        for key in ("a", "b"):
+            self.cache.store(key, self.path, headers)
+            time.sleep(0.01)
+        # Touch "a" so "b" becomes the least recently used.
+        self.assertTrue(self.cache.place("a", self.path))
+        self.cache.store("c", self.path, headers)
+        self.assertIsNotNone(self.cache.lookup("a"))
+        self.assertIsNone(self.cache.lookup("b"))
+        self.assertIsNotNone(self.cache.lookup("c"))
+
+    def test_subset_revalidates_through_inventory(self):
+        body, idx, wanted = make_grib_and_idx()
+        files = {"/f.grib2": body, "/f.grib2.idx": idx.encode()}
+        with RangeServer(files) as server, Transport(rate_limit=0) as transport:
+            url = server.url("/f.grib2")
+            for _ in range(2):
+                self.assertTrue(
+                    inventory.download_subset(transport, url, self.path, cache=self.cache)
+                )
+                os.rename(self.path, self.path + ".done")
+        with open(self.path + ".done", "rb") as f:
+            self.assertEqual(f.read(), wanted)
+        ranged = [r for r in server.requests if r[1] == "/f.grib2"]
+        inventories = [r for r in server.requests if r[1] == "/f.grib2.idx"]
+        # Ranges were fetched once; the second call was a single 304.
+        self.assertEqual(len(ranged), 1)
+        self.assertEqual(len(inventories), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import gfs_to_contours
+from grid import grid_axes, grid_points, latlon_axes, nearest_index, strided_cells
+from test_composite import make_swell_data
+
+
+def dense_argmin(source, target):
+    return np.abs(target[:, None] - source[None, :]).argmin(axis=1)
+
+
+class NearestIndexTests(unittest.TestCase):
+    def assert_matches_dense(self, source, target):
+        np.testing.assert_array_equal(
+            nearest_index(source, target), dense_argmin(source, target)
+        )
+
+    def test_matches_dense_argmin_on_pipeline_axes(self):
+        target_lat = np.linspace(85.0, -85.0, 1021)
+        target_lon = np.arange(2160) / 6.0
+        # GFS 0p16 / 0p25 axes, north -> south like the GRIBs.
+        self.assert_matches_dense(np.linspace(52.5, -15.0, 406), target_lat)
+        self.assert_matches_dense(np.linspace(90.0, -90.0, 721), target_lat)
+        self.assert_matches_dense(np.arange(1440) * 0.25, target_lon)
+        # float32 axes as stored in the data dicts.
+        self.assert_matches_dense(
+            np.linspace(90.0, -90.0, 721).astype(np.float32), target_lat.astype(np.float32)
+        )
+
+    def test_matches_dense_argmin_on_random_and_tied_targets(self):
+        rng = np.random.default_rng(1)
+        source = np.sort(rng.uniform(-50.0, 50.0, 300))
+        target = rng.uniform(-60.0, 60.0, 5000)
+        self.assert_matches_dense(source, target)
+        self.assert_matches_dense(source[::-1], target)
+        # Exact midpoints: ties must go to the lower source index either way.
+        midpoints = np.arange(10) + 0.5
+        self.assert_matches_dense(np.arange(11.0), midpoints)
+        self.assert_matches_dense(np.arange(11.0)[::-1], midpoints)
+        self.assert_matches_dense(np.array([3.0]), target)
+
+    def test_period_wraps_around_the_antimeridian(self):
+        source = np.arange(1440) * 0.25
+        target = np.array([359.9, -0.2, 360.0, 180.1, -179.9])
+        np.testing.assert_array_equal(
+            nearest_index(source, target, period=360.0), [0, 1439, 0, 720, 720]
+        )
+        descending = source[::-1]
+        np.testing.assert_array_equal(
+            nearest_index(descending, target, period=360.0), [1439, 0, 1439, 719, 719]
+        )
+
+
+class GridAxesTests(unittest.TestCase):
+    def test_regular_latlons_reduce_to_axes(self):
+        lat = np.linspace(10.0, -10.0, 5)
+        lon = np.arange(8) * 0.5
+        lats, lons = np.meshgrid(lat, lon, indexing="ij")
+        lon_axis, lat_axis = latlon_axes(lats, lons)
+        np.testing.assert_array_equal(lat_axis, lat.astype(np.float32))
+        np.testing.assert_array_equal(lon_axis, lon.astype(np.float32))
+
+        skewed = lons + lats * 0.01  # curvilinear: keeps its 2-D form
+        self.assertEqual(latlon_axes(lats, skewed)[0].shape, lats.shape)
+
+    def test_axes_and_meshes_are_interchangeable(self):
+        lat = np.linspace(10.0, -10.0, 41)
+        lon = np.arange(60) * 0.5
+        meshed = make_swell_data(lat, lon, 1.0)
+        axes = dict(meshed, lon=lon.astype(np.float32), lat=lat.astype(np.float32))
+        for data in (meshed, axes):
+            lon_axis, lat_axis = grid_axes(data)
+            np.testing.assert_array_equal(lon_axis, axes["lon"])
+            np.testing.assert_array_equal(lat_axis, axes["lat"])
+        rows, cols = strided_cells(meshed["lat"].shape, 3)
+        self.assertEqual(rows.size, 14 * 20)
+        for points, expected in zip(
+            grid_points(axes, rows, cols), grid_points(meshed, rows, cols)
+        ):
+            np.testing.assert_array_equal(points, expected)
+
+        # Contours from axes are byte-identical to those from meshes.
+        bump = np.exp(-((meshed["lon"] - 15) ** 2 + meshed["lat"] ** 2) / 40) * 4
+        outputs = []
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data in (("meshed", meshed), ("axes", axes)):
+                path = os.path.join(directory, f"{name}.geojson")
+                gfs_to_contours.calculate_contours4(
+                    dict(data, height=bump.astype(np.float32)), path, stride=2
+                )
+                with open(path) as f:
+                    outputs.append(f.read())
+        self.assertIn("Polygon", outputs[0])
+        self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
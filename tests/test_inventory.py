@@ -0,0 +1,217 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import gfs_to_contours
+import inventory
+from range_server import RangeServer
+from transport import Transport
+
+# Message order of a real gfswave.tHHz.global.0p25.fNNN.grib2 inventory.
+MESSAGES = [
+    ("WIND", "surface"),
+    ("WDIR", "surface"),
+    ("UGRD", "surface"),
+    ("VGRD", "surface"),
+    ("HTSGW", "surface"),
+    ("PERPW", "surface"),
+    ("DIRPW", "surface"),
+    ("WVHGT", "surface"),
+    ("SWELL", "1 in sequence"),
+    ("SWELL", "2 in sequence"),
+    ("SWELL", "3 in sequence"),
+    ("WVPER", "surface"),
+    ("SWPER", "1 in sequence"),
+    ("SWPER", "2 in sequence"),
+    ("SWPER", "3 in sequence"),
+    ("WVDIR", "surface"),
+    ("SWDIR", "1 in sequence"),
+    ("SWDIR", "2 in sequence"),
+    ("SWDIR", "3 in sequence"),
+]
+
+
+def make_grib_and_idx() -> tuple[bytes, str, bytes]:
+    """Fake GRIB bytes, its inventory, and the expected wanted-only subset."""
+    body = b""
+    lines = []
+    wanted = b""
+    for number, (variable, level) in enumerate(MESSAGES, start=1):
+        message = f"GRIB<{variable}:{level}>".encode() * (number + 3)
+        lines.append(f"{number}:{len(body)}:d=2026071312:{variable}:{level}:anl:")
+        body += message
+        if variable in inventory.GFS_WAVE_VARIABLES:
+            wanted += message
+    return body, "\n".join(lines) + "\n", wanted
+
+
+class SelectRangesTests(unittest.TestCase):
+    def test_adjacent_messages_merge_and_last_runs_to_eof(self):
+        entries = inventory.parse_idx(
+            "1:0:d=x:A:surface:anl:\n"
+            "2:10:d=x:B:surface:anl:\n"
+            "3:25:d=x:C:surface:anl:\n"
+            "4:40:d=x:A:surface:anl:\n"
+            "4.2:40:d=x:A:surface:anl:\n"
+            "garbage\n"
+            "5:55:d=x:A:surface:anl:\n"
+        )
+        self.assertEqual([entry["offset"] for entry in entries], [0, 10, 25, 40, 55])
+        self.assertEqual(
+            inventory.select_ranges(entries, {"A", "B"}), [(0, 24), (40, None)]
+        )
+        self.assertEqual(inventory.select_ranges(entries, {"C"}), [(25, 39)])
+
+
+class DownloadSubsetTests(unittest.TestCase):
+    def setUp(self):
+        self.body, self.idx, self.wanted = make_grib_and_idx()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "slim.grib2")
+        cache_dir = os.path.join(self.tmp.name, "cache")
+        patcher = mock.patch.dict(os.environ, {"GRIB_CACHE_DIR": cache_dir})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_fetches_only_wanted_messages_in_one_multi_range_request(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        with RangeServer(files) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.wanted)
+        self.assertFalse(os.path.exists(self.path + ".part"))
+        ranged = [r for r in server.requests if r[1] == "/f.grib2"]
+        # wind+HTSGW, SWELL x3, SWPER x3, SWDIR x3 (the last one to EOF).
+        self.assertEqual(len(ranged), 1)
+        self.assertEqual(ranged[0][2].count(","), 3)
+        self.assertTrue(ranged[0][2].endswith("-"))
+
+    def test_one_request_per_range_when_multi_range_is_ignored(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        with (
+            RangeServer(files, multirange=False) as server,
+            Transport(rate_limit=0) as transport,
+        ):
+            self.assertTrue(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.wanted)
+        ranged = [r for r in server.requests if r[1] == "/f.grib2"]
+        self.assertEqual(len(ranged), 1 + 4)
+
+    def test_dropped_multi_range_transfer_is_retried(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        with (
+            RangeServer(files, cut_after=[10**9, 200]) as server,  # the .idx, then the ranges
+            Transport(rate_limit=0) as transport,
+        ):
+            self.assertTrue(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.wanted)
+        self.assertEqual(len([r for r in server.requests if r[1] == "/f.grib2"]), 2)
+
+    def test_merged_and_cut_multipart_answers(self):
+        ranges = [(10, 19), (30, 39), (50, None)]
+        expected = self.body[10:20] + self.body[30:40] + self.body[50:]
+
+        class Response:
+            def __init__(self, body):
+                self.body = body
+
+            def iter_content(self, size):
+                for start in range(0, len(self.body), 7):
+                    yield self.body[start : start + 7]
+
+        def parts(body):
+            return inventory._multipart_parts(Response(body), b"B")
+
+        def multipart(*spans):
+            return b"".join(
+                f"--B\r\nContent-Range: bytes {start}-{end}/{len(self.body)}\r\n\r\n".encode()
+                + self.body[start : end + 1]
+                + b"\r\n"
+                for start, end in spans
+            ) + b"--B--\r\n"
+
+        total = len(self.body) - 1
+        for spans in [((10, 19), (30, 39), (50, total)), ((10, 39), (50, total))]:
+            with self.subTest(spans=spans), tempfile.TemporaryFile() as file:
+                # A server may merge neighbouring ranges into one part.
+                inventory._write_ranges(parts(multipart(*spans)), ranges, file)
+                file.seek(0)
+                self.assertEqual(file.read(), expected)
+        with tempfile.TemporaryFile() as file:
+            with self.assertRaises(inventory._RangesNotServed):
+                inventory._write_ranges(parts(multipart((12, 19), (30, total))), ranges, file)
+            with self.assertRaises(inventory.IncompleteDownload):
+                inventory._write_ranges(parts(multipart((10, 19), (30, 45))[:-40]), ranges, file)
+
+    def test_gfs_download_bypasses_the_download_cache(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        for served in (files, {"/f.grib2": self.body}):
+            with RangeServer(served) as server, Transport(rate_limit=0) as transport:
+                self.assertTrue(
+                    gfs_to_contours._download_grib(transport, server.url("/f.grib2"), self.path)
+                )
+            os.remove(self.path)
+        cache_dir = os.environ["GRIB_CACHE_DIR"]
+        self.assertFalse(os.path.exists(cache_dir) and os.listdir(cache_dir))
+
+    def test_gfs_download_falls_back_to_full_file_without_inventory(self):
+        with RangeServer({"/f.grib2": self.body}) as server, Transport(rate_limit=0) as transport:
+            self.assertTrue(
+                gfs_to_contours._download_grib(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.body)
+
+    def test_server_ignoring_range_falls_back_to_full_file(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        with RangeServer(files, honor_range=False) as server, Transport(rate_limit=0) as transport:
+            self.assertFalse(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+            self.assertFalse(os.path.exists(self.path + ".part"))
+            self.assertTrue(
+                gfs_to_contours._download_grib(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.body)
+
+    def test_range_answer_without_content_range_falls_back_to_full_file(self):
+        files = {"/f.grib2": self.body, "/f.grib2.idx": self.idx.encode()}
+        with (
+            RangeServer(files, multirange=False, content_range=False) as server,
+            Transport(rate_limit=0) as transport,
+        ):
+            self.assertFalse(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+            self.assertFalse(os.path.exists(self.path + ".part"))
+            self.assertTrue(
+                gfs_to_contours._download_grib(transport, server.url("/f.grib2"), self.path)
+            )
+        with open(self.path, "rb") as f:
+            self.assertEqual(f.read(), self.body)
+
+    def test_incomplete_inventory_is_rejected(self):
+        idx = "\n".join(
+            line for line in self.idx.splitlines() if ":SWDIR:" not in line
+        )
+        files = {"/f.grib2": self.body, "/f.grib2.idx": idx.encode()}
+        with RangeServer(files) as server, Transport(rate_limit=0) as transport:
+            self.assertFalse(
+                inventory.download_subset(transport, server.url("/f.grib2"), self.path)
+            )
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == "__main__":
+    unittest.main()
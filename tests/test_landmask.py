@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from scipy.ndimage import gaussian_filter
+
+import gfs_to_contours
+import landmask
+from fieldcube import FieldCube, pack_masks, stacked
+from landmask import WetIndex, cube_wet_index, dry_cells, static_wet_index
+from test_composite import make_swell_data
+
+LAT = np.linspace(10.0, -10.0, 41)
+LON = np.arange(60) * 0.5
+
+
+def swell_with_land(seed):
+    rng = np.random.default_rng(seed)
+    data = make_swell_data(LAT, LON, 0.0)
+    land = np.zeros((41, 60), bool)
+    land[10:25, 20:45] = True
+    for item in (data, *data["swell_partitions"]):
+        for key, value in item.items():
+            if isinstance(value, np.ndarray) and key not in ("lon", "lat"):
+                if value.dtype == bool:
+                    item[key] = land | (rng.random(value.shape) < 0.1)
+                else:
+                    item[key] = np.where(land, np.nan, rng.random(value.shape) * 5).astype(
+                        np.float32
+                    )
+    return stacked(data), land
+
+
+class WetIndexTests(unittest.TestCase):
+    def test_dry_cells_and_round_trip(self):
+        data, land = swell_with_land(1)
+        dry = dry_cells(data["cube"])
+        np.testing.assert_array_equal(dry, land)
+
+        wet = WetIndex(dry)
+        self.assertEqual(wet.size, 41 * 60 - 15 * 25)
+        vectors = wet.compress(data["cube"].values)
+        self.assertEqual(vectors.shape, (len(data["cube"].fields), wet.size))
+        np.testing.assert_array_equal(wet.expand(vectors, np.nan), data["cube"].values)
+
+        rows, cols = wet.strided_cells(4)
+        self.assertFalse(land[rows, cols].any())
+        self.assertTrue(((rows % 4 == 0) & (cols % 4 == 0)).all())
+
+    def test_static_index_is_reused_until_the_mask_changes(self):
+        land = np.zeros((41, 60), bool)
+        land[:5] = True
+        first = static_wet_index(("test", 1), land)
+        self.assertIs(static_wet_index(("test", 1), land.copy()), first)
+        land[20, 20] = True
+        self.assertIsNot(static_wet_index(("test", 1), land), first)
+
+    def test_cube_index_rescans_only_when_the_masks_change(self):
+        data, land = swell_with_land(4)
+        cube = data["cube"]
+        with patch.object(landmask, "dry_cells", wraps=dry_cells) as scan:
+            first = cube_wet_index(("test", 2), cube)
+            self.assertIs(cube_wet_index(("test", 2), cube), first)
+            self.assertEqual(scan.call_count, 1)
+            np.testing.assert_array_equal(first.cells, np.flatnonzero(~land))
+
+            masks = cube.unpacked_masks().copy()
+            masks[:, 30, 50] = True
+            changed = FieldCube(
+                cube.values.copy(), pack_masks(masks), cube.fields, cube.mask_fields
+            )
+            changed.values[:, 30, 50] = np.nan
+            rescanned = cube_wet_index(("test", 2), changed)
+            self.assertEqual(scan.call_count, 2)
+            self.assertIsNot(rescanned, first)
+            self.assertEqual(rescanned.size, first.size - 1)
+
+    def test_wet_only_smoothing_matches_full_grid_normalization(self):
+        data, _ = swell_with_land(2)
+        grid = np.where(data["height_mask"], np.nan, data["height"]).astype(np.float32)
+        nan_mask = np.isnan(grid)
+        filtered = gaussian_filter(np.where(nan_mask, 0.0, grid), sigma=1.5, mode="nearest")
+        weights = gaussian_filter((~nan_mask).astype(np.float32), sigma=1.5, mode="nearest")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = np.where(weights > 0, filtered / weights, np.nan)
+        expected[nan_mask] = np.nan
+
+        for _ in range(2):  # the second pass reuses the cached weights
+            np.testing.assert_array_equal(
+                gfs_to_contours._gaussian_filter_nan(grid, 1.5), expected
+            )
+
+    def test_arrows_sampling_wet_cells_only_are_unchanged(self):
+        data, _ = swell_with_land(3)
+        wet = WetIndex(dry_cells(data["cube"]))
+        with tempfile.TemporaryDirectory() as directory:
+            for writer in (
+                gfs_to_contours.extract_swell_arrows,
+                gfs_to_contours.extract_partition_arrows,
+            ):
+                outputs = []
+                for kwargs in ({}, {"wet": wet}):
+                    path = os.path.join(directory, "arrows.geojson")
+                    writer(data, path, stride=3, **kwargs)
+                    with open(path) as f:
+                        outputs.append(f.read())
+                self.assertIn("Point", outputs[0])
+                self.assertEqual(outputs[0], outputs[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import datetime as dt
 import json
 import os
 import tempfile
+import time
 import unittest
 from unittest.mock import patch
 
@@ -9,6 +10,8 @@ import numpy as np
 
 import gfs_to_contours
 import nwps
+from range_server import RangeServer
+from transport import Transport
 
 
 class DomainConfigTests(unittest.TestCase):
@@ -35,6 +38,24 @@ class DomainConfigTests(unittest.TestCase):
             self.assertEqual(nwps.grids_from_env(), ["CG1", "CG2"])
 
 
+class FindLatestCycleTests(unittest.TestCase):
+    def test_probes_every_cycle_at_once(self):
+        path = "/wr.20260713/lox/06/CG1/lox_nwps_CG1_20260713_0600.grib2"
+        with (
+            RangeServer({path: b""}, delay=0.2) as server,
+            Transport(rate_limit=0) as client,
+            patch.object(nwps, "BASE_URL", server.url("")),
+        ):
+            started = time.monotonic()
+            cycle = nwps.find_latest_cycle(
+                client, "wr", "lox", "CG1", dt.datetime(2026, 7, 14, 9)
+            )
+            elapsed = time.monotonic() - started
+        self.assertEqual(cycle, ("20260713", "06"))
+        # The eleven probes up to it would take 2.2 s one after another.
+        self.assertLess(elapsed, 0.8)
+
+
 class SelectFramesTests(unittest.TestCase):
     START = dt.datetime(2026, 7, 16, 12)
     STEPS = set(range(145))  # hourly f000-f144
@@ -1,9 +1,16 @@
+import os
+import tempfile
+import threading
+import time
 import unittest
 from concurrent.futures import ThreadPoolExecutor
 from threading import Event
 from unittest.mock import patch
 
+import admission
 import gfs_to_contours
+import transport
+from range_server import RangeServer
 
 
 class ProcessForecastHoursTests(unittest.TestCase):
@@ -40,6 +47,9 @@ class ProcessForecastHoursTests(unittest.TestCase):
         run_info = {}
         with (
             patch.object(gfs_to_contours, "_process_single_hour", fake_hour),
+            patch.object(
+                gfs_to_contours, "_fetch_grid_files", lambda hour, **kwargs: {"g": "p"}
+            ),
             patch.object(gfs_to_contours, "ProcessPoolExecutor", ThreadPoolExecutor),
         ):
             successes, failures = gfs_to_contours.process_forecast_hours(
@@ -76,6 +86,29 @@ class ProcessForecastHoursTests(unittest.TestCase):
         self.assertEqual(seen["date_str"], "20260712")
         self.assertEqual(seen["run_hour"], "12")
 
+    def test_hours_without_any_file_fail_without_rendering(self):
+        rendered = []
+
+        def fake_hour(forecast_hour, **kwargs):
+            rendered.append(forecast_hour)
+            return (f"{forecast_hour:03}", True, None)
+
+        with (
+            patch.object(gfs_to_contours, "_process_single_hour", fake_hour),
+            patch.object(
+                gfs_to_contours,
+                "_fetch_grid_files",
+                lambda hour, **kwargs: {} if hour == 3 else {"g": "p"},
+            ),
+            patch.object(gfs_to_contours, "ProcessPoolExecutor", ThreadPoolExecutor),
+        ):
+            successes, failures = gfs_to_contours.process_forecast_hours(
+                [0, 3, 6], "20260712", "12", "unused_dir", workers=2
+            )
+
+        self.assertEqual((successes, failures), (2, 1))
+        self.assertEqual(sorted(rendered), [0, 6])
+
     def test_default_workers_env_override(self):
         with patch.dict("os.environ", {"PARALLEL_HOURS": "6"}):
             self.assertEqual(gfs_to_contours.default_workers(), 6)
@@ -86,7 +119,128 @@ class ProcessForecastHoursTests(unittest.TestCase):
 
             os.environ.pop("PARALLEL_HOURS", None)
             self.assertGreaterEqual(gfs_to_contours.default_workers(), 1)
-            self.assertLessEqual(gfs_to_contours.default_workers(), 4)
+            self.assertLessEqual(gfs_to_contours.default_workers(), os.cpu_count())
+
+    def test_default_workers_fit_in_memory(self):
+        room = 2 * admission.DEFAULT_HOUR_BYTES + admission.RESERVE_BYTES
+        with (
+            patch.dict("os.environ", {}, clear=False),
+            patch.object(gfs_to_contours, "usable_cpus", lambda: 64),
+            patch.object(admission, "available_memory", lambda: room),
+        ):
+            os.environ.pop("PARALLEL_HOURS", None)
+            self.assertEqual(gfs_to_contours.default_workers(), 2)
+
+    def test_contour_threads_follow_the_worker_share(self):
+        with patch.dict("os.environ", {"CONTOUR_THREADS": "3"}):
+            self.assertEqual(gfs_to_contours.contour_threads(), 3)
+        with patch.dict("os.environ", {}), patch.object(gfs_to_contours, "_worker_threads", 2):
+            os.environ.pop("CONTOUR_THREADS", None)
+            self.assertEqual(gfs_to_contours.contour_threads(), 2)
+        with patch.dict("os.environ", {}), patch.object(gfs_to_contours, "_worker_threads", None):
+            os.environ.pop("CONTOUR_THREADS", None)
+            with patch.object(gfs_to_contours, "usable_cpus", return_value=8):
+                self.assertEqual(gfs_to_contours.contour_threads(), 8)
+
+    def test_hours_wait_for_memory_admission(self):
+        running = 0
+        most_running = 0
+        lock = threading.Lock()
+
+        def fake_hour(forecast_hour, **kwargs):
+            nonlocal running, most_running
+            with lock:
+                running += 1
+                most_running = max(most_running, running)
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return (f"{forecast_hour:03}", True, None)
+
+        # Room for one default-sized hour only (plus the reserve).
+        room = admission.DEFAULT_HOUR_BYTES + admission.RESERVE_BYTES
+        with (
+            patch.object(gfs_to_contours, "_process_single_hour", fake_hour),
+            patch.object(
+                gfs_to_contours, "_fetch_grid_files", lambda hour, **kwargs: {"g": "p"}
+            ),
+            patch.object(gfs_to_contours, "ProcessPoolExecutor", ThreadPoolExecutor),
+            patch.object(admission, "available_memory", lambda: room),
+            patch.object(admission, "peak_rss", lambda: admission.DEFAULT_HOUR_BYTES),
+        ):
+            successes, failures = gfs_to_contours.process_forecast_hours(
+                [0, 3, 6, 9], "20260712", "12", "unused_dir", workers=4
+            )
+
+        self.assertEqual((successes, failures), (4, 0))
+        self.assertEqual(most_running, 1)
+
+
+class PipelineOverlapTests(unittest.TestCase):
+    """Downloads from a throttled local server overlap with rendering."""
+
+    HOURS = list(range(6))
+    DELAY = 0.05  # per HTTP request; 4 requests (idx + GRIB, 2 grids) per hour
+    RENDER_SECONDS = 0.2
+
+    def test_downloads_run_ahead_while_workers_render(self):
+        files = {
+            f"/gfs.20260712/12/wave/gridded/gfswave.t12z.{grid}.f{hour:03}.grib2": b"GRIB" * 64
+            for grid in gfs_to_contours.GLOBAL_GRIDS
+            for hour in self.HOURS
+        }
+        fetch_spans = {}
+        render_spans = {}
+        lock = threading.Lock()
+        real_fetch = gfs_to_contours._fetch_grid_files
+
+        def timed_fetch(forecast_hour, **kwargs):
+            start = time.monotonic()
+            paths = real_fetch(forecast_hour, **kwargs)
+            with lock:
+                fetch_spans[forecast_hour] = (start, time.monotonic())
+            return paths
+
+        def fake_render(forecast_hour, *, grid_paths=None, **kwargs):
+            # The pool must only ever see hours whose files are on disk.
+            self.assertEqual(len(grid_paths), 2)
+            self.assertTrue(all(os.path.exists(path) for path in grid_paths.values()))
+            start = time.monotonic()
+            time.sleep(self.RENDER_SECONDS)
+            with lock:
+                render_spans[forecast_hour] = (start, time.monotonic())
+            return (f"{forecast_hour:03}", True, None)
+
+        with (
+            tempfile.TemporaryDirectory() as files_dir,
+            RangeServer(files, delay=self.DELAY) as server,
+            patch.object(gfs_to_contours, "GFS_BASE_URL", server.url("")),
+            patch.dict(os.environ, {"GRIB_CACHE_BYTES": "0"}),
+            patch.object(transport, "_TRANSPORT", transport.Transport(rate_limit=0)),
+            patch.object(gfs_to_contours, "_fetch_grid_files", timed_fetch),
+            patch.object(gfs_to_contours, "_process_single_hour", fake_render),
+            patch.object(gfs_to_contours, "ProcessPoolExecutor", ThreadPoolExecutor),
+        ):
+            started = time.monotonic()
+            successes, failures = gfs_to_contours.process_forecast_hours(
+                self.HOURS, "20260712", "12", files_dir,
+                workers=2, prefetch=2, download_threads=1,
+            )
+            elapsed = time.monotonic() - started
+
+        self.assertEqual((successes, failures), (len(self.HOURS), 0))
+        # Some later hour was downloading while an earlier one rendered.
+        overlapped = any(
+            fetch_start < render_end and render_start < fetch_end
+            for later, (fetch_start, fetch_end) in fetch_spans.items()
+            for earlier, (render_start, render_end) in render_spans.items()
+            if later > earlier
+        )
+        self.assertTrue(overlapped)
+        serial = sum(end - start for start, end in fetch_spans.values()) + sum(
+            end - start for start, end in render_spans.values()
+        )
+        self.assertLess(elapsed, serial * 0.8)
 
 
 if __name__ == "__main__":
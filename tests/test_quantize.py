@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+from composite import composite_wind
+from fieldcache import FieldCache
+from fieldcube import quantized, stacked
+from quantize import CODECS, QuantizedField
+from test_composite import HI_LAT, HI_LON, LO_LAT, LO_LON, make_wind_data
+
+# Exact binary ties and values just either side of a rounding boundary.
+EDGE_VALUES = np.array(
+    [0.125, 0.375, 0.05, 0.15, 0.25, 0.5, 1.5, 2.5, 1.005, 2.675, -0.05, -1.25, -0.004, 359.5],
+    dtype=np.float32,
+)
+
+
+def varied_wind(lat, lon, seed):
+    rng = np.random.default_rng(seed)
+    data = make_wind_data(lat, lon, 0.0)
+    for key in ("speed", "u", "v", "direction"):
+        values = (rng.random(data[key].shape) * 40 - 10).astype(np.float32)
+        values[rng.random(values.shape) < 0.1] = np.nan
+        data[key] = values
+    data["direction"] = np.abs(data["direction"]) * 9
+    return stacked(data)
+
+
+class CodecTests(unittest.TestCase):
+    def test_decoded_values_publish_exactly_like_the_floats(self):
+        rng = np.random.default_rng(1)
+        values = np.concatenate(
+            [EDGE_VALUES, (rng.random(20000) * 400 - 20).astype(np.float32)]
+        )
+        for name, codec in CODECS.items():
+            source = np.abs(values) if not codec.signed else values
+            source = source[np.abs(source) < 300]
+            decoded = codec.decode(codec.encode(source))
+            self.assertEqual(
+                [round(float(x), codec.decimals) for x in decoded],
+                [round(float(x), codec.decimals) for x in source],
+                name,
+            )
+            # Already-rounded doubles serialize like the rounded floats.
+            self.assertEqual(
+                [repr(float(x)) for x in decoded],
+                [repr(round(float(x), codec.decimals)) for x in source],
+                name,
+            )
+
+    def test_nan_round_trips_through_the_sentinel(self):
+        for codec in CODECS.values():
+            codes = codec.encode(np.array([np.nan, 1.0, 1e9], np.float32))
+            self.assertEqual(codes.dtype, codec.dtype)
+            self.assertEqual(codes[0], codec.sentinel)
+            self.assertNotEqual(codes[2], codec.sentinel)  # clipped, not NaN
+            decoded = codec.decode(codes)
+            self.assertTrue(np.isnan(decoded[0]))
+            self.assertEqual(decoded[1], 1.0)
+
+
+class QuantizedCubeTests(unittest.TestCase):
+    def test_composite_and_field_cache_work_on_codes(self):
+        hi = varied_wind(HI_LAT, HI_LON, 2)
+        lo = varied_wind(LO_LAT, LO_LON, 3)
+        names = hi["cube"].fields
+        with tempfile.TemporaryDirectory() as tmp:
+            with patch.dict(os.environ, {"REGRID_CACHE_DIR": tmp}):
+                expected = composite_wind(hi, lo)
+                combined = composite_wind(quantized(hi, names), quantized(lo, names))
+
+            self.assertEqual(combined["cube"].values.shape[0], 0)
+            self.assertEqual(combined["cube"].coded.dtype, np.uint16)
+            self.assertIsInstance(combined["speed"], QuantizedField)
+            rows, cols = np.nonzero(np.ones(combined["speed"].shape, bool)[::50, ::50])
+            for key in names:
+                np.testing.assert_array_equal(
+                    combined[key][rows * 50, cols * 50],
+                    CODECS[key].decode(CODECS[key].encode(expected[key][rows * 50, cols * 50])),
+                )
+
+            cache = FieldCache(os.path.join(tmp, "fields"), max_bytes=10**9)
+            cache.save("ab" * 32, "wind", combined)
+            loaded = cache.load("ab" * 32, "wind")
+        np.testing.assert_array_equal(loaded["cube"].coded, combined["cube"].coded)
+        np.testing.assert_array_equal(loaded["mask"], combined["mask"])
+        np.testing.assert_array_equal(np.asarray(loaded["u"]), np.asarray(combined["u"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
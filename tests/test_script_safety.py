@@ -11,7 +11,7 @@ RUNNER = PROJECT_ROOT / "scripts" / "grib_parse_runner.sh"
 
 class CleanupPathSafetyTests(unittest.TestCase):
     def run_with_files_dir(
-        self, files_dir: str, *, python_bin: str | None = None
+        self, files_dir: str, *, python_bin: str | None = None, args: tuple = ()
     ) -> subprocess.CompletedProcess:
         env = os.environ.copy()
         with tempfile.NamedTemporaryFile() as env_file:
@@ -25,7 +25,7 @@ class CleanupPathSafetyTests(unittest.TestCase):
                 }
             )
             return subprocess.run(
-                ["bash", str(RUNNER)],
+                ["bash", str(RUNNER), *args],
                 env=env,
                 capture_output=True,
                 text=True,
@@ -68,6 +68,17 @@ class CleanupPathSafetyTests(unittest.TestCase):
             self.assertNotIn("FILES_DIR must be a child", result.stderr)
             self.assertFalse(marker.exists())
 
+    def test_check_mode_never_cleans(self):
+        with tempfile.TemporaryDirectory(dir=PROJECT_ROOT) as directory:
+            marker = Path(directory) / "published-output"
+            marker.write_text("keep me")
+            result = self.run_with_files_dir(
+                directory, python_bin="/bin/false", args=("--check",)
+            )
+            self.assertNotEqual(result.returncode, 0)
+            self.assertNotIn("Cleaning", result.stdout)
+            self.assertEqual(marker.read_text(), "keep me")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,111 @@
+import json
+import unittest
+
+import numpy as np
+import shapely
+
+from contours import contour_polygons
+from topology import OBJECT_NAME, topology_json
+
+LEVELS = np.array([0.0, 1.0, 2.0, 3.0])
+
+
+def decode(payload: str) -> tuple[list, list]:
+    """(shapely geometries, properties) of a topology, as topojson-client reads it.
+
+    Points are rounded back onto the 4-decimal grid they were quantized on.
+    """
+    topology = json.loads(payload)
+    scale = np.array(topology["transform"]["scale"])
+    translate = np.array(topology["transform"]["translate"])
+    arcs = [
+        np.round(np.cumsum(np.array(arc), axis=0) * scale + translate, 4)
+        for arc in topology["arcs"]
+    ]
+
+    def ring(references):
+        points = []
+        for reference in references:
+            arc = arcs[reference] if reference >= 0 else arcs[~reference][::-1]
+            points.extend(arc[1:] if points else arc)
+        return points
+
+    def polygon(rings):
+        return shapely.Polygon(ring(rings[0]), [ring(hole) for hole in rings[1:]])
+
+    geometries, properties = [], []
+    for geometry in topology["objects"][OBJECT_NAME]["geometries"]:
+        if geometry["type"] == "Polygon":
+            geometries.append(polygon(geometry["arcs"]))
+        else:
+            geometries.append(shapely.MultiPolygon([polygon(part) for part in geometry["arcs"]]))
+        properties.append(geometry["properties"])
+    return geometries, properties
+
+
+class TopologyTests(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(3)
+        lon = np.linspace(200.0, 240.0, 160)
+        lat = np.linspace(30.0, -10.0, 160)
+        lon_grid, lat_grid = np.meshgrid(lon, lat)
+        z = 3.0 * np.exp(-((lon_grid - 220) ** 2 + (lat_grid - 10) ** 2) / 60)
+        z = (z + rng.random(z.shape) * 0.4).astype(np.float32)
+        z[60:80, 20:50] = np.nan
+        _, _, self.outlines, self.band = contour_polygons(
+            lon, lat, z, LEVELS, min_area=0.001, simplify_tolerance=0.05, unsimplified=True
+        )
+        self.properties = [{"contour_min": float(index)} for index in self.band]
+
+    def test_unsimplified_topology_decodes_to_the_outlines(self):
+        payload = topology_json(self.outlines, self.properties)
+        geometries, properties = decode(payload)
+        self.assertEqual(properties, self.properties)
+        for decoded, outline in zip(geometries, self.outlines):
+            self.assertTrue(shapely.equals(decoded, outline))
+            self.assertLess(shapely.hausdorff_distance(decoded, outline), 1e-9)
+
+    def test_band_boundaries_are_stored_once(self):
+        topology = json.loads(topology_json(self.outlines, self.properties))
+        references = [
+            reference
+            for geometry in topology["objects"][OBJECT_NAME]["geometries"]
+            for rings in ([geometry["arcs"]] if geometry["type"] == "Polygon" else geometry["arcs"])
+            for references in rings
+            for reference in references
+        ]
+        self.assertTrue(any(reference < 0 for reference in references))
+        arc_points = sum(len(arc) for arc in topology["arcs"])
+        self.assertLess(arc_points, 0.75 * shapely.get_num_coordinates(self.outlines).sum())
+        for arc in topology["arcs"]:
+            self.assertTrue(all(isinstance(value, int) for point in arc for value in point))
+
+    def test_simplified_neighbours_stay_seamless(self):
+        geometries, _ = decode(
+            topology_json(self.outlines, self.properties, simplify_tolerance=0.05, threads=2)
+        )
+        bands = [
+            shapely.union_all([g for g, b in zip(geometries, self.band) if b == index])
+            for index in range(len(LEVELS) - 1)
+        ]
+        for lower, upper in zip(bands[:-1], bands[1:]):
+            self.assertLess(shapely.intersection(lower, upper).area, 1e-9)
+        for decoded, outline in zip(geometries, self.outlines):
+            self.assertLess(shapely.hausdorff_distance(decoded, outline), 0.05 + 1e-6)
+
+    def test_empty_and_degenerate_rings(self):
+        empty = json.loads(topology_json(np.empty(0, dtype=object), []))
+        self.assertEqual(empty["arcs"], [])
+        self.assertEqual(empty["objects"][OBJECT_NAME]["geometries"], [])
+        # Rounded to 4 decimals this square collapses to a point.
+        speck = shapely.Polygon([(1, 1), (1.00001, 1), (1.00001, 1.00001), (1, 1.00001)])
+        square = shapely.box(0, 0, 2, 2)
+        geometries, properties = decode(
+            topology_json(np.array([speck, square]), [{"n": 0}, {"n": 1}])
+        )
+        self.assertEqual(properties, [{"n": 1}])
+        self.assertTrue(shapely.equals(geometries[0], square))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+import requests
+
+import transport
+from range_server import RangeServer
+from transport import Transport
+
+
+class TransportTests(unittest.TestCase):
+    def test_retries_overloaded_server_and_counts_traffic(self):
+        with RangeServer({"/f": b"x" * 1000}, errors=[503, 429]) as server:
+            with Transport(rate_limit=0, backoff=0.01) as client:
+                response = client.get(server.url("/f"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+        stats = next(iter(client.stats.values()))
+        self.assertEqual(stats["requests"], 3)
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["bytes"], 1000)
+
+    def test_gives_back_final_error_response_when_retries_run_out(self):
+        with RangeServer({"/f": b"x"}, errors=[503, 503]) as server:
+            with Transport(rate_limit=0, retries=1, backoff=0.01) as client:
+                response = client.get(server.url("/f"))
+        self.assertEqual(response.status_code, 503)
+        with self.assertRaises(requests.HTTPError):
+            response.raise_for_status()
+
+    def test_honors_retry_after(self):
+        response = requests.Response()
+        response.headers["Retry-After"] = "7"
+        client = Transport(rate_limit=0, max_backoff=60)
+        self.assertEqual(client._delay(0, response), 7.0)
+        response.headers["Retry-After"] = "600"
+        self.assertEqual(client._delay(0, response), 60.0)
+
+    def test_connection_failures_raise_after_retries(self):
+        with Transport(rate_limit=0, retries=1, backoff=0.01) as client:
+            with self.assertRaises(requests.ConnectionError):
+                client.get("http://127.0.0.1:9/unreachable", timeout=1)
+        self.assertEqual(client.stats["127.0.0.1:9"]["errors"], 2)
+
+    def test_rate_limit_spaces_requests(self):
+        with RangeServer({"/f": b"x"}) as server:
+            with Transport(rate_limit=20, burst=1) as client:
+                started = time.monotonic()
+                for _ in range(5):
+                    client.head(server.url("/f"))
+                elapsed = time.monotonic() - started
+        # One token up front, then four more at 20/s.
+        self.assertGreaterEqual(elapsed, 0.18)
+
+    def test_per_host_cap_bounds_concurrency(self):
+        active = 0
+        peak = 0
+        lock = threading.Lock()
+
+        with RangeServer({"/f": b"x"}, delay=0.05) as server:
+            client = Transport(rate_limit=0, max_per_host=2)
+            original = client._session
+
+            def counting_session():
+                session = original()
+                real_request = session.request
+
+                def request(*args, **kwargs):
+                    nonlocal active, peak
+                    with lock:
+                        active += 1
+                        peak = max(peak, active)
+                    try:
+                        return real_request(*args, **kwargs)
+                    finally:
+                        with lock:
+                            active -= 1
+
+                session.request = request
+                return session
+
+            with patch.object(client, "_session", counting_session):
+                threads = [
+                    threading.Thread(target=client.get, args=(server.url("/f"),))
+                    for _ in range(6)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+            client.close()
+        self.assertEqual(len(server.requests), 6)
+        self.assertLessEqual(peak, 2)
+
+    def test_streamed_response_holds_its_slot_until_closed(self):
+        with RangeServer({"/f": b"y" * 5000}) as server:
+            with Transport(rate_limit=0, max_per_host=1) as client:
+                with client.get(server.url("/f"), stream=True) as response:
+                    self.assertFalse(client._slots[response.url.split("/")[2]].acquire(blocking=False))
+                    body = response.raw.read()
+                host = response.url.split("/")[2]
+                self.assertTrue(client._slots[host].acquire(blocking=False))
+                client._slots[host].release()
+        self.assertEqual(body, b"y" * 5000)
+        self.assertEqual(client.stats[host]["bytes"], 5000)
+
+    def test_get_transport_is_shared_per_process(self):
+        with patch.object(transport, "_TRANSPORT", None):
+            first = transport.get_transport()
+            self.assertIs(first, transport.get_transport())
+            transport._reset_after_fork()
+            self.assertIsNot(first, transport.get_transport())
+
+
+if __name__ == "__main__":
+    unittest.main()
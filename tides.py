@@ -6,13 +6,15 @@ from datetime import UTC, datetime, timedelta
 
 import requests
 
+from transport import Transport
+
 logger = logging.getLogger("GFSWaveContours")
 DATA_URL = "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter"
 METADATA_URL = "https://api.tidesandcurrents.noaa.gov/mdapi/prod/webapi/stations"
 
 
-def _get_json(session: requests.Session, url: str, params: dict | None = None) -> dict:
-    response = session.get(url, params=params, timeout=30)
+def _get_json(transport: Transport, url: str, params: dict | None = None) -> dict:
+    response = transport.get(url, params=params, timeout=30)
     response.raise_for_status()
     payload = response.json()
     if "error" in payload:
@@ -33,7 +35,7 @@ def _data_params(station: str, product: str) -> dict:
 
 
 def fetch_station(
-    session: requests.Session,
+    transport: Transport,
     station: str,
     *,
     now: datetime | None = None,
@@ -51,7 +53,7 @@ def fetch_station(
             "interval": "h",
         }
     )
-    predictions = _get_json(session, DATA_URL, prediction_params)
+    predictions = _get_json(transport, DATA_URL, prediction_params)
 
     observation_params = _data_params(station, "water_level")
     observation_params.update(
@@ -61,13 +63,13 @@ def fetch_station(
         }
     )
     try:
-        observations = _get_json(session, DATA_URL, observation_params).get("data", [])
+        observations = _get_json(transport, DATA_URL, observation_params).get("data", [])
     except (requests.RequestException, RuntimeError, ValueError) as exc:
         # Prediction-only subordinate stations legitimately have no gauge.
         logger.warning("No observed water level for station %s: %s", station, exc)
         observations = []
 
-    metadata = _get_json(session, f"{METADATA_URL}/{station}.json")
+    metadata = _get_json(transport, f"{METADATA_URL}/{station}.json")
     station_data = metadata.get("stations", [{}])[0]
     return {
         "id": station,
@@ -83,7 +85,7 @@ def fetch_station(
 
 
 def write_tides(
-    session: requests.Session,
+    transport: Transport,
     station_ids: list[str],
     output_path: str,
     *,
@@ -94,7 +96,7 @@ def write_tides(
     errors = []
     for station_id in station_ids:
         try:
-            stations.append(fetch_station(session, station_id, now=now))
+            stations.append(fetch_station(transport, station_id, now=now))
         except (requests.RequestException, RuntimeError, ValueError, KeyError) as exc:
             logger.error("Tide station %s failed: %s", station_id, exc)
             errors.append({"station": station_id, "error": str(exc)})
@@ -0,0 +1,223 @@
+"""Contour bands as TopoJSON: shared boundaries stored once, as integer deltas.
+
+In contours_XXX.geojson every band polygon carries its full rings, so the
+boundary between two neighbouring bands is written twice, once per band,
+as 4-decimal floats. topology_json() writes the same bands as a TopoJSON
+topology instead:
+
+- Coordinates are quantized to integers on the GeoJSON's own 10**-decimals
+  grid (the "transform"), so quantizing loses nothing.
+- Rings are cut into arcs at junctions, the points where the rings through
+  them part ways. An arc two bands share is stored once, and the second
+  band refers to it reversed (~index).
+- Each arc's points after the first are deltas from the previous one.
+
+It starts from the outlines before simplification (contour_polygons(...,
+unsimplified=True)), because two bands simplified separately no longer
+share a boundary. The arcs are simplified instead, as toposimplify does,
+so neighbouring bands stay seamless.
+"""
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import shapely
+
+from contours import polygon_rings
+
+OBJECT_NAME = "contours"
+
+
+def _ring_points(q: np.ndarray, ring_offsets: list) -> tuple[np.ndarray, np.ndarray]:
+    """(point index, ring) of each ring's points, open and without repeats.
+
+    Rounding can make consecutive points of a ring equal; only the first
+    of such a run is kept.
+    """
+    starts = np.asarray(ring_offsets[:-1], dtype=np.intp)
+    stops = np.asarray(ring_offsets[1:], dtype=np.intp) - 1  # drop the closing point
+    lengths = stops - starts
+    ring = np.repeat(np.arange(len(lengths)), lengths)
+    position = np.arange(len(ring)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    index = np.repeat(starts, lengths) + position
+    previous = np.where(position == 0, np.repeat(stops - 1, lengths), index - 1)
+    keep = (q[index] != q[previous]).any(axis=1)
+    return index[keep], ring[keep]
+
+
+def _junctions(keys: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """Whether each ring point is a junction: seen elsewhere with other neighbours."""
+    if not len(keys):
+        return np.zeros(0, dtype=bool)
+    first = np.flatnonzero(np.concatenate([[True], ring[1:] != ring[:-1]]))
+    last = np.concatenate([first[1:], [len(ring)]]) - 1
+    position = np.arange(len(ring))
+    previous = position - 1
+    previous[first] = last
+    following = position + 1
+    following[last] = first
+    low = np.minimum(keys[previous], keys[following])
+    high = np.maximum(keys[previous], keys[following])
+    order = np.lexsort((high, low, keys))
+    sorted_keys, sorted_low, sorted_high = keys[order], low[order], high[order]
+    new_key = np.concatenate([[True], sorted_keys[1:] != sorted_keys[:-1]])
+    new_pair = new_key | np.concatenate(
+        [[True], (sorted_low[1:] != sorted_low[:-1]) | (sorted_high[1:] != sorted_high[:-1])]
+    )
+    pairs = np.add.reduceat(new_pair.astype(np.intp), np.flatnonzero(new_key))
+    junction_keys = sorted_keys[new_key][pairs > 1]
+    return np.isin(keys, junction_keys)
+
+
+class _Arcs:
+    """Arcs as point-index arrays, each stored once whichever way it is walked."""
+
+    def __init__(self, keys: np.ndarray):
+        self.keys = keys
+        self.points: list[np.ndarray] = []
+        self.closed: list[bool] = []
+        self._index: dict[bytes, int] = {}
+
+    def add(self, points: np.ndarray, closed: bool = False) -> int:
+        """The arc reference of points: its index, or ~index if stored reversed."""
+        forward = self.keys[points].tobytes()
+        if forward in self._index:
+            return self._index[forward]
+        backward = self.keys[points[::-1]].tobytes()
+        if backward in self._index:
+            return ~self._index[backward]
+        self._index[forward] = len(self.points)
+        self.points.append(points)
+        self.closed.append(closed)
+        return len(self.points) - 1
+
+    def ring(self, points: np.ndarray, junction: np.ndarray) -> list[int]:
+        """Arc references of a ring (points open, junction flags alongside)."""
+        cuts = np.flatnonzero(junction)
+        if not len(cuts):
+            # No junction: the ring is one closed arc, started at its
+            # smallest point so that any rotation of it is the same arc.
+            start = int(np.argmin(self.keys[points]))
+            forward = np.concatenate([points[start:], points[: start + 1]])
+            backward = forward[::-1]
+            if self.keys[backward].tobytes() < self.keys[forward].tobytes():
+                return [~self.add(backward, closed=True)]
+            return [self.add(forward, closed=True)]
+        points = np.concatenate([points[cuts[0] :], points[: cuts[0] + 1]])
+        cuts = np.append(cuts - cuts[0], len(points) - 1)
+        # With one junction the single arc is a loop, simplified as a ring.
+        return [
+            self.add(points[start : stop + 1], closed=len(cuts) == 2)
+            for start, stop in zip(cuts[:-1], cuts[1:])
+        ]
+
+
+def _encoded_arcs(
+    q: np.ndarray, arcs: _Arcs, simplify_tolerance: float | None, threads: int = 1
+) -> list[list[list[int]]]:
+    """Each arc's quantized points, simplified and delta-encoded."""
+    if not arcs.points:
+        return []
+    lengths = [len(points) for points in arcs.points]
+    coords = q[np.concatenate(arcs.points)]
+    if simplify_tolerance:
+        indices = np.repeat(np.arange(len(lengths)), lengths)
+        closed = np.asarray(arcs.closed)
+        lines = np.empty(len(lengths), dtype=object)
+        open_rows = ~closed[indices]
+        if open_rows.any():
+            lines[~closed] = shapely.linestrings(
+                coords[open_rows], indices=np.unique(indices[open_rows], return_inverse=True)[1]
+            )
+        if closed.any():
+            lines[closed] = shapely.linearrings(
+                coords[~open_rows], indices=np.unique(indices[~open_rows], return_inverse=True)[1]
+            )
+        # Shapely releases the GIL, so chunks of arcs simplify in parallel.
+        with ThreadPoolExecutor(threads) as executor:
+            lines = np.concatenate(
+                list(
+                    executor.map(
+                        lambda chunk: shapely.simplify(
+                            chunk, simplify_tolerance, preserve_topology=True
+                        ),
+                        np.array_split(lines, threads),
+                    )
+                )
+            )
+        coords, indices = shapely.get_coordinates(lines, return_index=True)
+        coords = np.rint(coords).astype(np.int64)
+        lengths = np.bincount(indices, minlength=len(lengths)).tolist()
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    deltas = coords.copy()
+    deltas[1:] -= coords[:-1]
+    deltas[offsets[:-1]] = coords[offsets[:-1]]
+    deltas = deltas.tolist()
+    return [deltas[start:stop] for start, stop in zip(offsets[:-1], offsets[1:])]
+
+
+def topology_json(
+    outlines: np.ndarray,
+    properties: list[dict],
+    *,
+    simplify_tolerance: float | None = None,
+    decimals: int = 4,
+    threads: int = 1,
+) -> str:
+    """TopoJSON of the band polygons outlines (rounded to decimals), one per properties.
+
+    simplify_tolerance is in degrees, as for the GeoJSON contours.
+    """
+    coords, ring_offsets, polygon_offsets, part_offsets, multi = polygon_rings(outlines)
+    q = np.rint(coords * 10**decimals).astype(np.int64)
+    translate = q.min(axis=0) if len(q) else np.zeros(2, dtype=np.int64)
+    q -= translate
+    # One integer per point, for hashing and comparing arcs.
+    keys = q[:, 0] * (int(q[:, 1].max(initial=0)) + 1) + q[:, 1]
+
+    index, ring = _ring_points(q, ring_offsets)
+    junction = _junctions(keys[index], ring)
+    bounds = np.searchsorted(ring, np.arange(len(ring_offsets)))
+    arcs = _Arcs(keys)
+    ring_arcs = []
+    for number in range(len(ring_offsets) - 1):
+        start, stop = bounds[number], bounds[number + 1]
+        # A ring rounded down to fewer than 3 distinct points is dropped.
+        ring_arcs.append(
+            arcs.ring(index[start:stop], junction[start:stop]) if stop - start >= 3 else None
+        )
+
+    geometries = []
+    for is_multi, start, stop, props in zip(
+        multi, part_offsets[:-1], part_offsets[1:], properties
+    ):
+        parts = []
+        for part in range(start, stop):
+            first, last = polygon_offsets[part], polygon_offsets[part + 1]
+            if ring_arcs[first] is None:
+                continue
+            parts.append([ring_arcs[r] for r in range(first, last) if ring_arcs[r] is not None])
+        if not parts:
+            continue
+        if is_multi:
+            geometries.append({"type": "MultiPolygon", "arcs": parts, "properties": props})
+        else:
+            geometries.append({"type": "Polygon", "arcs": parts[0], "properties": props})
+
+    scale = 10.0**-decimals
+    topology = {
+        "type": "Topology",
+        "transform": {
+            "scale": [scale, scale],
+            "translate": [round(float(value) * scale, decimals) for value in translate],
+        },
+        "objects": {OBJECT_NAME: {"type": "GeometryCollection", "geometries": geometries}},
+        "arcs": _encoded_arcs(
+            q,
+            arcs,
+            simplify_tolerance * 10**decimals if simplify_tolerance else None,
+            threads,
+        ),
+    }
+    return json.dumps(topology, separators=(",", ":"), allow_nan=False, ensure_ascii=False)
@@ -0,0 +1,326 @@
+"""Shared HTTP transport for NOMADS and NOAA CO-OPS requests.
+
+Every network call in the pipeline goes through one Transport per
+process (``get_transport()``), which provides:
+
+- persistent keep-alive connection pools: one requests.Session per
+  thread, reused for the whole run instead of a new session (and TLS
+  handshake) per forecast hour;
+- a per-host concurrency cap and token-bucket rate limit — NOMADS
+  blocks clients that exceed roughly 120 requests a minute;
+- retries with jittered exponential backoff on connection errors and
+  429/5xx responses, honoring Retry-After;
+- per-host request, byte, latency and retry counters for the run log.
+
+Transport mirrors the parts of requests.Session the pipeline uses
+(``get``/``head``/``close``), so the download helpers accept either.
+Limits are per process: pool workers that download (the workers=1
+inline path) each get their own fresh transport after fork.
+"""
+
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger("GFSWaveContours")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Concurrent HEAD probes when searching for the newest published cycle.
+PROBE_THREADS = 8
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value else default
+
+
+class _TokenBucket:
+    """Allows rate requests per second on average, bursts up to capacity."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait = (1.0 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _retry_after(response: requests.Response) -> float | None:
+    """Seconds requested by a Retry-After header (delta or HTTP date)."""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+class Transport:
+    """Pooled, rate-limited, retrying HTTP client shared by all call sites.
+
+    Defaults come from the environment: HTTP_MAX_PER_HOST concurrent
+    requests per host (4), HTTP_RATE_LIMIT requests per second per host
+    (2; 0 disables), HTTP_RETRIES extra attempts on transient failures (4).
+    """
+
+    def __init__(
+        self,
+        *,
+        max_per_host: int | None = None,
+        rate_limit: float | None = None,
+        burst: float | None = None,
+        retries: int | None = None,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.max_per_host = max(
+            1, int(max_per_host or _env_float("HTTP_MAX_PER_HOST", 4))
+        )
+        self.rate_limit = (
+            _env_float("HTTP_RATE_LIMIT", 2.0) if rate_limit is None else rate_limit
+        )
+        self.burst = burst if burst is not None else max(1.0, 2 * self.rate_limit)
+        self.retries = int(_env_float("HTTP_RETRIES", 4) if retries is None else retries)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._local = threading.local()
+        self._sessions: list[requests.Session] = []
+        self._lock = threading.Lock()
+        self._slots: dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: dict[str, _TokenBucket] = {}
+        self.stats: dict[str, dict[str, float]] = {}
+
+    # -- per-thread connection pools ------------------------------------
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4, pool_maxsize=self.max_per_host
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def close(self) -> None:
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            session.close()
+        self._local = threading.local()
+
+    def __enter__(self) -> "Transport":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    # -- per-host limits and counters -----------------------------------
+
+    def _host_state(self, host: str):
+        with self._lock:
+            slots = self._slots.get(host)
+            if slots is None:
+                slots = self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+                if self.rate_limit > 0:
+                    self._buckets[host] = _TokenBucket(self.rate_limit, self.burst)
+                self.stats[host] = {
+                    "requests": 0, "bytes": 0, "seconds": 0.0, "retries": 0, "errors": 0,
+                }
+            return slots, self._buckets.get(host)
+
+    def _count(self, host: str, **deltas) -> None:
+        with self._lock:
+            counters = self.stats[host]
+            for key, delta in deltas.items():
+                counters[key] += delta
+
+    def _delay(self, attempt: int, response: requests.Response | None) -> float:
+        if response is not None:
+            requested = _retry_after(response)
+            if requested is not None:
+                return min(requested, self.max_backoff)
+        # "Full jitter": spread retries from many threads/workers apart.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    # -- requests -------------------------------------------------------
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Issue one request, retrying transient failures.
+
+        Returns the final response whatever its status (callers still
+        raise_for_status); raises the last exception if every attempt
+        failed to connect. With stream=True the host slot is held until
+        the response is closed, so use it as a context manager.
+        """
+        host = urlsplit(url).netloc
+        slots, bucket = self._host_state(host)
+        stream = kwargs.get("stream", False)
+        for attempt in range(self.retries + 1):
+            if bucket is not None:
+                bucket.acquire()
+            slots.acquire()
+            started = time.monotonic()
+            response = None
+            try:
+                response = self._session().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                slots.release()
+                self._count(host, requests=1, errors=1, seconds=time.monotonic() - started)
+                if attempt == self.retries:
+                    raise
+                delay = self._delay(attempt, None)
+                logger.debug("%s %s failed (%s); retrying in %.1fs", method, url, exc, delay)
+            except BaseException:
+                slots.release()
+                raise
+            else:
+                if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                    response.close()
+                    slots.release()
+                    self._count(
+                        host, requests=1, errors=1, seconds=time.monotonic() - started
+                    )
+                    delay = self._delay(attempt, response)
+                    logger.debug(
+                        "%s %s returned %d; retrying in %.1fs",
+                        method, url, response.status_code, delay,
+                    )
+                else:
+                    self._finish(host, response, started, slots, stream)
+                    return response
+            self._count(host, retries=1)
+            time.sleep(delay)
+        # Not reached: the final attempt either returns or re-raises.
+        raise RuntimeError(f"{method} {url}: retries exhausted")
+
+    def _finish(self, host, response, started, slots, stream) -> None:
+        if not stream:
+            slots.release()
+            self._count(
+                host,
+                requests=1,
+                bytes=len(response.content),
+                seconds=time.monotonic() - started,
+            )
+            return
+        close = response.close
+        released = False
+
+        def close_and_release():
+            nonlocal released
+            try:
+                close()
+            finally:
+                if not released:
+                    released = True
+                    slots.release()
+                    tell = getattr(response.raw, "tell", None)
+                    self._count(
+                        host,
+                        requests=1,
+                        bytes=tell() if callable(tell) else 0,
+                        seconds=time.monotonic() - started,
+                    )
+
+        response.close = close_and_release
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", url, **kwargs)
+
+    def log_stats(self) -> None:
+        for host, counters in sorted(self.stats.items()):
+            logger.info(
+                "HTTP %s: %d requests, %.1f MB, %.0f s, %d retries, %d errors",
+                host,
+                counters["requests"],
+                counters["bytes"] / 1e6,
+                counters["seconds"],
+                counters["retries"],
+                counters["errors"],
+            )
+
+
+def url_exists(transport: Transport, url: str) -> bool:
+    try:
+        return transport.head(url, timeout=10).status_code == 200
+    except requests.RequestException as exc:
+        logger.debug("HEAD request failed for %s: %s", url, exc)
+        return False
+
+
+def newest_published(transport: Transport, candidates: list, urls) -> object | None:
+    """The first of candidates (newest first) for which every urls(candidate) exists.
+
+    All HEAD probes run concurrently, so a search over a few days of
+    cycles costs about one round trip instead of one per probe.
+    """
+    with ThreadPoolExecutor(max_workers=PROBE_THREADS) as probes:
+        probed = {
+            candidate: [probes.submit(url_exists, transport, url) for url in urls(candidate)]
+            for candidate in candidates
+        }
+        try:
+            for candidate in candidates:
+                if all(future.result() for future in probed[candidate]):
+                    return candidate
+        finally:
+            # Older cycles don't matter once a newer one is complete.
+            for futures in probed.values():
+                for future in futures:
+                    future.cancel()
+    return None
+
+
+_TRANSPORT: Transport | None = None
+
+
+def get_transport() -> Transport:
+    """This process's shared Transport, created on first use."""
+    global _TRANSPORT
+    if _TRANSPORT is None:
+        _TRANSPORT = Transport()
+    return _TRANSPORT
+
+
+def _reset_after_fork() -> None:
+    # A forked pool worker must not reuse the parent's sockets or locks.
+    global _TRANSPORT
+    _TRANSPORT = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
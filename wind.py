@@ -8,57 +8,92 @@ import numpy as np
 import pygrib
 from geojson import Feature, FeatureCollection
 
+from fieldcube import stacked
+from grid import grid_points, latlon_axes
+from landmask import WetIndex, sample_cells
+
 logger = logging.getLogger("GFSWaveContours")
 
 
+# pygrib names of the surface wind messages in a GFS-Wave file.
+WIND_SPEED_NAME = "Wind speed"
+WIND_DIRECTION_NAME = "Wind direction"
+WIND_U_NAME = "U component of wind"
+WIND_V_NAME = "V component of wind"
+WIND_NAMES = (WIND_SPEED_NAME, WIND_DIRECTION_NAME, WIND_U_NAME, WIND_V_NAME)
+
+
+def wind_from_messages(
+    messages: dict[str, list],
+    filepath: str,
+    *,
+    grid: tuple[np.ndarray, np.ndarray] | None = None,
+) -> dict:
+    """Build the wind dict from {pygrib name: [messages]} of one file.
+
+    grid is the file's (lon, lat) if the caller already has it. Valid
+    times are the caller's to check (see check_valid_times).
+    """
+    try:
+        speed_msg, direction_msg, u_msg, v_msg = (
+            messages[name][0] for name in WIND_NAMES
+        )
+    except (IndexError, KeyError) as exc:
+        raise RuntimeError(f"Missing wind fields in {filepath}") from exc
+
+    lon, lat = grid if grid is not None else latlon_axes(*speed_msg.latlons())
+    return stacked({
+        "lon": lon,
+        "lat": lat,
+        "speed": np.ma.filled(speed_msg.values, np.nan),
+        "direction": np.ma.filled(direction_msg.values, np.nan),
+        "u": np.ma.filled(u_msg.values, np.nan),
+        "v": np.ma.filled(v_msg.values, np.nan),
+        "mask": np.ma.getmaskarray(speed_msg.values),
+        "valid_date": speed_msg.validDate,
+    })
+
+
+def check_valid_times(messages: dict[str, list], what: str) -> None:
+    if len({m.validDate for group in messages.values() for m in group}) > 1:
+        raise ValueError(f"Mismatched valid times between {what}")
+
+
 def extract_wind(filepath: str) -> dict:
     """Return the surface wind grid from a GFS-Wave GRIB2 file."""
     grbs = pygrib.open(filepath)
     try:
-        try:
-            speed_msg = grbs.select(name="Wind speed")[0]
-            direction_msg = grbs.select(name="Wind direction")[0]
-            u_msg = grbs.select(name="U component of wind")[0]
-            v_msg = grbs.select(name="V component of wind")[0]
-        except (IndexError, ValueError) as exc:
-            raise RuntimeError(f"Missing wind fields in {filepath}") from exc
-
-        messages = (speed_msg, direction_msg, u_msg, v_msg)
-        if len({message.validDate for message in messages}) != 1:
-            raise ValueError("Mismatched valid times between wind fields")
-
-        lats, lons = speed_msg.latlons()
-        return {
-            "lon": np.asarray(lons, dtype=np.float32),
-            "lat": np.asarray(lats, dtype=np.float32),
-            "speed": np.ma.filled(speed_msg.values, np.nan).astype(np.float32),
-            "direction": np.ma.filled(direction_msg.values, np.nan).astype(np.float32),
-            "u": np.ma.filled(u_msg.values, np.nan).astype(np.float32),
-            "v": np.ma.filled(v_msg.values, np.nan).astype(np.float32),
-            "mask": np.ma.getmaskarray(speed_msg.values),
-            "valid_date": speed_msg.validDate,
-        }
+        messages = {}
+        for name in WIND_NAMES:
+            try:
+                messages[name] = grbs.select(name=name)
+            except ValueError as exc:
+                raise RuntimeError(f"Missing wind fields in {filepath}") from exc
+        check_valid_times(messages, "wind fields")
+        return wind_from_messages(messages, filepath)
     finally:
         grbs.close()
 
 
-def write_wind_arrows(data: dict, path: str, *, stride: int = 10) -> int:
+def write_wind_arrows(
+    data: dict, path: str, *, stride: int = 10, wet: WetIndex | None = None
+) -> int:
     """Write coarse wind vectors as GeoJSON points.
 
     Compact properties are: ``s`` speed in m/s, ``d`` direction wind comes
-    from in degrees true, and ``u``/``v`` vector components in m/s.
+    from in degrees true, and ``u``/``v`` vector components in m/s. wet,
+    the grid's static WetIndex, limits sampling to cells that can hold data.
     """
-    slices = np.s_[::stride, ::stride]
-    lon = data["lon"][slices]
-    lat = data["lat"][slices]
-    speed = data["speed"][slices]
-    direction = data["direction"][slices]
-    u = data["u"][slices]
-    v = data["v"][slices]
+    rows, cols = sample_cells(data["speed"].shape, stride, wet)
+    lon, lat = grid_points(data, rows, cols)
+    speed = data["speed"][rows, cols]
+    direction = data["direction"][rows, cols]
+    u = data["u"][rows, cols]
+    v = data["v"][rows, cols]
     valid = np.isfinite(speed) & np.isfinite(direction) & np.isfinite(u) & np.isfinite(v)
     mask = data.get("mask")
     if mask is not None:
-        valid &= ~mask[slices]
+        valid &= ~mask[rows, cols]
 
     features = []
     for lo, la, speed_value, direction_value, u_value, v_value in zip(